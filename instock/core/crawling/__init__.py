@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import instock.core.http_replay as http_replay
+import instock.core.http_stats as http_stats
+
+# 按环境变量 http_mode 安装HTTP录制/回放钩子，再安装请求统计钩子(统计使用原始URL)
+http_replay.install()
+http_stats.install()
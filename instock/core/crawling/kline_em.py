@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""
+Date: 2026/10/18
+Desc: 东方财富-K线数据解析
+"""
+
+import io
+import numpy as np
+import pandas as pd
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+# 日K线(klines)字段
+KLINE_COLUMNS = [
+    "日期",
+    "开盘",
+    "收盘",
+    "最高",
+    "最低",
+    "成交量",
+    "成交额",
+    "振幅",
+    "涨跌幅",
+    "涨跌额",
+    "换手率",
+]
+
+# 分时(trends)字段
+TRENDS_COLUMNS = [
+    "时间",
+    "开盘",
+    "收盘",
+    "最高",
+    "最低",
+    "成交量",
+    "成交额",
+    "最新价",
+]
+
+
+def kline_parse(lines, columns=KLINE_COLUMNS) -> pd.DataFrame:
+    """
+    解析K线字符串数组，如 ["2024-01-02,10.1,10.3,10.5,10.0,12345,...", ...]
+    拼接成一段CSV文本后由C引擎一次读取，第1列保留为字符串，其余列直接解析为float64
+    :param lines: K线字符串数组
+    :param columns: 列名，按字段顺序
+    :return: K线数据
+    :rtype: pandas.DataFrame
+    """
+    if not lines:
+        return pd.DataFrame(columns=columns)
+    dtype = dict.fromkeys(columns[1:], np.float64)
+    dtype[columns[0]] = str
+    return pd.read_csv(io.StringIO("\n".join(lines)), header=None, names=columns,
+                       usecols=range(len(columns)), dtype=dtype, na_values=["-"], engine="c")
+
+
+def kline_time_filter(temp_df, start_date, end_date, column="时间") -> pd.DataFrame:
+    """
+    按时间区间(含两端)筛选分时数据，时间列统一格式为 "YYYY-MM-DD HH:MM:SS"
+    """
+    times = pd.to_datetime(temp_df[column])
+    mask = ((times >= pd.Timestamp(start_date)) & (times <= pd.Timestamp(end_date))).values
+    temp_df = temp_df.loc[mask].reset_index(drop=True)
+    temp_df[column] = times[mask].astype(str).values
+    return temp_df
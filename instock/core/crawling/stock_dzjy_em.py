@@ -5,8 +5,6 @@ Date: 2022/5/16 15:31
 Desc: 东方财富网-数据中心-大宗交易-市场统计
 http://data.eastmoney.com/dzjy/dzjy_sctj.aspx
 """
-import random
-import time
 
 import pandas as pd
 from instock.core.eastmoney_fetcher import eastmoney_fetcher
@@ -35,18 +33,7 @@ def stock_dzjy_sctj() -> pd.DataFrame:
         'source': 'WEB',
         'client': 'WEB',
     }
-    r = fetcher.make_request(url, params=params)
-    data_json = r.json()
-    total_page = int(data_json['result']["pages"])
-    big_df = pd.DataFrame()
-    for page in range(1, total_page+1):
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        params.update({'pageNumber': page})
-        r = fetcher.make_request(url, params=params)
-        data_json = r.json()
-        temp_df = pd.DataFrame(data_json['result']["data"])
-        big_df = pd.concat([big_df, temp_df], ignore_index=True)
+    big_df = pd.DataFrame(fetcher.fetch_datacenter(url, params))
 
     big_df.reset_index(inplace=True)
     big_df['index'] = big_df['index'] + 1
@@ -297,18 +284,7 @@ def stock_dzjy_hygtj(symbol: str = '近三月') -> pd.DataFrame:
         'client': 'WEB',
         'filter': f'(DATE_TYPE_CODE={period_map[symbol]})',
     }
-    r = fetcher.make_request(url, params=params)
-    data_json = r.json()
-    total_page = data_json['result']["pages"]
-    big_df = pd.DataFrame()
-    for page in range(1, int(total_page)+1):
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        params.update({"pageNumber": page})
-        r = fetcher.make_request(url, params=params)
-        data_json = r.json()
-        temp_df = pd.DataFrame(data_json['result']["data"])
-        big_df = pd.concat([big_df, temp_df], ignore_index=True)
+    big_df = pd.DataFrame(fetcher.fetch_datacenter(url, params))
 
     big_df.reset_index(inplace=True)
     big_df['index'] = big_df.index + 1
@@ -394,18 +370,7 @@ def stock_dzjy_hyyybtj(symbol: str = '近3日') -> pd.DataFrame:
         'client': 'WEB',
         'filter': f'(N_DATE=-{period_map[symbol]})',
     }
-    r = fetcher.make_request(url, params=params)
-    data_json = r.json()
-    total_page = data_json['result']["pages"]
-    big_df = pd.DataFrame()
-    for page in range(1, int(total_page)+1):
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        params.update({"pageNumber": page})
-        r = fetcher.make_request(url, params=params)
-        data_json = r.json()
-        temp_df = pd.DataFrame(data_json['result']["data"])
-        big_df = pd.concat([big_df, temp_df], ignore_index=True)
+    big_df = pd.DataFrame(fetcher.fetch_datacenter(url, params))
 
     big_df.reset_index(inplace=True)
     big_df['index'] = big_df.index + 1
@@ -469,18 +434,7 @@ def stock_dzjy_yybph(symbol: str = '近三月') -> pd.DataFrame:
         'client': 'WEB',
         'filter': f'(N_DATE=-{period_map[symbol]})',
     }
-    r = fetcher.make_request(url, params=params)
-    data_json = r.json()
-    total_page = data_json['result']["pages"]
-    big_df = pd.DataFrame()
-    for page in range(1, int(total_page)+1):
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        params.update({"pageNumber": page})
-        r = fetcher.make_request(url, params=params)
-        data_json = r.json()
-        temp_df = pd.DataFrame(data_json['result']["data"])
-        big_df = pd.concat([big_df, temp_df], ignore_index=True)
+    big_df = pd.DataFrame(fetcher.fetch_datacenter(url, params))
 
     big_df.reset_index(inplace=True)
     big_df['index'] = big_df.index + 1
@@ -5,11 +5,8 @@ Date: 2023/4/7 15:22
 Desc: 东方财富网-数据中心-年报季报-分红送配
 https://data.eastmoney.com/yjfp/
 """
-import random
-import time
 
 import pandas as pd
-from tqdm import tqdm
 from instock.core.eastmoney_fetcher import eastmoney_fetcher
 
 __author__ = 'myh '
@@ -46,19 +43,7 @@ def stock_fhps_em(date: str = "20231231") -> pd.DataFrame:
         "filter": f"""(REPORT_DATE='{"-".join([date[:4], date[4:6], date[6:]])}')""",
     }
 
-    r = fetcher.make_request(url, params=params)
-    data_json = r.json()
-    total_pages = int(data_json["result"]["pages"])
-    big_df = pd.DataFrame()
-    for page in tqdm(range(1, total_pages + 1), leave=False):
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        params.update({"pageNumber": page})
-        r = fetcher.make_request(url, params=params)
-        data_json = r.json()
-        temp_df = pd.DataFrame(data_json["result"]["data"])
-        if not temp_df.empty:
-            big_df = pd.concat(objs=[big_df, temp_df], ignore_index=True)
+    big_df = pd.DataFrame(fetcher.fetch_datacenter(url, params))
 
     big_df.columns = [
         "_",
@@ -146,6 +131,61 @@ def stock_fhps_em(date: str = "20231231") -> pd.DataFrame:
     return big_df
 
 
+def stock_fhps_detail_em(symbol: str = "600000") -> pd.DataFrame:
+    """
+    东方财富网-个股-分红送配历史
+    https://data.eastmoney.com/yjfp/detail/600000.html
+    :param symbol: 股票代码
+    :type symbol: str
+    :return: 分红送配历史，比例均为每10股
+    :rtype: pandas.DataFrame
+    """
+    url, params = stock_fhps_detail_em_params(symbol)
+    r = fetcher.make_request(url, params=params)
+    return stock_fhps_detail_em_parse(r.json())
+
+
+async def stock_fhps_detail_em_async(async_fetcher, symbol: str = "600000") -> pd.DataFrame:
+    """
+    东方财富网-个股-分红送配历史(异步)
+    async_fetcher 为 eastmoney_async_fetcher 实例
+    """
+    url, params = stock_fhps_detail_em_params(symbol)
+    return stock_fhps_detail_em_parse(await async_fetcher.make_request(url, params=params))
+
+
+def stock_fhps_detail_em_params(symbol):
+    url = "https://datacenter-web.eastmoney.com/api/data/v1/get"
+    params = {
+        "sortColumns": "EX_DIVIDEND_DATE",
+        "sortTypes": "1",
+        "pageSize": "500",
+        "pageNumber": "1",
+        "reportName": "RPT_SHAREBONUS_DET",
+        "columns": "SECURITY_CODE,EX_DIVIDEND_DATE,BONUS_IT_RATIO,PRETAX_BONUS_RMB,ASSIGN_PROGRESS",
+        "source": "WEB",
+        "client": "WEB",
+        "filter": f'(SECURITY_CODE="{symbol}")',
+    }
+    return url, params
+
+
+def stock_fhps_detail_em_parse(data_json) -> pd.DataFrame:
+    columns = ["代码", "除权除息日", "送转股份-送转总比例", "现金分红-现金分红比例", "方案进度"]
+    if not (data_json["result"] and data_json["result"]["data"]):
+        return pd.DataFrame(columns=columns)
+    temp_df = pd.DataFrame(data_json["result"]["data"])
+    temp_df = temp_df[["SECURITY_CODE", "EX_DIVIDEND_DATE", "BONUS_IT_RATIO", "PRETAX_BONUS_RMB", "ASSIGN_PROGRESS"]]
+    temp_df.columns = columns
+    temp_df["送转股份-送转总比例"] = pd.to_numeric(temp_df["送转股份-送转总比例"], errors="coerce")
+    temp_df["现金分红-现金分红比例"] = pd.to_numeric(temp_df["现金分红-现金分红比例"], errors="coerce")
+    temp_df["除权除息日"] = pd.to_datetime(temp_df["除权除息日"], errors="coerce").dt.strftime("%Y-%m-%d")
+    return temp_df
+
+
 if __name__ == "__main__":
     stock_fhps_em_df = stock_fhps_em(date="20221231")
     print(stock_fhps_em_df)
+
+    stock_fhps_detail_em_df = stock_fhps_detail_em(symbol="600000")
+    print(stock_fhps_detail_em_df)
@@ -4,13 +4,11 @@
 Date: 2022/6/19 15:26
 Desc: 东方财富网-行情首页-沪深京 A 股
 """
-import random
-import time
 
 import pandas as pd
-import math
 from functools import lru_cache
 from instock.core.eastmoney_fetcher import eastmoney_fetcher
+from instock.core.crawling.kline_em import kline_parse, kline_time_filter, KLINE_COLUMNS, TRENDS_COLUMNS
 
 __author__ = 'myh '
 __date__ = '2025/12/31 '
@@ -41,25 +39,10 @@ def stock_zh_a_spot_em() -> pd.DataFrame:
         "fields": "f2,f3,f4,f5,f6,f7,f8,f9,f10,f11,f12,f14,f15,f16,f17,f18,f20,f21,f22,f23,f24,f25,f26,f37,f38,f39,f40,f41,f45,f46,f48,f49,f57,f61,f100,f112,f113,f114,f115,f221",
         "_": "1623833739532",
     }
-    r =  fetcher.make_request(url, params=params)
-    data_json = r.json()
-    data = data_json["data"]["diff"]
+    data = fetcher.fetch_clist(url, params)
     if not data:
         return pd.DataFrame()
 
-    data_count = data_json["data"]["total"]
-    page_count = math.ceil(data_count/page_size)
-    while page_count > 1:
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        page_current = page_current + 1
-        params["pn"] = page_current
-        r =  fetcher.make_request(url, params=params)
-        data_json = r.json()
-        _data = data_json["data"]["diff"]
-        data.extend(_data)
-        page_count =page_count - 1
-
     temp_df = pd.DataFrame(data)
     temp_df.columns = [
         "最新价",
@@ -212,25 +195,10 @@ def code_id_map_em() -> dict:
         "fields": "f12",
         "_": "1623833739532",
     }
-    r =  fetcher.make_request(url, params=params)
-    data_json = r.json()
-    data = data_json["data"]["diff"]
+    data = fetcher.fetch_clist(url, params)
     if not data:
         return dict()
 
-    data_count = data_json["data"]["total"]
-    page_count = math.ceil(data_count/page_size)
-    while page_count > 1:
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        page_current = page_current + 1
-        params["pn"] = page_current
-        r =  fetcher.make_request(url, params=params)
-        data_json = r.json()
-        _data = data_json["data"]["diff"]
-        data.extend(_data)
-        page_count =page_count - 1
-
     temp_df = pd.DataFrame(data)
     temp_df["market_id"] = 1
     temp_df.columns = ["sh_code", "sh_id"]
@@ -249,25 +217,10 @@ def code_id_map_em() -> dict:
         "fields": "f12",
         "_": "1623833739532",
     }
-    r =  fetcher.make_request(url, params=params)
-    data_json = r.json()
-    data = data_json["data"]["diff"]
+    data = fetcher.fetch_clist(url, params)
     if not data:
         return dict()
 
-    data_count = data_json["data"]["total"]
-    page_count = math.ceil(data_count/page_size)
-    while page_count > 1:
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        page_current = page_current + 1
-        params["pn"] = page_current
-        r =  fetcher.make_request(url, params=params)
-        data_json = r.json()
-        _data = data_json["data"]["diff"]
-        data.extend(_data)
-        page_count =page_count - 1
-
     temp_df_sz = pd.DataFrame(data)
     temp_df_sz["sz_id"] = 0
     code_id_dict.update(dict(zip(temp_df_sz["f12"], temp_df_sz["sz_id"])))
@@ -285,25 +238,10 @@ def code_id_map_em() -> dict:
         "fields": "f12",
         "_": "1623833739532",
     }
-    r =  fetcher.make_request(url, params=params)
-    data_json = r.json()
-    data = data_json["data"]["diff"]
+    data = fetcher.fetch_clist(url, params)
     if not data:
         return dict()
 
-    data_count = data_json["data"]["total"]
-    page_count = math.ceil(data_count/page_size)
-    while page_count > 1:
-        # 添加随机延迟，避免爬取过快
-        time.sleep(random.uniform(1, 1.5))
-        page_current = page_current + 1
-        params["pn"] = page_current
-        r =  fetcher.make_request(url, params=params)
-        data_json = r.json()
-        _data = data_json["data"]["diff"]
-        data.extend(_data)
-        page_count =page_count - 1
-
     temp_df_sz = pd.DataFrame(data)
     temp_df_sz["bj_id"] = 0
     code_id_dict.update(dict(zip(temp_df_sz["f12"], temp_df_sz["bj_id"])))
@@ -334,6 +272,31 @@ def stock_zh_a_hist(
     :rtype: pandas.DataFrame
     """
     code_id_dict = code_id_map_em()
+    url, params = stock_zh_a_hist_params(symbol, period, start_date, end_date, adjust)
+    r =  fetcher.make_request(url, params=params)
+    return stock_zh_a_hist_parse(r.json())
+
+
+async def stock_zh_a_hist_async(
+    async_fetcher,
+    symbol: str = "000001",
+    period: str = "daily",
+    start_date: str = "19700101",
+    end_date: str = "20500101",
+    adjust: str = "",
+) -> pd.DataFrame:
+    """
+    东方财富网-行情首页-沪深京 A 股-每日行情(异步)
+    参数同 stock_zh_a_hist，async_fetcher 为 eastmoney_async_fetcher 实例
+    :return: 每日行情
+    :rtype: pandas.DataFrame
+    """
+    url, params = stock_zh_a_hist_params(symbol, period, start_date, end_date, adjust)
+    data_json = await async_fetcher.make_request(url, params=params)
+    return stock_zh_a_hist_parse(data_json)
+
+
+def stock_zh_a_hist_params(symbol, period, start_date, end_date, adjust):
     adjust_dict = {"qfq": "1", "hfq": "2", "": "0"}
     period_dict = {"daily": "101", "weekly": "102", "monthly": "103"}
     url = "http://push2his.eastmoney.com/api/qt/stock/kline/get"
@@ -348,41 +311,13 @@ def stock_zh_a_hist(
         "end": end_date,
         "_": "1623766962675",
     }
-    r =  fetcher.make_request(url, params=params)
-    data_json = r.json()
+    return url, params
+
+
+def stock_zh_a_hist_parse(data_json) -> pd.DataFrame:
     if not (data_json["data"] and data_json["data"]["klines"]):
         return pd.DataFrame()
-    temp_df = pd.DataFrame(
-        [item.split(",") for item in data_json["data"]["klines"]]
-    )
-    temp_df.columns = [
-        "日期",
-        "开盘",
-        "收盘",
-        "最高",
-        "最低",
-        "成交量",
-        "成交额",
-        "振幅",
-        "涨跌幅",
-        "涨跌额",
-        "换手率",
-    ]
-    temp_df.index = pd.to_datetime(temp_df["日期"])
-    temp_df.reset_index(inplace=True, drop=True)
-
-    temp_df["开盘"] = pd.to_numeric(temp_df["开盘"])
-    temp_df["收盘"] = pd.to_numeric(temp_df["收盘"])
-    temp_df["最高"] = pd.to_numeric(temp_df["最高"])
-    temp_df["最低"] = pd.to_numeric(temp_df["最低"])
-    temp_df["成交量"] = pd.to_numeric(temp_df["成交量"])
-    temp_df["成交额"] = pd.to_numeric(temp_df["成交额"])
-    temp_df["振幅"] = pd.to_numeric(temp_df["振幅"])
-    temp_df["涨跌幅"] = pd.to_numeric(temp_df["涨跌幅"])
-    temp_df["涨跌额"] = pd.to_numeric(temp_df["涨跌额"])
-    temp_df["换手率"] = pd.to_numeric(temp_df["换手率"])
-
-    return temp_df
+    return kline_parse(data_json["data"]["klines"])
 
 
 def stock_zh_a_hist_min_em(
@@ -427,30 +362,8 @@ def stock_zh_a_hist_min_em(
         }
         r =  fetcher.make_request(url, params=params)
         data_json = r.json()
-        temp_df = pd.DataFrame(
-            [item.split(",") for item in data_json["data"]["trends"]]
-        )
-        temp_df.columns = [
-            "时间",
-            "开盘",
-            "收盘",
-            "最高",
-            "最低",
-            "成交量",
-            "成交额",
-            "最新价",
-        ]
-        temp_df.index = pd.to_datetime(temp_df["时间"])
-        temp_df = temp_df[start_date:end_date]
-        temp_df.reset_index(drop=True, inplace=True)
-        temp_df["开盘"] = pd.to_numeric(temp_df["开盘"])
-        temp_df["收盘"] = pd.to_numeric(temp_df["收盘"])
-        temp_df["最高"] = pd.to_numeric(temp_df["最高"])
-        temp_df["最低"] = pd.to_numeric(temp_df["最低"])
-        temp_df["成交量"] = pd.to_numeric(temp_df["成交量"])
-        temp_df["成交额"] = pd.to_numeric(temp_df["成交额"])
-        temp_df["最新价"] = pd.to_numeric(temp_df["最新价"])
-        temp_df["时间"] = pd.to_datetime(temp_df["时间"]).astype(str)
+        temp_df = kline_parse(data_json["data"]["trends"], TRENDS_COLUMNS)
+        temp_df = kline_time_filter(temp_df, start_date, end_date)
         return temp_df
     else:
         url = "http://push2his.eastmoney.com/api/qt/stock/kline/get"
@@ -467,36 +380,8 @@ def stock_zh_a_hist_min_em(
         }
         r =  fetcher.make_request(url, params=params)
         data_json = r.json()
-        temp_df = pd.DataFrame(
-            [item.split(",") for item in data_json["data"]["klines"]]
-        )
-        temp_df.columns = [
-            "时间",
-            "开盘",
-            "收盘",
-            "最高",
-            "最低",
-            "成交量",
-            "成交额",
-            "振幅",
-            "涨跌幅",
-            "涨跌额",
-            "换手率",
-        ]
-        temp_df.index = pd.to_datetime(temp_df["时间"])
-        temp_df = temp_df[start_date:end_date]
-        temp_df.reset_index(drop=True, inplace=True)
-        temp_df["开盘"] = pd.to_numeric(temp_df["开盘"])
-        temp_df["收盘"] = pd.to_numeric(temp_df["收盘"])
-        temp_df["最高"] = pd.to_numeric(temp_df["最高"])
-        temp_df["最低"] = pd.to_numeric(temp_df["最低"])
-        temp_df["成交量"] = pd.to_numeric(temp_df["成交量"])
-        temp_df["成交额"] = pd.to_numeric(temp_df["成交额"])
-        temp_df["振幅"] = pd.to_numeric(temp_df["振幅"])
-        temp_df["涨跌幅"] = pd.to_numeric(temp_df["涨跌幅"])
-        temp_df["涨跌额"] = pd.to_numeric(temp_df["涨跌额"])
-        temp_df["换手率"] = pd.to_numeric(temp_df["换手率"])
-        temp_df["时间"] = pd.to_datetime(temp_df["时间"]).astype(str)
+        temp_df = kline_parse(data_json["data"]["klines"], ["时间"] + KLINE_COLUMNS[1:])
+        temp_df = kline_time_filter(temp_df, start_date, end_date)
         temp_df = temp_df[
             [
                 "时间",
@@ -546,33 +431,9 @@ def stock_zh_a_hist_pre_min_em(
     }
     r =  fetcher.make_request(url, params=params)
     data_json = r.json()
-    temp_df = pd.DataFrame(
-        [item.split(",") for item in data_json["data"]["trends"]]
-    )
-    temp_df.columns = [
-        "时间",
-        "开盘",
-        "收盘",
-        "最高",
-        "最低",
-        "成交量",
-        "成交额",
-        "最新价",
-    ]
-    temp_df.index = pd.to_datetime(temp_df["时间"])
-    date_format = temp_df.index[0].date().isoformat()
-    temp_df = temp_df[
-        date_format + " " + start_time : date_format + " " + end_time
-    ]
-    temp_df.reset_index(drop=True, inplace=True)
-    temp_df["开盘"] = pd.to_numeric(temp_df["开盘"])
-    temp_df["收盘"] = pd.to_numeric(temp_df["收盘"])
-    temp_df["最高"] = pd.to_numeric(temp_df["最高"])
-    temp_df["最低"] = pd.to_numeric(temp_df["最低"])
-    temp_df["成交量"] = pd.to_numeric(temp_df["成交量"])
-    temp_df["成交额"] = pd.to_numeric(temp_df["成交额"])
-    temp_df["最新价"] = pd.to_numeric(temp_df["最新价"])
-    temp_df["时间"] = pd.to_datetime(temp_df["时间"]).astype(str)
+    temp_df = kline_parse(data_json["data"]["trends"], TRENDS_COLUMNS)
+    date_format = temp_df["时间"].iloc[0][:10]
+    temp_df = kline_time_filter(temp_df, date_format + " " + start_time, date_format + " " + end_time)
     return temp_df
 
 
@@ -9,7 +9,6 @@ https://finance.sina.com.cn/realstock/company/klc_td_sh.txt
 import datetime
 import pandas as pd
 import requests
-from py_mini_racer import MiniRacer
 from instock.core.singleton_proxy import proxys
 
 hk_js_decode = """
@@ -311,6 +310,7 @@ def tool_trade_date_hist_sina() -> pd.DataFrame:
     :rtype: pandas.DataFrame
     """
     url = "https://finance.sina.com.cn/realstock/company/klc_td_sh.txt"
+    from py_mini_racer import MiniRacer  # 只在实际下载日历时加载 V8
     r = requests.get(url, proxies = proxys().get_proxies())
     js_code = MiniRacer()
     js_code.eval(hk_js_decode)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import asyncio
+import logging
+import aiohttp
+import yarl
+import instock.core.http_replay as http_replay
+from instock.core.eastmoney_fetcher import eastmoney_fetcher, rate_limiter, THROTTLE_STATUS
+from instock.core.singleton_proxy import proxys, proxy_ok
+from instock.core.http_stats import http_stats
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+hist_fetch_concurrency = 200  # 同时在途的最大请求数
+
+# 使用环境变量配置并发,docker -e 传递
+_hist_fetch_concurrency = os.environ.get('hist_fetch_concurrency')
+if _hist_fetch_concurrency is not None:
+    hist_fetch_concurrency = int(_hist_fetch_concurrency)
+
+
+class eastmoney_async_fetcher:
+    """
+    东方财富网异步数据获取器
+    基于 aiohttp 连接池，限制在途请求数，请求速率与同步获取器共用 rate_limiter，需在同一个事件循环内使用：
+        async with eastmoney_async_fetcher() as fetcher:
+            data_json = await fetcher.make_request(url, params)
+    """
+
+    def __init__(self, concurrency=hist_fetch_concurrency):
+        self.base_dir = os.path.dirname(os.path.dirname(__file__))
+        self.concurrency = concurrency
+        self.session = None
+        self.semaphore = None
+
+    _get_cookie = eastmoney_fetcher._get_cookie
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        headers = dict(eastmoney_fetcher.headers)
+        headers['Accept-Encoding'] = 'gzip, deflate'
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency,
+                                         ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(connector=connector, headers=headers,
+                                             cookies={'Cookie': self._get_cookie()})
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def make_request(self, url, params=None, retry=3, timeout=10):
+        """
+        发送GET请求
+        :param url: 请求URL
+        :param params: 请求参数
+        :param retry: 重试次数
+        :param timeout: 超时时间
+        :return: 解析后的JSON
+        """
+        bucket = rate_limiter.get(url)
+        for i in range(retry):
+            proxies = proxys().get_proxies()  # 每次请求按健康状况选择代理
+            _url, _params, proxy = url, params, None if proxies is None else proxies.get('http')
+            if http_replay.http_mode == 'replay':
+                _url, _params, proxy, proxies = http_replay.replay_url(
+                    str(yarl.URL(url).update_query(params or {}))), None, None, None
+            start = time.perf_counter()
+            try:
+                async with self.semaphore:
+                    # 取得在途名额后再取令牌，排队的请求不预约令牌，速率调整对等待中的请求立即生效
+                    while (wait := bucket.take()) > 0:
+                        await asyncio.sleep(wait)
+                    start = time.perf_counter()  # 不计算等待在途名额和令牌的时间
+                    async with self.session.get(_url, params=_params, proxy=proxy,
+                                                timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                        if response.status in THROTTLE_STATUS:
+                            bucket.on_throttle()
+                        elif response.status < 400:
+                            bucket.on_success()
+                        content = await response.read()
+                        latency = time.perf_counter() - start
+                        http_stats().record(url, latency, len(content), response.status, proxy or 'direct')
+                        proxys().report(proxies, proxy_ok(response.status), latency)
+                        if http_replay.http_mode == 'record':
+                            http_replay.record('GET', str(yarl.URL(url).update_query(params or {})), None,
+                                               response.status, response.headers, content)
+                        response.raise_for_status()
+                        return json.loads(content)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if isinstance(e, (aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+                    bucket.on_throttle()
+                if not isinstance(e, aiohttp.ClientResponseError):
+                    http_stats().record(url, time.perf_counter() - start, 0, type(e).__name__, proxy or 'direct')
+                    proxys().report(proxies, False)
+                logging.warning(f"请求错误: {e}, 第 {i + 1}/{retry} 次重试")
+                if i >= retry - 1:
+                    raise
+                http_stats().record_retry(url)
+                # 重试前的等待由限流器决定
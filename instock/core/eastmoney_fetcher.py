@@ -2,28 +2,158 @@
 # -*- coding: utf-8 -*-
 
 import os
+import logging
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from pathlib import Path
+from urllib.parse import urlsplit
+import concurrent.futures
+import threading
+import math
 import time
-import random
 from instock.core.singleton_proxy import proxys
+from instock.core.http_stats import http_stats
 
 __author__ = 'myh '
 __date__ = '2025/12/31 '
 
+fetch_rate = 5.0  # 每个域名初始每秒请求数
+fetch_rate_min = 0.5  # 被限流后最低每秒请求数
+fetch_rate_max = 100.0  # 最高每秒请求数
+
+# 使用环境变量配置请求速率,docker -e 传递
+_fetch_rate = os.environ.get('fetch_rate')
+if _fetch_rate is not None:
+    fetch_rate = float(_fetch_rate)
+_fetch_rate_min = os.environ.get('fetch_rate_min')
+if _fetch_rate_min is not None:
+    fetch_rate_min = float(_fetch_rate_min)
+_fetch_rate_max = os.environ.get('fetch_rate_max')
+if _fetch_rate_max is not None:
+    fetch_rate_max = float(_fetch_rate_max)
+
+hist_fetch_rate = 100.0  # 历史K线域名的初始每秒请求数，全市场抓取时请求量大
+_hist_fetch_rate = os.environ.get('hist_fetch_rate')
+if _hist_fetch_rate is not None:
+    hist_fetch_rate = float(_hist_fetch_rate)
+
+# 初始速率与 fetch_rate 不同的域名
+fetch_host_rate = {'push2his.eastmoney.com': hist_fetch_rate}
+
+fetch_page_workers = 8  # 分页并发获取的线程数，实际速率由 rate_limiter 控制
+_fetch_page_workers = os.environ.get('fetch_page_workers')
+if _fetch_page_workers is not None:
+    fetch_page_workers = int(_fetch_page_workers)
+
+# 视为服务端限流或过载的状态码
+THROTTLE_STATUS = (429, 500, 502, 503, 504)
+
+
+class token_bucket:
+    """
+    自适应令牌桶
+    请求成功时速率线性增加，遇到限流时速率减半（AIMD），桶容量为1秒的令牌数。
+    """
+
+    def __init__(self, rate=fetch_rate, rate_min=fetch_rate_min, rate_max=fetch_rate_max):
+        self.rate = rate
+        self.rate_min = rate_min
+        self.rate_max = rate_max
+        self.tokens = 1.0
+        self.last_time = time.monotonic()
+        self.throttle_time = 0.0
+        self.lock = threading.Lock()
+
+    def take(self):
+        """
+        取一个令牌，没有令牌时不预约，调用方等待后重新尝试，等待期间速率的变化对下一次尝试生效
+        :return: 0 表示已取得令牌，否则为按当前速率到下一个令牌的秒数
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self.last_time) * self.rate)
+            self.last_time = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return 0.0
+            return (1.0 - self.tokens) / self.rate
+
+    def on_success(self):
+        with self.lock:
+            # 每秒约增加1次请求
+            self.rate = min(self.rate_max, self.rate + 1.0 / self.rate)
+
+    def on_throttle(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.tokens, 0.0)  # 清空积累的令牌，避免继续突发
+            # 同一时间窗口内的多个失败只减速一次
+            if now - self.throttle_time < 1.0 / self.rate + 1.0:
+                return
+            self.throttle_time = now
+            self.rate = max(self.rate_min, self.rate / 2)
+
+
+class rate_limiter:
+    """
+    按域名共享的限流器，所有 eastmoney_fetcher 实例共用。
+    """
+    buckets = {}
+    lock = threading.Lock()
+
+    @classmethod
+    def get(cls, url):
+        host = urlsplit(url).netloc
+        with cls.lock:
+            bucket = cls.buckets.get(host)
+            if bucket is None:
+                rate = fetch_host_rate.get(host, fetch_rate)
+                bucket = token_bucket(rate, rate_max=max(fetch_rate_max, rate))
+                cls.buckets[host] = bucket
+            return bucket
+
+    @classmethod
+    def acquire(cls, url):
+        bucket = cls.get(url)
+        while (wait := bucket.take()) > 0:
+            time.sleep(wait)
+
+    @classmethod
+    def feedback(cls, url, status=None, error=None):
+        """
+        根据响应调整速率
+        :param status: HTTP状态码
+        :param error: 请求异常
+        """
+        bucket = cls.get(url)
+        if status in THROTTLE_STATUS or isinstance(error, (requests.exceptions.ConnectionError,
+                                                            requests.exceptions.Timeout)):
+            bucket.on_throttle()
+        elif error is None and status is not None and status < 400:
+            bucket.on_success()
+
+
 class eastmoney_fetcher:
     """
     东方财富网数据获取器
     封装了Cookie管理、会话管理和请求发送功能
     """
 
+    # 请求头
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Referer': 'https://quote.eastmoney.com/',
+        'Accept': '*/*',
+        'Accept-Language': 'zh-CN,zh;q=0.9',
+        'Accept-Encoding': 'gzip, deflate, br, zstd',
+        'Connection': 'keep-alive',
+    }
+
     def __init__(self):
         """初始化获取器"""
         self.base_dir = os.path.dirname(os.path.dirname(__file__))
         self.session = self._create_session()
-        self.proxies = proxys().get_proxies()
 
     def _get_cookie(self):
         """
@@ -55,8 +185,7 @@ class eastmoney_fetcher:
         # 配置连接池
         retry_strategy = Retry(
             total=3,
-            backoff_factor=0.1,
-            status_forcelist=[429, 500, 502, 503, 504],
+            backoff_factor=0.1,  # 只重试连接错误，限流和服务端错误交给 rate_limiter 处理
             allowed_methods=["HEAD", "GET", "POST", "OPTIONS"]
         )
         adapter = HTTPAdapter(
@@ -70,15 +199,7 @@ class eastmoney_fetcher:
         session.mount("https://", adapter)
 
         # 设置请求头
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Referer': 'https://quote.eastmoney.com/',
-            'Accept': '*/*',
-            'Accept-Language': 'zh-CN,zh;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br, zstd',
-            'Connection': 'keep-alive',
-        }
-        session.headers.update(headers)
+        session.headers.update(self.headers)
         # 设置Cookie
         session.cookies.update({'Cookie': self._get_cookie()})
         return session
@@ -93,22 +214,26 @@ class eastmoney_fetcher:
         :return: 响应对象
         """
         for i in range(retry):
+            rate_limiter.acquire(url)
+            proxies = proxys().get_proxies()  # 每次请求按健康状况选择代理，结果由 http_stats 的钩子报告
             try:
                 response = self.session.get(
                     url,
-                    proxies=self.proxies,
+                    proxies=proxies,
                     params=params,
                     timeout=timeout
                 )
+                rate_limiter.feedback(url, status=response.status_code)
                 response.raise_for_status()  # 检查HTTP错误
                 return response
             except requests.exceptions.RequestException as e:
-                print(f"请求错误: {e}, 第 {i + 1}/{retry} 次重试")
-                if i < retry - 1:
-                    # 随机延迟后重试
-                    time.sleep(random.uniform(1, 3))
-                else:
+                if not isinstance(e, requests.exceptions.HTTPError):
+                    rate_limiter.feedback(url, error=e)
+                logging.warning(f"请求错误: {e}, 第 {i + 1}/{retry} 次重试")
+                if i >= retry - 1:
                     raise
+                http_stats().record_retry(url)
+                # 重试前的等待由限流器决定
 
     def make_post_request(self, url, data=None, json=None, params=None, retry=3, timeout=60):
         """
@@ -122,24 +247,78 @@ class eastmoney_fetcher:
         :return: 响应对象
         """
         for i in range(retry):
+            rate_limiter.acquire(url)
+            proxies = proxys().get_proxies()  # 每次请求按健康状况选择代理，结果由 http_stats 的钩子报告
             try:
                 response = self.session.post(
                     url,
-                    proxies=self.proxies,
+                    proxies=proxies,
                     params=params,
                     data=data,
                     json=json,
                     timeout=timeout
                 )
+                rate_limiter.feedback(url, status=response.status_code)
                 response.raise_for_status()  # 检查HTTP错误
                 return response
             except requests.exceptions.RequestException as e:
-                print(f"请求错误: {e}, 第 {i + 1}/{retry} 次重试")
-                if i < retry - 1:
-                    # 随机延迟后重试
-                    time.sleep(random.uniform(1, 3))
-                else:
+                if not isinstance(e, requests.exceptions.HTTPError):
+                    rate_limiter.feedback(url, error=e)
+                logging.warning(f"请求错误: {e}, 第 {i + 1}/{retry} 次重试")
+                if i >= retry - 1:
                     raise
+                http_stats().record_retry(url)
+                # 重试前的等待由限流器决定
+
+    def fetch_pages(self, url, params, records, page_count, page_param='pn', parse=None,
+                    workers=fetch_page_workers):
+        """
+        分页获取：先取第1页得到总页数，其余页并发获取，按页序合并记录
+        :param url: 请求URL
+        :param params: 第1页的请求参数
+        :param records: 从JSON中取出记录列表的函数
+        :param page_count: 从第1页JSON中取出总页数的函数
+        :param page_param: 页码参数名
+        :param parse: 把响应解析为JSON的函数，默认 response.json()
+        :param workers: 并发线程数
+        :return: 记录列表
+        """
+        if parse is None:
+            parse = lambda response: response.json()
+
+        def fetch(page):
+            _params = dict(params)
+            _params[page_param] = page
+            return records(parse(self.make_request(url, params=_params)))
+
+        data_json = parse(self.make_request(url, params=params))
+        data = records(data_json)
+        if not data:
+            return []
+        data = list(data)
+        pages = range(int(params.get(page_param, 1)) + 1, int(page_count(data_json)) + 1)
+        if len(pages) == 0:
+            return data
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(workers, len(pages))) as executor:
+            for _data in executor.map(fetch, pages):
+                if _data:
+                    data.extend(_data)
+        return data
+
+    def fetch_clist(self, url, params, **kwargs):
+        """
+        分页获取行情列表接口(push2 clist)的全部记录，页大小取 params["pz"]
+        """
+        page_size = int(params["pz"])
+        return self.fetch_pages(url, params, lambda j: j["data"]["diff"],
+                                lambda j: math.ceil(j["data"]["total"] / page_size), 'pn', **kwargs)
+
+    def fetch_datacenter(self, url, params, page_param='pageNumber', **kwargs):
+        """
+        分页获取数据中心接口(datacenter)的全部记录
+        """
+        return self.fetch_pages(url, params, lambda j: j["result"]["data"],
+                                lambda j: j["result"]["pages"], page_param, **kwargs)
 
     def update_cookie(self, new_cookie):
         """
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os.path
+import sys
+import json
+import time
+import atexit
+import random
+import hashlib
+import logging
+import zipfile
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qsl
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import requests
+
+# 在项目运行时，临时将项目路径添加到环境变量
+cpath_current = os.path.dirname(os.path.dirname(__file__))
+cpath = os.path.abspath(os.path.join(cpath_current, os.pardir))
+sys.path.append(cpath)
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+# 离线录制/回放：录制模式把爬虫的HTTP响应按 URL+参数 保存到压缩的夹具文件，
+# 回放模式把请求改写到本地回放服务器，用于无网络时可重复地测试抓取吞吐和限流。
+#   http_mode=record http_fixture=xxx.zip  运行任务，录制响应
+#   python http_replay.py --fixture xxx.zip --port 8765 --latency 0.05 --error-rate 0.01  启动回放服务器
+#   http_mode=replay http_replay_url=http://127.0.0.1:8765  运行任务，从回放服务器读取
+http_mode = ''  # ''、record 或 replay
+http_fixture = os.path.join(cpath_current, 'cache', 'http_fixture.zip')  # 夹具文件
+http_replay_url = 'http://127.0.0.1:8765'  # 回放服务器地址
+
+# 使用环境变量配置,docker -e 传递
+_http_mode = os.environ.get('http_mode')
+if _http_mode is not None:
+    http_mode = _http_mode
+_http_fixture = os.environ.get('http_fixture')
+if _http_fixture is not None:
+    http_fixture = _http_fixture
+_http_replay_url = os.environ.get('http_replay_url')
+if _http_replay_url is not None:
+    http_replay_url = _http_replay_url
+
+# 不参与匹配的参数，如时间戳
+_IGNORE_PARAMS = {'_'}
+
+
+def fixture_key(method, url, body=None):
+    """
+    请求的匹配键：方法 + 去掉查询串的URL + 排序后的参数 + 请求体摘要
+    :param url: 包含查询串的完整URL
+    """
+    parts = urlsplit(url)
+    params = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in _IGNORE_PARAMS)
+    key = f"{method.upper()} {parts.scheme}://{parts.netloc}{parts.path}?{json.dumps(params, ensure_ascii=False)}"
+    if body:
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        key = f"{key} {hashlib.sha1(body).hexdigest()}"
+    return key
+
+
+def _entry_name(key):
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+# 录制的夹具文件，zip 中每个请求对应 <sha1>.json(键、状态码、响应头) 和 <sha1>.body(响应体)
+# 录制期间一直打开同一个 zip 追加，录制结束(进程退出)时关闭，写入目录。
+class fixture_archive:
+    def __init__(self, path=None):
+        self.path = http_fixture if path is None else path
+        self.lock = threading.Lock()
+        self.names = None
+        self.zf = None
+
+    def _open(self):
+        _dir = os.path.dirname(self.path)
+        if _dir and not os.path.exists(_dir):
+            os.makedirs(_dir)
+        self.zf = zipfile.ZipFile(self.path, 'a', compression=zipfile.ZIP_DEFLATED)
+        self.names = set(self.zf.namelist())
+        atexit.register(self.close)
+
+    def save(self, key, status, headers, body):
+        name = _entry_name(key)
+        with self.lock:
+            try:
+                if self.zf is None:
+                    if self.names is not None:
+                        return  # 已关闭
+                    self._open()
+                if f"{name}.json" in self.names:
+                    return
+                meta = {'key': key, 'status': status, 'headers': headers}
+                self.zf.writestr(f"{name}.json", json.dumps(meta, ensure_ascii=False))
+                self.zf.writestr(f"{name}.body", body)
+                self.names.add(f"{name}.json")
+            except Exception as e:
+                logging.error(f"http_replay.fixture_archive.save处理异常：{e}")
+
+    def close(self):
+        with self.lock:
+            if self.zf is not None:
+                try:
+                    self.zf.close()
+                except Exception as e:
+                    logging.error(f"http_replay.fixture_archive.close处理异常：{e}")
+                self.zf = None
+
+    def load(self):
+        """
+        :return: {key: (status, headers, body)}
+        """
+        data = {}
+        with zipfile.ZipFile(self.path, 'r') as zf:
+            for name in zf.namelist():
+                if not name.endswith('.json'):
+                    continue
+                meta = json.loads(zf.read(name).decode('utf-8'))
+                data[meta['key']] = (meta['status'], meta['headers'], zf.read(f"{name[:-5]}.body"))
+        return data
+
+
+_archive = None
+
+
+def get_archive():
+    global _archive
+    if _archive is None:
+        _archive = fixture_archive()
+    return _archive
+
+
+def _record_headers(headers):
+    return {k: v for k, v in headers.items() if k.lower() in ('content-type',)}
+
+
+def record(method, url, body, status, headers, content):
+    get_archive().save(fixture_key(method, url, body), status, _record_headers(headers), content)
+
+
+# 把请求改写到回放服务器：http://127.0.0.1:8765/<scheme>/<host>/<path>?<query>
+def replay_url(url):
+    parts = urlsplit(url)
+    query = f"?{parts.query}" if parts.query else ''
+    return f"{http_replay_url.rstrip('/')}/{parts.scheme}/{parts.netloc}{parts.path}{query}"
+
+
+def _request(self, method, url, *args, **kwargs):
+    if http_mode == 'replay':
+        req = requests.Request(method, url, params=kwargs.pop('params', None)).prepare()
+        kwargs['proxies'] = None
+        return _session_request(self, method, replay_url(req.url), *args, **kwargs)
+    response = _session_request(self, method, url, *args, **kwargs)
+    try:
+        # 按调用时的 URL 和参数录制，不用重定向后的 URL，与回放时改写的 URL 一致
+        req = requests.Request(method, url, params=kwargs.get('params'), data=kwargs.get('data'),
+                               json=kwargs.get('json')).prepare()
+        record(method, req.url, req.body, response.status_code, response.headers, response.content)
+    except Exception as e:
+        logging.error(f"http_replay._request处理异常：{e}")
+    return response
+
+
+_session_request = None
+
+
+# 给 requests.Session 安装录制/回放钩子，eastmoney_fetcher 和直接调用 requests 的爬虫都经过这里。
+def install():
+    global _session_request
+    if http_mode not in ('record', 'replay') or _session_request is not None:
+        return
+    _session_request = requests.Session.request
+    requests.Session.request = _request
+    logging.info(f"http_replay已启用：{http_mode}")
+
+
+class _replay_handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _serve(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else None
+        # 还原原始URL：/<scheme>/<host>/<path>?<query>
+        path = self.path.lstrip('/')
+        scheme, _, rest = path.partition('/')
+        key = fixture_key(self.command, f"{scheme}://{rest}", body)
+        server.stats['requests'] += 1
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.uniform(0, server.jitter))
+        if server.error_rate and random.random() < server.error_rate:
+            server.stats['errors'] += 1
+            self._send(server.error_status, {'Content-Type': 'text/plain'}, b'injected error')
+            return
+        item = server.data.get(key)
+        if item is None:
+            server.stats['missing'] += 1
+            self._send(404, {'Content-Type': 'text/plain'}, b'not recorded')
+            return
+        status, headers, content = item
+        self._send(status, headers, content)
+
+    def _send(self, status, headers, content):
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = _serve
+    do_POST = _serve
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_server(fixture=None, host='127.0.0.1', port=8765, latency=0.0, jitter=0.0, error_rate=0.0,
+                  error_status=503):
+    """
+    创建回放服务器
+    :param latency: 每个响应的固定延迟秒数
+    :param jitter: 附加的随机延迟上限秒数
+    :param error_rate: 注入错误的概率
+    :param error_status: 注入错误的状态码，如 429、503
+    """
+    server = ThreadingHTTPServer((host, port), _replay_handler)
+    server.daemon_threads = True
+    server.data = fixture_archive(fixture).load()
+    server.latency = latency
+    server.jitter = jitter
+    server.error_rate = error_rate
+    server.error_status = error_status
+    server.stats = {'requests': 0, 'errors': 0, 'missing': 0}
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='爬虫HTTP回放服务器')
+    parser.add_argument('--fixture', default=http_fixture)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    args = parser.parse_args()
+    server = create_server(args.fixture, args.host, args.port, args.latency, args.jitter, args.error_rate,
+                           args.error_status)
+    print(f"回放服务器：http://{args.host}:{server.server_port} 共{len(server.data)}条记录")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(server.stats)
+
+
+# main函数入口
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+import math
+import logging
+import threading
+from collections import Counter
+from urllib.parse import urlsplit
+import requests
+import instock.core.http_replay as http_replay
+from instock.lib.singleton_type import singleton_type
+from instock.core.singleton_proxy import proxys, proxy_ok
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+# 请求耗时直方图的分桶上界(毫秒)，按1.25倍递增，1毫秒到约60秒
+_BUCKETS = [1.25 ** k for k in range(50)] + [math.inf]
+
+
+def get_endpoint(url):
+    parts = urlsplit(url)
+    return f"{parts.netloc}{parts.path}"
+
+
+def get_proxy(proxies):
+    if not proxies:
+        return 'direct'
+    return proxies.get('http') or proxies.get('https') or 'direct'
+
+
+class endpoint_stats:
+    def __init__(self):
+        self.count = 0
+        self.bytes = 0
+        self.retries = 0
+        self.latency_sum = 0.0
+        self.histogram = [0] * len(_BUCKETS)
+        self.status = Counter()
+        self.proxies = Counter()
+
+    def record(self, latency, nbytes, status, proxy):
+        ms = latency * 1000
+        self.count += 1
+        self.bytes += nbytes
+        self.latency_sum += ms
+        i = 0 if ms <= 1 else min(int(math.ceil(math.log(ms, 1.25))), len(_BUCKETS) - 1)
+        self.histogram[i] += 1
+        self.status[status] += 1
+        self.proxies[proxy] += 1
+
+    def percentile(self, q):
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        total = 0
+        for bound, n in zip(_BUCKETS, self.histogram):
+            total += n
+            if total >= target:
+                return bound if bound != math.inf else _BUCKETS[-2]
+        return _BUCKETS[-2]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'bytes': self.bytes,
+            'retries': self.retries,
+            'mean_ms': round(self.latency_sum / self.count, 1) if self.count else 0.0,
+            'p50_ms': round(self.percentile(0.50), 1),
+            'p95_ms': round(self.percentile(0.95), 1),
+            'p99_ms': round(self.percentile(0.99), 1),
+            'status': dict(self.status),
+            'proxies': dict(self.proxies),
+        }
+
+
+# 进程内的请求统计，按接口(域名+路径)汇总次数、字节数、耗时分位数、重试、状态码和使用的代理。
+class http_stats(metaclass=singleton_type):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def _get(self, url):
+        endpoint = get_endpoint(url)
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = endpoint_stats()
+            self.endpoints[endpoint] = stats
+        return stats
+
+    def record(self, url, latency, nbytes=0, status=None, proxy='direct'):
+        """
+        :param latency: 耗时秒数
+        :param status: HTTP状态码，请求异常时为异常类名
+        """
+        with self.lock:
+            self._get(url).record(latency, nbytes, status, proxy)
+
+    def record_retry(self, url):
+        with self.lock:
+            self._get(url).retries += 1
+
+    def get_stats(self):
+        with self.lock:
+            return {k: v.summary() for k, v in self.endpoints.items()}
+
+    def reset(self):
+        with self.lock:
+            self.endpoints = {}
+
+    def dump(self, title='', reset=True):
+        """
+        输出到日志，reset 为 True 时清空，下次输出只包含之后的请求
+        """
+        stats = self.get_stats()
+        if reset:
+            self.reset()
+        if not stats:
+            return stats
+        lines = [f"######## 请求统计 {title} ########"]
+        for endpoint, s in sorted(stats.items(), key=lambda x: -x[1]['count']):
+            lines.append(f"{endpoint} 次数:{s['count']} 字节:{s['bytes']} 重试:{s['retries']} "
+                         f"耗时ms(平均/p50/p95/p99):{s['mean_ms']}/{s['p50_ms']}/{s['p95_ms']}/{s['p99_ms']} "
+                         f"状态码:{s['status']} 代理:{s['proxies']}")
+        logging.info("\n".join(lines))
+        return stats
+
+
+def _request(self, method, url, *args, **kwargs):
+    proxies = kwargs.get('proxies')
+    proxy = get_proxy(proxies)
+    if http_replay.http_mode == 'replay':
+        proxies = None  # 回放时不经过代理，不报告代理的健康状况
+    start = time.perf_counter()
+    try:
+        response = _session_request(self, method, url, *args, **kwargs)
+    except Exception as e:
+        http_stats().record(url, time.perf_counter() - start, 0, type(e).__name__, proxy)
+        # 连接、代理错误和超时计入代理的失败
+        if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            proxys().report(proxies, False)
+        raise
+    latency = time.perf_counter() - start
+    http_stats().record(url, latency, len(response.content or b''), response.status_code, proxy)
+    proxys().report(proxies, proxy_ok(response.status_code), latency)
+    return response
+
+
+_session_request = None
+
+
+# 给 requests.Session 安装统计钩子，eastmoney_fetcher 和直接调用 requests 的爬虫都经过这里，
+# 同时按每个请求的结果报告所用代理的健康状况。
+def install():
+    global _session_request
+    if _session_request is not None:
+        return
+    _session_request = requests.Session.request
+    requests.Session.request = _request
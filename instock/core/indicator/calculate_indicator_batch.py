@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+import instock.core.indicator.calculate_indicator as idr
+import instock.core.indicator.indicator_graph as idg
+import instock.core.stock_pool as stp
+from instock.core.stock_panel import stock_panel_frames
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+# 全市场批量计算指标：把每只股票最近 calc_threshold 根K线堆叠成 (股票 × 时间) 矩阵，按列(时间)推进计算，
+# 一次得到所有股票的全部指标，结果与 calculate_indicator.get_indicator 逐只计算一致。
+# 指标按 indicator_graph 的依赖图计算，只算结果列需要的部分，基础函数见 indicator_kernels。
+# K线不足 calc_threshold 根或有异常值(成交量、成交额为0等)的股票，仍按原来的方式逐只计算。
+
+
+def get_indicators_batch(open, close, high, low, volume, amount, p_change, columns=None):
+    """
+    批量计算 calculate_indicator.get_indicators 的指标
+    :param: 各字段的 (股票 × 时间) float64 矩阵，时间从早到晚
+    :param columns: 需要的指标，默认全部
+    :return: {指标: 矩阵}
+    """
+    # 按列存放(Fortran顺序)，逐个时间点推进时每一列是连续内存
+    base = dict(zip(idg.BASE_COLUMNS, (np.asfortranarray(x, dtype=np.float64) for x in
+                                       (open, close, high, low, volume, amount, p_change))))
+    return idg.evaluate(base, columns)
+
+
+def _frame_windows(stocks, end_date, calc_threshold):
+    # 由 {stock: DataFrame} 取每只股票截止 end_date 的最近 calc_threshold+1 根K线，多出的一根用于计算涨跌幅
+    keys, rows, short = [], [], []
+    columns = ['open', 'close', 'high', 'low', 'volume', 'amount']
+    if isinstance(stocks, stock_panel_frames):
+        panel = stocks.panel
+        end = np.searchsorted(panel.dates, np.datetime64(end_date, 'D'), side='right')
+        fields = [panel.field(col) for col in columns]
+        for k in stocks:
+            i = panel.index[k]
+            pos = np.flatnonzero(panel.valid[i, :end])
+            if len(pos) < calc_threshold:
+                short.append(k)
+                continue
+            pos = pos[-(calc_threshold + 1):]
+            keys.append(k)
+            rows.append([f[i, pos] for f in fields])
+    else:
+        for k, data in stocks.items():
+            data = data.loc[data['date'].values <= end_date]
+            if len(data.index) < calc_threshold:
+                short.append(k)
+                continue
+            data = data.tail(calc_threshold + 1)
+            keys.append(k)
+            rows.append([data[col].values for col in columns])
+    return keys, rows, short
+
+
+def _stack(rows, j, calc_threshold, decimals=None):
+    x = np.full((len(rows), calc_threshold + 1), np.nan)
+    for i, r in enumerate(rows):
+        v = r[j]
+        x[i, -len(v):] = v
+    if decimals is not None:
+        x = np.round(x, decimals)
+    return x
+
+
+def get_indicator_batch(stocks, stock_column, date=None, calc_threshold=90, workers=40):
+    """
+    批量计算全部股票截止 date 的指标，返回值同逐只调用 calculate_indicator.get_indicator 后合并
+    :param stocks: {(date, code, name): DataFrame}，或 stock_hist_data 的面板视图
+    :param stock_column: 结果列，前两列为 date、code
+    :return: 股票 × 指标的 DataFrame，index 为股票键
+    """
+    if not stocks:
+        return None
+    if date is None:
+        end_date = next(iter(stocks))[0]
+    else:
+        end_date = date.strftime("%Y-%m-%d")
+    keys, rows, short = _frame_windows(stocks, end_date, calc_threshold)
+
+    results = []
+    if keys:
+        # 面板中价格为 float32，按两位小数还原
+        open, close, high, low = (_stack(rows, j, calc_threshold, 2) for j in range(4))
+        volume, amount = (_stack(rows, j, calc_threshold) for j in range(4, 6))
+        # 涨跌幅按完整历史计算，窗口第一根K线使用窗口之前的收盘价
+        with np.errstate(divide='ignore', invalid='ignore'):
+            prev = close[:, :-1]
+            p_change = np.where(prev != 0, (close[:, 1:] / prev - 1.0) * 100.0, 0.0)
+        p_change[np.isnan(p_change)] = 0.0
+        open, close, high, low, volume, amount = (x[:, 1:] for x in (open, close, high, low, volume, amount))
+        # 逐只计算时结果中会出现 NaN、inf 的异常数据，交给原来的方式处理
+        ok = (np.isfinite(open).all(axis=1) & np.isfinite(close).all(axis=1) & np.isfinite(high).all(axis=1) &
+              np.isfinite(low).all(axis=1) & (volume > 0).all(axis=1) & (amount > 0).all(axis=1))
+        short.extend(k for k, v in zip(keys, ok) if not v)
+        if ok.any():
+            idx = np.flatnonzero(ok)
+            d = get_indicators_batch(open[idx], close[idx], high[idx], low[idx], volume[idx], amount[idx],
+                                     p_change[idx], columns=stock_column[2:])
+            values = {}
+            for col in stock_column[2:]:
+                v = d[col][:, -1]
+                values[col] = np.where(np.isfinite(v), v, 0.0)
+            batch_keys = [keys[i] for i in idx]
+            table = pd.DataFrame(values, index=pd.MultiIndex.from_tuples(batch_keys))
+            table.insert(0, 'code', [k[1] for k in batch_keys])
+            table.insert(0, 'date', end_date)
+            results.append(table)
+
+    if short:
+        data = stp.map_stocks(idr.get_indicator, stocks, short, args=(stock_column,),
+                              kwargs={'date': date, 'calc_threshold': calc_threshold}, workers=workers)
+        if data:
+            table = pd.DataFrame(list(data.values()), index=pd.MultiIndex.from_tuples(list(data.keys())))
+            results.append(table[list(stock_column)])
+    if not results:
+        return None
+    return pd.concat(results)
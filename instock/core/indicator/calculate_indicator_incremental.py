@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os.path
+import glob
+import logging
+import numpy as np
+import pandas as pd
+import instock.core.indicator.indicator_graph as idg
+import instock.core.indicator.indicator_kernels as idk
+import instock.core.indicator.calculate_indicator_batch as idrb
+from instock.core.stock_panel import stock_panel_frames
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+# 逐日增量计算指标：保存每只股票各指标的计算状态(EMA、Wilder平均的递推值，窗口内最近的输入，SAR状态等)，
+# 每个交易日只用当天的K线从上一交易日的状态继续计算，结果与用长历史K线计算一致，不再截断为最近 90 根。
+# 状态按日期保存为 npz 文件。没有状态、K线不连续或复权价格变化(上一根K线收盘价不同)的股票用历史K线重新计算；
+# 历史K线不足、有异常值的股票仍按 calculate_indicator_batch 截取最近的K线计算。
+cpath_current = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+indicator_state_path = os.path.join(cpath_current, 'cache', 'indicator_state')
+indicator_state_keep = 5  # 保留最近几个交易日的状态文件
+indicator_state_min_bars = 250  # 用于增量计算的最少K线数，需大于各指标的起始位置(ma200)
+indicator_state_init_bars = 500  # 从头计算时最多使用的K线数，EMA等递推指标的初值影响已可忽略，且多数股票可以一起计算
+indicator_state_reconcile_days = 20  # 每增量计算多少天与全部重算核对一次，0 为不核对
+indicator_state_tolerance = 0.000001  # 核对的允许误差(相对值)
+RECONCILE_SKIP_COLUMNS = ('obv',)  # 累计值，与第一根K线有关，不核对
+
+# 使用环境变量配置,docker -e 传递
+_indicator_state_path = os.environ.get('indicator_state_path')
+if _indicator_state_path is not None:
+    indicator_state_path = _indicator_state_path
+_indicator_state_reconcile_days = os.environ.get('indicator_state_reconcile_days')
+if _indicator_state_reconcile_days is not None:
+    indicator_state_reconcile_days = int(_indicator_state_reconcile_days)
+
+
+class indicator_state:
+    def __init__(self, date, columns, codes, last_date, last_close, bars, states, steps=0):
+        """
+        :param codes: 股票代码，以下数组及 states 中每个数组的第一维与之对应
+        :param last_date: 状态对应的最后一根K线的日期
+        :param last_close: 最后一根K线的收盘价，用于发现复权价格的变化
+        :param bars: 已计算的K线数
+        :param states: kernel_state 按调用顺序保存的状态
+        :param steps: 上次核对后增量计算的天数
+        """
+        self.date = date
+        self.columns = tuple(columns)
+        self.codes = np.asarray(codes, dtype=object)
+        self.last_date = np.asarray(last_date, dtype=object)
+        self.last_close = np.asarray(last_close, dtype=np.float64)
+        self.bars = np.asarray(bars, dtype=np.int64)
+        self.states = states
+        self.steps = steps
+
+    def __len__(self):
+        return len(self.codes)
+
+    def take(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        return indicator_state(self.date, self.columns, self.codes[rows], self.last_date[rows],
+                               self.last_close[rows], self.bars[rows],
+                               [tuple(v[rows] for v in s) for s in self.states], self.steps)
+
+    @staticmethod
+    def concat(date, columns, items, steps=0):
+        items = [s for s in items if s is not None and len(s) > 0]
+        if not items:
+            return None
+        layouts = {tuple(len(s) for s in item.states) for item in items}
+        if len(layouts) > 1:
+            raise ValueError("增量计算的状态与指标不一致")
+        states = [tuple(np.concatenate([item.states[i][j] for item in items]) for j in range(len(s)))
+                  for i, s in enumerate(items[0].states)]
+        return indicator_state(date, columns, np.concatenate([s.codes for s in items]),
+                               np.concatenate([s.last_date for s in items]),
+                               np.concatenate([s.last_close for s in items]),
+                               np.concatenate([s.bars for s in items]), states, steps)
+
+    def save(self, file):
+        arrays = {'date': np.array(self.date), 'columns': np.array(self.columns), 'steps': np.array(self.steps),
+                  'codes': self.codes.astype(str), 'last_date': self.last_date.astype(str),
+                  'last_close': self.last_close, 'bars': self.bars,
+                  'layout': np.array([len(s) for s in self.states], dtype=np.int64)}
+        for i, s in enumerate(self.states):
+            for j, v in enumerate(s):
+                arrays[f"s{i}_{j}"] = v
+        _dir = os.path.dirname(file)
+        if _dir and not os.path.exists(_dir):
+            os.makedirs(_dir)
+        tmp = f"{file}.tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, file)  # 原子替换，并发进程不会读到半个文件
+
+    @classmethod
+    def load(cls, file):
+        with np.load(file, allow_pickle=False) as f:
+            states = [tuple(f[f"s{i}_{j}"] for j in range(n)) for i, n in enumerate(f['layout'])]
+            return cls(str(f['date']), f['columns'].tolist(), f['codes'].astype(object),
+                       f['last_date'].astype(object), f['last_close'], f['bars'], states, int(f['steps']))
+
+
+def state_file(date):
+    return os.path.join(indicator_state_path, f"{date}.npz")
+
+
+def load_previous_state(date, columns):
+    """
+    :return: date 之前最近一个交易日的状态，指标不同或没有时为 None
+    """
+    files = sorted(f for f in glob.glob(os.path.join(indicator_state_path, '*.npz'))
+                   if os.path.basename(f)[:-4] < date)
+    if not files:
+        return None
+    try:
+        state = indicator_state.load(files[-1])
+        if state.columns == tuple(columns):
+            return state
+    except Exception as e:
+        logging.error(f"calculate_indicator_incremental.load_previous_state处理异常：{e}")
+    return None
+
+
+def save_state(state):
+    try:
+        state.save(state_file(state.date))
+        files = sorted(glob.glob(os.path.join(indicator_state_path, '*.npz')))
+        for f in files[:-indicator_state_keep]:
+            os.remove(f)
+    except Exception as e:
+        logging.error(f"calculate_indicator_incremental.save_state处理异常：{e}")
+
+
+def get_histories(stocks, end_date, keys=None):
+    # 每只股票截止 end_date 的全部K线：{stock: (日期数组, 开收高低量额 6×N 数组)}，keys 为 None 时取全部股票
+    result = {}
+    columns = ['open', 'close', 'high', 'low', 'volume', 'amount']
+    keys = stocks if keys is None else keys
+    if isinstance(stocks, stock_panel_frames):
+        panel = stocks.panel
+        end = np.searchsorted(panel.dates, np.datetime64(end_date, 'D'), side='right')
+        fields = [panel.field(col) for col in columns]
+        for k in keys:
+            i = panel.index[k]
+            pos = np.flatnonzero(panel.valid[i, :end])
+            values = np.array([f[i, pos] for f in fields], dtype=np.float64)
+            # 面板中价格为 float32，按两位小数还原
+            values[:4] = np.round(values[:4], 2)
+            result[k] = (panel.date_str[pos], values)
+    else:
+        for k in keys:
+            data = stocks[k]
+            data = data.loc[data['date'].values <= end_date]
+            result[k] = (data['date'].values, data[columns].to_numpy(dtype=np.float64).T)
+    return result
+
+
+def get_base(values, prev_close):
+    # 基础列，涨跌幅同 stock_hist_post：第一根K线之前没有收盘价时为 0
+    open, close, high, low, volume, amount = values
+    with np.errstate(divide='ignore', invalid='ignore'):
+        prev = np.concatenate((prev_close, close[:, :-1]), axis=1)
+        p_change = np.where(prev != 0, (close / prev - 1.0) * 100.0, 0.0)
+    p_change[~np.isfinite(p_change)] = 0.0
+    return dict(zip(idg.BASE_COLUMNS, (np.asfortranarray(x) for x in
+                                       (open, close, high, low, volume, amount, p_change))))
+
+
+def _evaluate(base, columns, states=None, offset=0):
+    with idk.kernel_state(states, offset) as ctx:
+        values = idg.evaluate(base, columns)
+    return {k: v[:, -1] for k, v in values.items()}, ctx.result
+
+
+def _init(keys, histories, date, columns):
+    # 用最近 indicator_state_init_bars 根K线从头计算，K线数相同的股票一起计算
+    groups = {}
+    for k in keys:
+        groups.setdefault(min(histories[k][1].shape[1], indicator_state_init_bars), []).append(k)
+    values, states = {}, []
+    for size, group in groups.items():
+        x = np.stack([histories[k][1][:, -size:] for k in group], axis=1)
+        # 截取的K线之前的收盘价，用于计算第一根K线的涨跌幅
+        prev_close = [histories[k][1][1, -size - 1] if histories[k][1].shape[1] > size else np.nan for k in group]
+        base = get_base(x, np.array(prev_close)[:, None])
+        _values, _states = _evaluate(base, columns)
+        for i, k in enumerate(group):
+            values[k] = {c: v[i] for c, v in _values.items()}
+        states.append(indicator_state(date, columns, [k[1] for k in group],
+                                      [histories[k][0][-1] for k in group], base['close'][:, -1],
+                                      np.full(len(group), size), _states))
+    return values, indicator_state.concat(date, columns, states)
+
+
+def _step(keys, histories, prev, rows, date, columns):
+    # 只用最后一根K线，从上一交易日的状态继续计算
+    prev = prev.take(rows)
+    x = np.stack([histories[k][1][:, -1:] for k in keys], axis=1)
+    base = get_base(x, prev.last_close[:, None])
+    _values, _states = _evaluate(base, columns, prev.states, int(prev.bars.min()))
+    values = {k: {c: v[i] for c, v in _values.items()} for i, k in enumerate(keys)}
+    return values, indicator_state(date, columns, prev.codes, [histories[k][0][-1] for k in keys],
+                                   base['close'][:, -1], prev.bars + 1, _states, prev.steps + 1)
+
+
+def _reconcile(values, check, columns):
+    # 增量计算结果与全部重算比较，返回超出误差的股票数
+    bad = set()
+    for col in columns:
+        if col in RECONCILE_SKIP_COLUMNS:
+            continue
+        a = np.array([values[k][col] for k in check.keys()])
+        b = np.array([check[k][col] for k in check.keys()])
+        err = np.abs(a - b) / np.maximum(1, np.abs(b))
+        err[np.isnan(a) & np.isnan(b)] = 0.0
+        err[np.isnan(err)] = np.inf
+        over = err > indicator_state_tolerance
+        if over.any():
+            bad.update(k for k, o in zip(check.keys(), over) if o)
+            logging.warning(f"calculate_indicator_incremental核对：{col}有{over.sum()}只股票超出误差，"
+                            f"最大{err.max()}")
+    return len(bad)
+
+
+def get_indicator_incremental(stocks, stock_column, date=None, reconcile=None, workers=40):
+    """
+    增量计算全部股票截止 date 的指标，返回值同 calculate_indicator_batch.get_indicator_batch
+    :param reconcile: 是否与全部重算核对，核对后使用重算的状态；默认按 indicator_state_reconcile_days 定期核对
+    """
+    if not stocks:
+        return None
+    if date is None:
+        end_date = next(iter(stocks))[0]
+    else:
+        end_date = date.strftime("%Y-%m-%d")
+    columns = tuple(stock_column[2:])
+    histories = get_histories(stocks, end_date)
+
+    # 当天有K线、历史K线足够且没有异常值的股票增量计算，其余截取最近的K线计算
+    keys, others = [], []
+    for k, (dates, values) in histories.items():
+        if len(dates) >= indicator_state_min_bars and dates[-1] == end_date and np.isfinite(values).all() and \
+                (values[4:] > 0).all():
+            keys.append(k)
+        else:
+            others.append(k)
+
+    prev = load_previous_state(end_date, columns)
+    step_keys, step_rows, init_keys = [], [], []
+    if prev is not None:
+        index = {c: i for i, c in enumerate(prev.codes)}
+        for k in keys:
+            i = index.get(k[1])
+            dates, values = histories[k]
+            if i is not None and prev.last_date[i] == dates[-2] and prev.last_close[i] == values[1, -2]:
+                step_keys.append(k)
+                step_rows.append(i)
+            else:
+                init_keys.append(k)
+    else:
+        init_keys = keys
+
+    if reconcile is None:
+        reconcile = prev is not None and 0 < indicator_state_reconcile_days <= prev.steps + 1
+    values, parts = {}, []
+    if step_keys:
+        _values, part = _step(step_keys, histories, prev, step_rows, end_date, columns)
+        values.update(_values)
+        parts.append(part)
+    if reconcile and step_keys:
+        check, part = _init(step_keys, histories, end_date, columns)
+        bad = _reconcile(values, check, columns)
+        logging.info(f"calculate_indicator_incremental核对{len(step_keys)}只股票，{bad}只超出误差")
+        values.update(check)
+        parts = [part]
+    if init_keys:
+        _values, part = _init(init_keys, histories, end_date, columns)
+        values.update(_values)
+        parts.append(part)
+
+    # 当天没有计算的股票(停牌等)保留原状态
+    if prev is not None:
+        done = {k[1] for k in keys}
+        codes = {k[1] for k in stocks}
+        keep = [i for i, c in enumerate(prev.codes) if c not in done and c in codes]
+        if keep:
+            parts.append(prev.take(keep))
+    steps = 0 if reconcile or prev is None else prev.steps + 1
+    state = indicator_state.concat(end_date, columns, parts, steps)
+    if state is not None:
+        save_state(state)
+
+    results = []
+    if values:
+        _keys = list(values.keys())
+        table = pd.DataFrame({c: [values[k][c] for k in _keys] for c in columns},
+                             index=pd.MultiIndex.from_tuples(_keys))
+        table = table.where(np.isfinite(table), 0.0)
+        table.insert(0, 'code', [k[1] for k in _keys])
+        table.insert(0, 'date', end_date)
+        results.append(table)
+    if others:
+        table = idrb.get_indicator_batch({k: stocks[k] for k in others}, stock_column, date=date, workers=workers)
+        if table is not None:
+            results.append(table)
+    if not results:
+        return None
+    return pd.concat(results)
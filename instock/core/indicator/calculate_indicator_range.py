@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import numpy as np
+import pandas as pd
+import instock.core.indicator.indicator_graph as idg
+import instock.core.indicator.calculate_indicator_incremental as idri
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+# 区间补算指标：每只股票的K线只计算一次完整的指标序列，取出区间内每个交易日的结果，
+# 代替逐日调用 indicators_data_daily_job.prepare 时每天重新计算最近的K线只保留最后一行。
+# 区间第一天之前最多使用 indicator_range_warmup_bars 根K线，K线数相同的股票一起计算。
+
+indicator_range_warmup_bars = 500  # 区间第一天之前使用的K线数，同 calculate_indicator_incremental 从头计算的K线数
+indicator_range_chunk = 500  # 每批计算的股票数，控制结果占用的内存
+
+
+def _range_chunk(stocks, keys, columns, start_date, end_date):
+    histories = idri.get_histories(stocks, end_date, keys)
+    groups = {}
+    for k, (dates, values) in histories.items():
+        first = np.searchsorted(dates, start_date)
+        if first == len(dates):
+            continue  # 区间内没有K线
+        begin = max(first - indicator_range_warmup_bars, 0)
+        groups.setdefault(len(dates) - begin, []).append((k, begin, first))
+
+    results = []
+    for size, group in groups.items():
+        try:
+            x = np.stack([histories[k][1][:, begin:] for k, begin, first in group], axis=1)
+            # 截取的K线之前的收盘价，用于计算第一根K线的涨跌幅
+            prev_close = [histories[k][1][1, begin - 1] if begin > 0 else np.nan for k, begin, first in group]
+            values = idg.evaluate(idri.get_base(x, np.array(prev_close)[:, None]), columns)
+            for i, (k, begin, first) in enumerate(group):
+                dates = histories[k][0][first:]
+                n = len(dates)
+                data = {'date': dates, 'code': k[1]}
+                for col in columns:
+                    data[col] = values[col][i, -n:]
+                results.append(pd.DataFrame(data))
+        except Exception as e:
+            logging.error(f"calculate_indicator_range._range_chunk处理异常：{[k[1] for k, b, f in group]}代码{e}")
+    if not results:
+        return None
+    data = pd.concat(results, ignore_index=True)
+    # 解决值中存在INF NaN问题。
+    values = data[columns].to_numpy()
+    data[columns] = np.where(np.isfinite(values), values, 0.0)
+    return data
+
+
+def get_indicator_range(stocks, stock_column, start_date, end_date):
+    """
+    计算 start_date 到 end_date 每个交易日全部股票的指标，按股票分批返回
+    :param stocks: {(date, code, name): DataFrame}，或 stock_hist_data 的面板视图，包含截止 end_date 的历史K线
+    :param stock_column: 结果列，前两列为 date、code
+    :return: 生成 DataFrame，列为 stock_column，每行是一只股票一个交易日的指标
+    """
+    start_date, end_date = start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+    columns = list(stock_column[2:])
+    keys = list(stocks)
+    for i in range(0, len(keys), indicator_range_chunk):
+        data = _range_chunk(stocks, keys[i:i + indicator_range_chunk], columns, start_date, end_date)
+        if data is not None:
+            yield data[list(stock_column)]
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os.path
+import sys
+import time
+import importlib.util
+import numpy as np
+import pandas as pd
+
+cpath_current = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+cpath = os.path.abspath(os.path.join(cpath_current, os.pardir))
+sys.path.append(cpath)
+import instock.core.tablestructure as tbs
+import instock.core.indicator.calculate_indicator as idr
+import instock.core.indicator.calculate_indicator_reference as idrr
+import instock.core.indicator.calculate_indicator_incremental as idri
+import instock.core.indicator.indicator_graph as idg
+import instock.core.indicator.indicator_kernels as idk
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+# 指标计算的结果核对和性能测试，python instock/core/indicator/indicator_benchmark.py 运行。
+# 使用固定随机种子生成的K线，每次运行数据相同。
+# 结果核对：参考实现 calculate_indicator_reference(改为依赖图计算之前的 calculate_indicator)
+# 在固定K线上的全部指标结果保存在 indicator_golden.npz，逐只计算、批量计算、逐日增量计算的结果都与其比较。
+# 指标算法有意修改后，用 python instock/core/indicator/indicator_benchmark.py golden [实现文件] 重新生成，
+# 不指定实现文件时使用 calculate_indicator_reference，文件中的 _source 记录生成使用的实现。
+golden_file = os.path.join(os.path.dirname(__file__), 'indicator_golden.npz')
+golden_stocks = 3
+golden_bars = 250
+golden_tolerance = 1e-9  # 允许误差(相对值，绝对值小于1时为绝对误差)
+
+
+def synthetic_ohlcv(stocks=1000, bars=120, seed=20231018):
+    """
+    生成模拟K线，价格为两位小数
+    :return: open, close, high, low, volume, amount 的 (股票 × 时间) 数组
+    """
+    rng = np.random.default_rng(seed)
+    close = np.round(np.cumprod(1 + rng.normal(0, 0.02, (stocks, bars)), axis=1) *
+                     rng.uniform(2, 200, (stocks, 1)), 2)
+    open = np.round(close * (1 + rng.normal(0, 0.01, (stocks, bars))), 2)
+    high = np.round(np.maximum(close, open) * (1 + np.abs(rng.normal(0, 0.01, (stocks, bars)))), 2)
+    low = np.round(np.minimum(close, open) * (1 - np.abs(rng.normal(0, 0.01, (stocks, bars)))), 2)
+    volume = rng.integers(100, 10 ** 7, (stocks, bars)).astype(np.float64)
+    amount = np.round(volume * close, 2)
+    return open, close, high, low, volume, amount
+
+
+def golden_ohlcv():
+    """
+    核对使用的K线：第2只股票有一段一字板(开高低收相同)，第3只股票为低价股
+    """
+    open, close, high, low, volume, amount = synthetic_ohlcv(golden_stocks, golden_bars)
+    flat = slice(150, 165)
+    open[1, flat] = high[1, flat] = low[1, flat] = close[1, flat]
+    for x in (open, close, high, low):
+        x[2] = np.maximum(np.round(x[2] / 50, 2), 0.01)
+    amount = np.round(volume * close, 2)
+    return open, close, high, low, volume, amount
+
+
+def _golden_base():
+    return idri.get_base(np.array(golden_ohlcv()), np.full((golden_stocks, 1), np.nan))
+
+
+def _stats_columns():
+    return list(tbs.STOCK_STATS_DATA['columns'])
+
+
+def _single(base, columns):
+    # 逐只股票调用 calculate_indicator.get_indicators
+    result = {col: np.empty((golden_stocks, golden_bars)) for col in columns}
+    for i in range(golden_stocks):
+        data = pd.DataFrame({col: base[col][i] for col in idg.BASE_COLUMNS})
+        data = idr.get_indicators(data, threshold=None, columns=columns)
+        for col in columns:
+            result[col][i] = data[col].values
+    return result
+
+
+def _incremental(base, columns, init_bars=200):
+    # 前 init_bars 根K线从头计算，之后逐根K线从上一次的状态继续计算
+    result = {col: np.empty((golden_stocks, golden_bars)) for col in columns}
+    head = {col: np.asfortranarray(v[:, :init_bars]) for col, v in base.items()}
+    with idk.kernel_state() as ctx:
+        values = idg.evaluate(head, columns)
+    for col in columns:
+        result[col][:, :init_bars] = values[col]
+    states = ctx.result
+    for j in range(init_bars, golden_bars):
+        bar = {col: np.asfortranarray(v[:, j:j + 1]) for col, v in base.items()}
+        with idk.kernel_state(states, j) as ctx:
+            values = idg.evaluate(bar, columns)
+        for col in columns:
+            result[col][:, j] = values[col][:, 0]
+        states = ctx.result
+    return result
+
+
+def _load_baseline(path=None):
+    # 加载生成核对结果使用的实现，path 为 None 时使用 calculate_indicator_reference
+    if path is None:
+        return idrr, 'calculate_indicator_reference.py'
+    spec = importlib.util.spec_from_file_location('calculate_indicator_baseline', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module, path
+
+
+def save_golden(path=None):
+    """
+    用改为依赖图计算之前的 calculate_indicator.get_indicators 生成核对结果
+    :param path: 实现文件，None 时使用 calculate_indicator_reference
+    """
+    module, source = _load_baseline(path)
+    base = _golden_base()
+    columns = _stats_columns()
+    result = {col: np.empty((golden_stocks, golden_bars)) for col in columns}
+    for i in range(golden_stocks):
+        data = pd.DataFrame({col: base[col][i] for col in idg.BASE_COLUMNS})
+        data = module.get_indicators(data, threshold=None)
+        for col in columns:
+            result[col][i] = data[col].values
+    np.savez_compressed(golden_file, _source=np.array(source), **result)
+    return source
+
+
+def _compare(values, golden, tolerance):
+    # 每个指标的最大误差，NaN 的位置需相同
+    result = {}
+    for col, expect in golden.items():
+        actual = values[col]
+        err = np.abs(actual - expect) / np.maximum(1, np.abs(expect))
+        err[np.isnan(actual) & np.isnan(expect)] = 0.0
+        err[(actual == expect)] = 0.0  # 相同的 inf
+        err[np.isnan(err)] = np.inf
+        result[col] = err.max()
+    return result
+
+
+def check_golden(tolerance=golden_tolerance):
+    """
+    逐只计算、批量计算、逐日增量计算的结果与保存的结果比较
+    :return: 指标 × 计算方式的最大误差 DataFrame，ok 列为是否都在允许误差内
+    """
+    with np.load(golden_file) as f:
+        golden = {col: f[col] for col in f.files if not col.startswith('_')}
+    columns = _stats_columns()
+    missing = [col for col in columns if col not in golden]
+    if missing:
+        raise ValueError(f"核对结果缺少指标{missing}，需要重新生成")
+    base = _golden_base()
+    result = pd.DataFrame({
+        'single': _compare(_single(base, columns), golden, tolerance),
+        'batch': _compare(idg.evaluate(base, columns), golden, tolerance),
+        'incremental': _compare(_incremental(base, columns), golden, tolerance)})
+    result['ok'] = (result <= tolerance).all(axis=1)
+    return result
+
+
+def bench_indicators(stocks=1000, bars=120, single_stocks=50):
+    """
+    每个指标(含依赖的中间结果)计算 1000 只股票的耗时(毫秒)：逐只股票计算、全部股票一起计算
+    """
+    open, close, high, low, volume, amount = synthetic_ohlcv(stocks, bars)
+    base = idri.get_base(np.array((open, close, high, low, volume, amount)), np.full((stocks, 1), np.nan))
+    rows = [{col: np.asfortranarray(v[i:i + 1]) for col, v in base.items()} for i in range(single_stocks)]
+    result = []
+    for col in _stats_columns():
+        single = _timeit(lambda: [idg.evaluate(r, [col]) for r in rows], 1) / single_stocks
+        batch = _timeit(lambda: idg.evaluate(base, [col]), 3) / stocks
+        result.append({'indicator': col, 'single_ms': single * 1e6, 'batch_ms': batch * 1e6})
+    return pd.DataFrame(result)
+
+
+def _supertrend_legacy(data):
+    # 原 calculate_indicator.get_indicators 中逐根K线读取 DataFrame 的实现，作为对比
+    size = len(data.index)
+    ub = np.empty(size, dtype=np.float64)
+    lb = np.empty(size, dtype=np.float64)
+    st = np.empty(size, dtype=np.float64)
+    for i in range(size):
+        if i == 0:
+            ub[i] = data['b_ub'].iloc[i]
+            lb[i] = data['b_lb'].iloc[i]
+            if data['close'].iloc[i] <= ub[i]:
+                st[i] = ub[i]
+            else:
+                st[i] = lb[i]
+            continue
+
+        last_close = data['close'].iloc[i - 1]
+        curr_close = data['close'].iloc[i]
+        last_ub = ub[i - 1]
+        last_lb = lb[i - 1]
+        last_st = st[i - 1]
+        curr_b_ub = data['b_ub'].iloc[i]
+        curr_b_lb = data['b_lb'].iloc[i]
+
+        if curr_b_ub < last_ub or last_close > last_ub:
+            ub[i] = curr_b_ub
+        else:
+            ub[i] = last_ub
+
+        if curr_b_lb > last_lb or last_close < last_lb:
+            lb[i] = curr_b_lb
+        else:
+            lb[i] = last_lb
+
+        if last_st == last_ub:
+            if curr_close <= ub[i]:
+                st[i] = ub[i]
+            else:
+                st[i] = lb[i]
+        elif last_st == last_lb:
+            if curr_close > lb[i]:
+                st[i] = lb[i]
+            else:
+                st[i] = ub[i]
+    return ub, lb, st
+
+
+def _timeit(func, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def bench_supertrend(stocks=5000, bars=(90, 360), legacy_stocks=20):
+    """
+    supertrend 每只股票的耗时(微秒)：原逐根K线读取 DataFrame、一只股票、全部股票一起计算
+    """
+    result = []
+    for size in bars:
+        open, close, high, low, volume, amount = synthetic_ohlcv(stocks, size)
+        atr = idk.ATR(np.asfortranarray(high), np.asfortranarray(low), np.asfortranarray(close), 14)
+        atr[~np.isfinite(atr)] = 0.0
+        hl_avg = (high + low) / 2.0
+        b_ub, b_lb = np.asfortranarray(hl_avg + atr * 3), np.asfortranarray(hl_avg - atr * 3)
+        close = np.asfortranarray(close)
+
+        frames = [pd.DataFrame({'close': close[i], 'b_ub': b_ub[i], 'b_lb': b_lb[i]}) for i in range(legacy_stocks)]
+        legacy = _timeit(lambda: [_supertrend_legacy(f) for f in frames], 1) / legacy_stocks
+        single = _timeit(lambda: [idk.SUPERTREND(close[i:i + 1], b_ub[i:i + 1], b_lb[i:i + 1])
+                                  for i in range(legacy_stocks)], 5) / legacy_stocks
+        batch = _timeit(lambda: idk.SUPERTREND(close, b_ub, b_lb), 3) / stocks
+        result.append({'bars': size, 'legacy_us': legacy * 1e6, 'single_us': single * 1e6,
+                       'batch_us': batch * 1e6})
+    return pd.DataFrame(result)
+
+
+def main():
+    if len(sys.argv) in (2, 3) and sys.argv[1] == 'golden':
+        source = save_golden(sys.argv[2] if len(sys.argv) == 3 else None)
+        print(f"已生成{golden_file}，使用{source}")
+        return
+    check = check_golden()
+    with pd.option_context('display.float_format', '{:.3g}'.format, 'display.max_rows', None):
+        print("结果核对，最大误差")
+        print(check.to_string())
+    with pd.option_context('display.float_format', '{:.2f}'.format, 'display.max_rows', None):
+        print("每个指标计算 1000 只股票耗时(毫秒)")
+        print(bench_indicators().to_string(index=False))
+        print("supertrend 每只股票耗时(微秒)")
+        print(bench_supertrend().to_string(index=False))
+    if not check['ok'].all():
+        print(f"超出允许误差的指标：{list(check.index[~check['ok']])}")
+        sys.exit(1)
+
+
+# main函数入口
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,577 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from instock.core.indicator.indicator_kernels import _shift, _diff, _nan0, SUM, MA, MAX, MIN, EMA, MACD, PPO, STOCH, \
+    BBANDS, TRIX, TEMA, ROC, RSI, ATR, WILLR, CCI, MFI, OBV, SAR, SUPERTREND
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+# 指标依赖图：每个指标(含中间结果)声明为一个节点，写明输出和依赖的输入。
+# 计算时只求所需输出的依赖闭包，共用的中间结果(如 prev_close、ma10、atr)只计算一次。
+# 输入为 (股票 × 时间) 二维数组，一只股票时为 1 行。
+BASE_COLUMNS = ('open', 'close', 'high', 'low', 'volume', 'amount', 'p_change')
+
+
+class node:
+    def __init__(self, func, outputs, inputs):
+        self.func = func
+        self.outputs = outputs
+        self.inputs = inputs
+
+
+nodes = {}  # 输出 -> node，按声明顺序
+
+
+def indicator(*outputs, inputs):
+    def decorator(func):
+        n = node(func, outputs, inputs)
+        for o in outputs:
+            if o in nodes or o in BASE_COLUMNS:
+                raise ValueError(f"指标重复声明：{o}")
+            nodes[o] = n
+        return func
+
+    return decorator
+
+
+def dependencies(outputs):
+    """
+    :return: 计算 outputs 需要的全部节点输出(依赖闭包，不含基础列)，按计算顺序
+    """
+    result = {}
+
+    def _visit(name):
+        if name in result or name in BASE_COLUMNS:
+            return
+        n = nodes.get(name)
+        if n is None:
+            raise KeyError(f"未知指标：{name}")
+        for i in n.inputs:
+            _visit(i)
+        for o in n.outputs:
+            result[o] = True
+
+    for name in outputs:
+        _visit(name)
+    return list(result)
+
+
+def evaluate(base, outputs=None):
+    """
+    :param base: {基础列: 二维 float64 数组}，基础列见 BASE_COLUMNS，只需提供用到的列
+    :param outputs: 需要的指标，默认全部
+    :return: {指标: 二维数组}，只含 outputs
+    """
+    outputs = list(nodes) if outputs is None else list(outputs)
+    memo = dict(base)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for name in dependencies(outputs):
+            if name in memo:
+                continue
+            n = nodes[name]
+            values = n.func(*(memo[i] for i in n.inputs))
+            if len(n.outputs) == 1:
+                values = (values,)
+            memo.update(zip(n.outputs, values))
+    return {k: memo[k] for k in outputs}
+
+
+# macd
+@indicator('macd', 'macds', 'macdh', inputs=('close',))
+def _macd(close):
+    return tuple(_nan0(v) for v in MACD(close, 12, 26, 9))
+
+
+# kdj
+@indicator('kdjk', 'kdjd', inputs=('high', 'low', 'close'))
+def _kdj(high, low, close):
+    return tuple(_nan0(v) for v in STOCH(high, low, close, 9, 5, 5))
+
+
+@indicator('kdjj', inputs=('kdjk', 'kdjd'))
+def _kdjj(kdjk, kdjd):
+    return 3 * kdjk - 2 * kdjd
+
+
+# boll
+@indicator('boll_ub', 'boll', 'boll_lb', inputs=('close',))
+def _boll(close):
+    return tuple(_nan0(v) for v in BBANDS(close, 20, 2))
+
+
+# trix
+@indicator('trix', inputs=('close',))
+def _trix(close):
+    return _nan0(TRIX(close, 12))
+
+
+@indicator('trix_20_sma', inputs=('trix',))
+def _trix_20_sma(trix):
+    return _nan0(MA(trix, 20))
+
+
+# cr
+@indicator('m_price', inputs=('amount', 'volume'))
+def _m_price(amount, volume):
+    return amount / volume
+
+
+@indicator('m_price_sf1', inputs=('m_price',))
+def _m_price_sf1(m_price):
+    return _shift(m_price)
+
+
+@indicator('h_m', inputs=('high', 'm_price_sf1'))
+def _h_m(high, m_price_sf1):
+    return high - np.minimum(m_price_sf1, high)
+
+
+@indicator('m_l', inputs=('low', 'm_price_sf1'))
+def _m_l(low, m_price_sf1):
+    return m_price_sf1 - np.minimum(m_price_sf1, low)
+
+
+@indicator('cr', inputs=('h_m', 'm_l'))
+def _cr(h_m, m_l):
+    return _nan0(SUM(h_m, 26) / SUM(m_l, 26)) * 100
+
+
+@indicator('cr-ma1', inputs=('cr',))
+def _cr_ma1(cr):
+    return _nan0(MA(cr, 5))
+
+
+@indicator('cr-ma2', inputs=('cr',))
+def _cr_ma2(cr):
+    return _nan0(MA(cr, 10))
+
+
+@indicator('cr-ma3', inputs=('cr',))
+def _cr_ma3(cr):
+    return _nan0(MA(cr, 20))
+
+
+# rsi
+@indicator('rsi', inputs=('close',))
+def _rsi(close):
+    return _nan0(RSI(close, 14))
+
+
+@indicator('rsi_6', inputs=('close',))
+def _rsi_6(close):
+    return _nan0(RSI(close, 6))
+
+
+@indicator('rsi_12', inputs=('close',))
+def _rsi_12(close):
+    return _nan0(RSI(close, 12))
+
+
+@indicator('rsi_24', inputs=('close',))
+def _rsi_24(close):
+    return _nan0(RSI(close, 24))
+
+
+# vr
+@indicator('vr', inputs=('p_change', 'volume'))
+def _vr(p_change, volume):
+    avs = SUM(np.where(p_change > 0, volume, 0.0), 26)
+    bvs = SUM(np.where(p_change < 0, volume, 0.0), 26)
+    cvs = SUM(np.where(p_change == 0, volume, 0.0), 26)
+    return _nan0((avs + cvs / 2) / (bvs + cvs / 2)) * 100
+
+
+@indicator('vr_6_sma', inputs=('vr',))
+def _vr_6_sma(vr):
+    return _nan0(MA(vr, 6))
+
+
+# atr
+@indicator('prev_close', inputs=('close',))
+def _prev_close(close):
+    return _shift(close)
+
+
+@indicator('h_l', inputs=('high', 'low'))
+def _h_l(high, low):
+    return high - low
+
+
+@indicator('h_cy', inputs=('high', 'prev_close'))
+def _h_cy(high, prev_close):
+    return high - prev_close
+
+
+@indicator('cy_l', inputs=('prev_close', 'low'))
+def _cy_l(prev_close, low):
+    return prev_close - low
+
+
+@indicator('tr', inputs=('h_l', 'h_cy', 'cy_l'))
+def _tr(h_l, h_cy, cy_l):
+    # 同 DataFrame 按行取最大值，忽略 NaN
+    return _nan0(np.fmax(np.fmax(h_l, np.abs(h_cy)), np.abs(cy_l)))
+
+
+@indicator('atr', inputs=('high', 'low', 'close'))
+def _atr(high, low, close):
+    return _nan0(ATR(high, low, close, 14))
+
+
+# dmi，stockstats计算公式
+@indicator('high_m', 'low_m', inputs=('high', 'low'))
+def _high_low_m(high, low):
+    high_delta = _diff(high)
+    low_delta = -_diff(low)
+    return (high_delta + np.abs(high_delta)) / 2, (low_delta + np.abs(low_delta)) / 2
+
+
+@indicator('pdi', inputs=('high_m', 'low_m', 'atr'))
+def _pdi(high_m, low_m, atr):
+    pdm = _nan0(EMA(np.where(high_m > low_m, high_m, 0.0), 14))
+    return _nan0(pdm / atr) * 100
+
+
+@indicator('mdi', inputs=('high_m', 'low_m', 'atr'))
+def _mdi(high_m, low_m, atr):
+    mdm = _nan0(EMA(np.where(low_m > high_m, low_m, 0.0), 14))
+    return _nan0(mdm / atr) * 100
+
+
+@indicator('dx', inputs=('pdi', 'mdi'))
+def _dx(pdi, mdi):
+    return _nan0(np.abs(pdi - mdi) / (pdi + mdi)) * 100
+
+
+@indicator('adx', inputs=('dx',))
+def _adx(dx):
+    return _nan0(EMA(dx, 6))
+
+
+@indicator('adxr', inputs=('adx',))
+def _adxr(adx):
+    return _nan0(EMA(adx, 6))
+
+
+# wr
+@indicator('wr_6', inputs=('high', 'low', 'close'))
+def _wr_6(high, low, close):
+    return _nan0(WILLR(high, low, close, 6))
+
+
+@indicator('wr_10', inputs=('high', 'low', 'close'))
+def _wr_10(high, low, close):
+    return _nan0(WILLR(high, low, close, 10))
+
+
+@indicator('wr_14', inputs=('high', 'low', 'close'))
+def _wr_14(high, low, close):
+    return _nan0(WILLR(high, low, close, 14))
+
+
+# cci 计算方法和结果和stockstats不同，stockstats典型价采用均价(总额/成交量)计算
+@indicator('cci', inputs=('high', 'low', 'close'))
+def _cci(high, low, close):
+    return _nan0(CCI(high, low, close, 14))
+
+
+@indicator('cci_84', inputs=('high', 'low', 'close'))
+def _cci_84(high, low, close):
+    return _nan0(CCI(high, low, close, 84))
+
+
+# dma
+@indicator('ma10', inputs=('close',))
+def _ma10(close):
+    return _nan0(MA(close, 10))
+
+
+@indicator('ma50', inputs=('close',))
+def _ma50(close):
+    return _nan0(MA(close, 50))
+
+
+@indicator('dma', inputs=('ma10', 'ma50'))
+def _dma(ma10, ma50):
+    return ma10 - ma50
+
+
+@indicator('dma_10_sma', inputs=('dma',))
+def _dma_10_sma(dma):
+    return _nan0(MA(dma, 10))
+
+
+# tema
+@indicator('tema', inputs=('close',))
+def _tema(close):
+    return _nan0(TEMA(close, 14))
+
+
+# mfi 计算方法和结果和stockstats不同，stockstats典型价采用均价(总额/成交量)计算
+@indicator('mfi', inputs=('high', 'low', 'close', 'volume'))
+def _mfi(high, low, close, volume):
+    return _nan0(MFI(high, low, close, volume, 14))
+
+
+@indicator('mfisma', inputs=('mfi',))
+def _mfisma(mfi):
+    return MA(mfi, 6)
+
+
+# vwma
+@indicator('vwma', inputs=('amount', 'volume'))
+def _vwma(amount, volume):
+    return _nan0(SUM(amount, 14) / SUM(volume, 14))
+
+
+@indicator('mvwma', inputs=('vwma',))
+def _mvwma(vwma):
+    return MA(vwma, 6)
+
+
+# ppo
+@indicator('ppo', inputs=('close',))
+def _ppo(close):
+    return _nan0(PPO(close, 12, 26))
+
+
+@indicator('ppos', inputs=('ppo',))
+def _ppos(ppo):
+    return _nan0(EMA(ppo, 9))
+
+
+@indicator('ppoh', inputs=('ppo', 'ppos'))
+def _ppoh(ppo, ppos):
+    return ppo - ppos
+
+
+# stochrsi，stockstats计算公式
+@indicator('stochrsi_k', inputs=('rsi',))
+def _stochrsi_k(rsi):
+    rsi_min = MIN(rsi, 14)
+    return _nan0((rsi - rsi_min) / (MAX(rsi, 14) - rsi_min)) * 100
+
+
+@indicator('stochrsi_d', inputs=('stochrsi_k',))
+def _stochrsi_d(stochrsi_k):
+    return MA(stochrsi_k, 3)
+
+
+# wt
+@indicator('wt1', inputs=('m_price',))
+def _wt1(m_price):
+    esa = _nan0(EMA(m_price, 10))
+    esa_d = EMA(np.abs(m_price - esa), 10)
+    esa_ci = _nan0((m_price - esa) / (0.015 * esa_d))
+    return _nan0(EMA(esa_ci, 21))
+
+
+@indicator('wt2', inputs=('wt1',))
+def _wt2(wt1):
+    return _nan0(MA(wt1, 4))
+
+
+# supertrend
+@indicator('hl_avg', inputs=('high', 'low'))
+def _hl_avg(high, low):
+    return (high + low) / 2.0
+
+
+@indicator('supertrend_ub', 'supertrend_lb', 'supertrend', inputs=('close', 'hl_avg', 'atr'))
+def _supertrend(close, hl_avg, atr):
+    m_atr = atr * 3
+    return SUPERTREND(close, hl_avg + m_atr, hl_avg - m_atr)
+
+
+# ----------stockstats没有以下指标-----------------
+# roc
+@indicator('roc', inputs=('close',))
+def _roc(close):
+    return _nan0(ROC(close, 12))
+
+
+@indicator('rocma', inputs=('roc',))
+def _rocma(roc):
+    return _nan0(MA(roc, 6))
+
+
+@indicator('rocema', inputs=('roc',))
+def _rocema(roc):
+    return _nan0(EMA(roc, 9))
+
+
+# obv
+@indicator('obv', inputs=('close', 'volume'))
+def _obv(close, volume):
+    return _nan0(OBV(close, volume))
+
+
+# sar
+@indicator('sar', inputs=('high', 'low'))
+def _sar(high, low):
+    return _nan0(SAR(high, low))
+
+
+# psy
+@indicator('psy', inputs=('close', 'prev_close'))
+def _psy(close, prev_close):
+    price_up = np.where(close > prev_close, 1.0, 0.0)
+    return _nan0(SUM(price_up, 12) / 12.0) * 100
+
+
+@indicator('psyma', inputs=('psy',))
+def _psyma(psy):
+    return MA(psy, 6)
+
+
+# brar
+@indicator('ar', inputs=('open', 'high', 'low'))
+def _ar(open, high, low):
+    return _nan0(SUM(high - open, 26) / SUM(open - low, 26)) * 100
+
+
+@indicator('br', inputs=('h_cy', 'cy_l'))
+def _br(h_cy, cy_l):
+    return _nan0(SUM(h_cy, 26) / SUM(cy_l, 26)) * 100
+
+
+# emv
+@indicator('prev_high', inputs=('high',))
+def _prev_high(high):
+    return _shift(high)
+
+
+@indicator('prev_low', inputs=('low',))
+def _prev_low(low):
+    return _shift(low)
+
+
+@indicator('emv', inputs=('hl_avg', 'prev_high', 'prev_low', 'h_l', 'amount'))
+def _emv(hl_avg, prev_high, prev_low, h_l, amount):
+    phl_avg = (prev_high + prev_low) / 2.0
+    return _nan0(SUM((hl_avg - phl_avg) * h_l / amount, 14))
+
+
+@indicator('emva', inputs=('emv',))
+def _emva(emv):
+    return _nan0(MA(emv, 9))
+
+
+# bias
+@indicator('ma6', inputs=('close',))
+def _ma6(close):
+    return _nan0(MA(close, 6))
+
+
+@indicator('ma12', inputs=('close',))
+def _ma12(close):
+    return _nan0(MA(close, 12))
+
+
+@indicator('ma24', inputs=('close',))
+def _ma24(close):
+    return _nan0(MA(close, 24))
+
+
+@indicator('bias', inputs=('close', 'ma6'))
+def _bias(close, ma6):
+    return _nan0((close - ma6) / ma6) * 100
+
+
+@indicator('bias_12', inputs=('close', 'ma12'))
+def _bias_12(close, ma12):
+    return _nan0((close - ma12) / ma12) * 100
+
+
+@indicator('bias_24', inputs=('close', 'ma24'))
+def _bias_24(close, ma24):
+    return _nan0((close - ma24) / ma24) * 100
+
+
+# dpo
+@indicator('dpo', inputs=('close',))
+def _dpo(close):
+    return _nan0(close - _shift(MA(close, 11)))
+
+
+@indicator('madpo', inputs=('dpo',))
+def _madpo(dpo):
+    return _nan0(MA(dpo, 6))
+
+
+# vhf
+@indicator('vhf', inputs=('close', 'prev_close'))
+def _vhf(close, prev_close):
+    hcp_lcp = _nan0(MAX(close, 28) - MIN(close, 28))
+    return _nan0(np.divide(hcp_lcp, SUM(np.abs(close - prev_close), 28)))
+
+
+# rvi
+@indicator('rvi', inputs=('open', 'close', 'high', 'low', 'prev_close', 'prev_high', 'prev_low'))
+def _rvi(open, close, high, low, prev_close, prev_high, prev_low):
+    rvi_x = ((close - open) + 2 * (prev_close - _shift(open)) + 2 * (_shift(close, 2) - _shift(open, 2)) +
+             (_shift(close, 3) - _shift(open, 3))) / 6
+    rvi_y = ((high - low) + 2 * (prev_high - prev_low) + 2 * (_shift(high, 2) - _shift(low, 2)) +
+             (_shift(high, 3) - _shift(low, 3))) / 6
+    return _nan0(MA(rvi_x, 10) / MA(rvi_y, 10))
+
+
+@indicator('rvis', inputs=('rvi',))
+def _rvis(rvi):
+    return (rvi + 2 * _shift(rvi) + 2 * _shift(rvi, 2) + _shift(rvi, 3)) / 6
+
+
+# fi
+@indicator('fi', inputs=('close', 'volume'))
+def _fi(close, volume):
+    return _diff(close) * volume
+
+
+@indicator('force_2', inputs=('fi',))
+def _force_2(fi):
+    return _nan0(EMA(fi, 2))
+
+
+@indicator('force_13', inputs=('fi',))
+def _force_13(fi):
+    return _nan0(EMA(fi, 13))
+
+
+# ene
+@indicator('ene_ue', inputs=('ma10',))
+def _ene_ue(ma10):
+    return (1 + 11 / 100) * ma10
+
+
+@indicator('ene_le', inputs=('ma10',))
+def _ene_le(ma10):
+    return (1 - 9 / 100) * ma10
+
+
+@indicator('ene', inputs=('ene_ue', 'ene_le'))
+def _ene(ene_ue, ene_le):
+    return (ene_ue + ene_le) / 2
+
+
+# vol
+@indicator('vol_5', inputs=('volume',))
+def _vol_5(volume):
+    return _nan0(MA(volume, 5))
+
+
+@indicator('vol_10', inputs=('volume',))
+def _vol_10(volume):
+    return _nan0(MA(volume, 10))
+
+
+# ma
+@indicator('ma20', inputs=('close',))
+def _ma20(close):
+    return _nan0(MA(close, 20))
+
+
+@indicator('ma200', inputs=('close',))
+def _ma200(close):
+    return _nan0(MA(close, 200))
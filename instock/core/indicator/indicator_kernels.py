@@ -0,0 +1,570 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import numpy as np
+import talib as tl
+from numpy.lib.stride_tricks import sliding_window_view
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+# 指标计算的基础函数，输入输出均为 (股票 × 时间) 二维数组，沿 axis=1 计算，未定义的位置为 NaN。
+# 多只股票时按 TA-Lib 的算法实现(起始位置、EMA初值、除零处理、求和顺序)，结果与逐只调用 TA-Lib 一致；
+# 只有一只股票时直接调用 TA-Lib，保留原来逐只计算时对 NaN 等异常数据的处理。
+# 在 kernel_state 中调用时，各函数结束时保存状态(递推值、窗口内最近的输入)，下次从该状态继续计算新的K线。
+
+_local = threading.local()
+
+
+class kernel_state:
+    """
+    增量计算的状态。with 块中计算指标时，各基础函数按调用顺序读取上次的状态、保存本次的状态；
+    同一组指标每次调用基础函数的顺序相同。states 为 None 时从头计算，计算的K线数需大于各指标的起始位置。
+    """
+
+    def __init__(self, states=None, offset=0):
+        self.states = states  # 上次的状态，每次调用一个元组
+        self.offset = offset  # 上次状态之前已计算的K线数
+        self.result = []
+
+    def __enter__(self):
+        _local.context = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _local.context = None
+
+    def load(self):
+        if self.states is None:
+            return None
+        if len(self.result) >= len(self.states):
+            raise ValueError("增量计算的状态与指标不一致，需要重新计算")
+        return self.states[len(self.result)]
+
+    def store(self, state):
+        self.result.append(state)
+
+
+def _context():
+    return getattr(_local, 'context', None)
+
+
+def _load():
+    # 先调用依赖的基础函数，再读取自身的状态，保证读取和保存的顺序一致
+    ctx = _context()
+    return None if ctx is None else ctx.load()
+
+
+def _store(*state):
+    ctx = _context()
+    if ctx is not None:
+        ctx.store(state)
+
+
+def _begin(i):
+    # 起始位置，增量计算时已越过
+    ctx = _context()
+    return i if ctx is None else max(i - ctx.offset, 0)
+
+
+def _offset():
+    ctx = _context()
+    return 0 if ctx is None else ctx.offset
+
+
+def _single(x):
+    return x.shape[0] == 1 and _context() is None
+
+
+def _row(v):
+    return v[None, :]
+
+
+def _full(x):
+    return np.full(x.shape, np.nan, order='F')
+
+
+def _concat(head, x):
+    return np.asfortranarray(np.concatenate((head, x), axis=1))
+
+
+def _shift(x, k=1):
+    # 同 pandas shift(k, fill_value=0.0)
+    state = _load()
+    data = _concat(np.zeros((x.shape[0], k)) if state is None else state[0], x)
+    _store(data[:, -k:])
+    return data[:, :x.shape[1]]
+
+
+def _diff(x):
+    # 同 np.insert(np.diff(x), 0, 0.0)
+    state = _load()
+    data = _concat(x[:, :1] if state is None else state[0], x)
+    _store(data[:, -1:])
+    out = data[:, 1:] - data[:, :-1]
+    if state is None:
+        out[:, 0] = 0.0
+    return out
+
+
+def _nan0(x):
+    x[~np.isfinite(x)] = 0.0
+    return x
+
+
+def _window(x, n, func):
+    # 窗口不满 n 个时为 NaN
+    state = _load()
+    data = _concat(np.full((x.shape[0], n - 1), np.nan) if state is None else state[0], x)
+    _store(data[:, data.shape[1] - n + 1:])
+    return np.asfortranarray(func(sliding_window_view(data, n, axis=1), axis=-1))
+
+
+def _seq_sum(x, start, stop):
+    # 按时间顺序逐列累加，与 TA-Lib 的求和顺序相同(numpy 的 sum 为两两求和，舍入不同)
+    total = np.zeros(x.shape[0])
+    for i in range(start, stop):
+        total = total + x[:, i]
+    return total
+
+
+def SUM(x, n):
+    if _single(x):
+        return _row(tl.SUM(x[0], timeperiod=n))
+    # TA-Lib 的滑动求和：先加入新值输出，再减去最早的值，保留相同的舍入误差
+    out = _full(x)
+    state = _load()
+    if state is None:
+        if x.shape[1] < n:
+            return out
+        total = _seq_sum(x, 0, n - 1)
+        data = x
+    else:
+        total = state[0]
+        data = _concat(state[1], x)
+    offset = data.shape[1] - x.shape[1]
+    for i in range(n - 1, data.shape[1]):
+        total = total + data[:, i]
+        out[:, i - offset] = total
+        total = total - data[:, i - n + 1]
+    _store(total, data[:, data.shape[1] - n + 1:])
+    return out
+
+
+def MA(x, n):
+    if _single(x):
+        return _row(tl.MA(x[0], timeperiod=n))
+    return SUM(x, n) / n
+
+
+def MAX(x, n):
+    if _single(x):
+        return _row(tl.MAX(x[0], timeperiod=n))
+    return _window(x, n, np.max)
+
+
+def MIN(x, n):
+    if _single(x):
+        return _row(tl.MIN(x[0], timeperiod=n))
+    return _window(x, n, np.min)
+
+
+def EMA(x, n, seed=None):
+    """
+    :param seed: 初值位置，初值为截止该位置的 n 个数的简单平均，默认 n-1；
+                 TA-Lib 的 MACD 中快线与慢线从同一位置开始，快线的初值位置为慢线的 n-1
+    """
+    if seed is None and _single(x):
+        return _row(tl.EMA(x[0], timeperiod=n))
+    seed = n - 1 if seed is None else seed
+    out = _full(x)
+    k = 2.0 / (n + 1)
+    state = _load()
+    if state is None:
+        if x.shape[1] <= seed:
+            return out
+        e = _seq_sum(x, seed - n + 1, seed + 1) / n
+        out[:, seed] = e
+        start = seed + 1
+    else:
+        e = state[0]
+        start = 0
+    for t in range(start, x.shape[1]):
+        e = (x[:, t] - e) * k + e
+        out[:, t] = e
+    _store(e)
+    return out
+
+
+def _ema_chain(x, n, count):
+    # 多重EMA，每一重从上一重的第一个有效值开始
+    result = []
+    seed = n - 1
+    for i in range(count):
+        x = EMA(x, n, seed)
+        result.append(x)
+        seed += n - 1
+    return result
+
+
+def MACD(close, fast=12, slow=26, signal=9):
+    if _single(close):
+        return tuple(_row(v) for v in tl.MACD(close[0], fastperiod=fast, slowperiod=slow, signalperiod=signal))
+    s = slow - 1
+    macd = EMA(close, fast, s) - EMA(close, slow, s)
+    macds = EMA(macd, signal, s + signal - 1)
+    macd[:, :_begin(s + signal - 1)] = np.nan
+    return macd, macds, macd - macds
+
+
+def PPO(close, fast=12, slow=26):
+    if _single(close):
+        return _row(tl.PPO(close[0], fastperiod=fast, slowperiod=slow, matype=1))
+    slow_ma = EMA(close, slow)
+    out = (EMA(close, fast) - slow_ma) / slow_ma * 100
+    begin = _begin(slow - 1)
+    out[:, :begin] = np.nan
+    out[:, begin:][slow_ma[:, begin:] == 0] = 0.0
+    return out
+
+
+def STOCH(high, low, close, fastk=9, slowk=5, slowd=5):
+    if _single(close):
+        return tuple(_row(v) for v in tl.STOCH(high[0], low[0], close[0], fastk_period=fastk, slowk_period=slowk,
+                                               slowk_matype=1, slowd_period=slowd, slowd_matype=1))
+    hh = MAX(high, fastk)
+    ll = MIN(low, fastk)
+    diff = (hh - ll) / 100.0
+    fast = np.where(diff != 0, (close - ll) / diff, 0.0)
+    fast[:, :_begin(fastk - 1)] = np.nan
+    k = EMA(fast, slowk, fastk + slowk - 2)
+    d = EMA(k, slowd, fastk + slowk + slowd - 3)
+    k[:, :_begin(fastk + slowk + slowd - 3)] = np.nan
+    return k, d
+
+
+def BBANDS(close, n=20, nbdev=2.0):
+    if _single(close):
+        return tuple(_row(v) for v in tl.BBANDS(close[0], timeperiod=n, nbdevup=nbdev, nbdevdn=nbdev, matype=0))
+    mid = MA(close, n)
+    var = SUM(close * close, n) / n - mid * mid
+    std = np.where(var < 0.00000001, 0.0, np.sqrt(np.maximum(var, 0.0)))
+    return mid + std * nbdev, mid, mid - std * nbdev
+
+
+def TRIX(close, n=12):
+    if _single(close):
+        return _row(tl.TRIX(close[0], timeperiod=n))
+    e3 = _ema_chain(close, n, 3)[2]
+    return ROC(e3, 1)
+
+
+def TEMA(close, n=14):
+    if _single(close):
+        return _row(tl.TEMA(close[0], timeperiod=n))
+    e1, e2, e3 = _ema_chain(close, n, 3)
+    out = 3 * e1 - 3 * e2 + e3
+    out[:, :_begin(3 * (n - 1))] = np.nan
+    return out
+
+
+def ROC(x, n):
+    if _single(x):
+        return _row(tl.ROC(x[0], timeperiod=n))
+    state = _load()
+    data = _concat(np.full((x.shape[0], n), np.nan) if state is None else state[0], x)
+    _store(data[:, -n:])
+    prev = data[:, :-n]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.where(prev != 0, (data[:, n:] / prev - 1.0) * 100.0, 0.0)
+    out[np.isnan(prev)] = np.nan
+    return np.asfortranarray(out)
+
+
+def RSI(close, n):
+    if _single(close):
+        return _row(tl.RSI(close[0], timeperiod=n))
+    out = _full(close)
+    state = _load()
+    # delta[:, t] 为第 t 根K线相对前一根的变化
+    if state is None:
+        if close.shape[1] <= n:
+            return out
+        delta = np.zeros_like(close)
+        delta[:, 1:] = close[:, 1:] - close[:, :-1]
+    else:
+        delta = close - _concat(state[2], close)[:, :-1]
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+
+    def _value(g, l):
+        s = g + l
+        return np.where((s > -0.00000001) & (s < 0.00000001), 0.0, 100.0 * (g / np.where(s == 0, 1.0, s)))
+
+    if state is None:
+        g = _seq_sum(gain, 1, n + 1) / n
+        l = _seq_sum(loss, 1, n + 1) / n
+        out[:, n] = _value(g, l)
+        start = n + 1
+    else:
+        g, l = state[0], state[1]
+        start = 0
+    for t in range(start, close.shape[1]):
+        g = (g * (n - 1) + gain[:, t]) / n
+        l = (l * (n - 1) + loss[:, t]) / n
+        out[:, t] = _value(g, l)
+    _store(g, l, close[:, -1:])
+    return out
+
+
+def TRANGE(high, low, close):
+    if _single(close):
+        return _row(tl.TRANGE(high[0], low[0], close[0]))
+    state = _load()
+    prev = _concat(np.full((close.shape[0], 1), np.nan) if state is None else state[0], close)[:, :-1]
+    _store(close[:, -1:])
+    return np.maximum(np.maximum(high - low, np.abs(high - prev)), np.abs(low - prev))
+
+
+def ATR(high, low, close, n=14):
+    if _single(close):
+        return _row(tl.ATR(high[0], low[0], close[0], timeperiod=n))
+    out = _full(close)
+    tr = TRANGE(high, low, close)
+    state = _load()
+    if state is None:
+        if close.shape[1] <= n:
+            return out
+        a = _seq_sum(tr, 1, n + 1) / n
+        out[:, n] = a
+        start = n + 1
+    else:
+        a = state[0]
+        start = 0
+    for t in range(start, close.shape[1]):
+        a = (a * (n - 1) + tr[:, t]) / n
+        out[:, t] = a
+    _store(a)
+    return out
+
+
+def WILLR(high, low, close, n):
+    if _single(close):
+        return _row(tl.WILLR(high[0], low[0], close[0], timeperiod=n))
+    hh = MAX(high, n)
+    ll = MIN(low, n)
+    diff = (hh - ll) / -100.0
+    out = np.where(diff != 0, (hh - close) / np.where(diff == 0, 1.0, diff), 0.0)
+    out[:, :_begin(n - 1)] = np.nan
+    return out
+
+
+def CCI(high, low, close, n):
+    if _single(close):
+        return _row(tl.CCI(high[0], low[0], close[0], timeperiod=n))
+    out = _full(close)
+    tp = (high + low + close) / 3
+    state = _load()
+    if state is None:
+        if tp.shape[1] < n:
+            return out
+        data = tp
+    else:
+        data = _concat(state[0], tp)
+    offset = data.shape[1] - tp.shape[1]
+    first = _offset() - offset  # data 第一列是第几根K线
+    for j in range(n - 1, data.shape[1]):
+        # TA-Lib 用环形缓冲区保存窗口，按缓冲区的存放顺序求和，第 t 根K线存放在 t % n
+        t = first + j
+        order = j - n + 1 + (np.arange(n) - t - 1) % n
+        avg = _seq_sum(data[:, order], 0, n) / n
+        dev = _seq_sum(np.abs(data[:, order] - avg[:, None]), 0, n)
+        last = data[:, j] - avg
+        out[:, j - offset] = np.where((last != 0) & (dev != 0),
+                                      last / (0.015 * (np.where(dev == 0, 1.0, dev) / n)), 0.0)
+    _store(data[:, data.shape[1] - n + 1:])
+    return out
+
+
+def MFI(high, low, close, volume, n=14):
+    if _single(close):
+        return _row(tl.MFI(high[0], low[0], close[0], volume[0], timeperiod=n))
+    out = _full(close)
+    tp = (high + low + close) / 3
+    state = _load()
+    if state is None:
+        if tp.shape[1] <= n:
+            return out
+        delta = np.zeros_like(tp)
+        delta[:, 1:] = tp[:, 1:] - tp[:, :-1]
+    else:
+        delta = tp - _concat(state[2], tp)[:, :-1]
+    # 典型价格相同的K线计算结果有微小误差，按相等处理，与 TA-Lib 一致
+    delta[np.abs(delta) < 0.000000001 * np.abs(tp)] = 0.0
+    mf = tp * volume
+    pos_mf = np.where(delta > 0, mf, 0.0)
+    neg_mf = np.where(delta < 0, mf, 0.0)
+
+    def _value(pos, neg):
+        s = pos + neg
+        return np.where(s < 1.0, 0.0, 100.0 * (pos / np.where(s == 0, 1.0, s)))
+
+    if state is None:
+        pos = _seq_sum(pos_mf, 1, n + 1)
+        neg = _seq_sum(neg_mf, 1, n + 1)
+        out[:, n] = _value(pos, neg)
+        start = n + 1
+    else:
+        pos, neg = state[0], state[1]
+        pos_mf = _concat(state[3], pos_mf)
+        neg_mf = _concat(state[4], neg_mf)
+        start = n
+    offset = pos_mf.shape[1] - tp.shape[1]
+    for j in range(start, pos_mf.shape[1]):
+        pos = pos - pos_mf[:, j - n]
+        neg = neg - neg_mf[:, j - n]
+        pos = pos + pos_mf[:, j]
+        neg = neg + neg_mf[:, j]
+        out[:, j - offset] = _value(pos, neg)
+    _store(pos, neg, tp[:, -1:], pos_mf[:, -n:], neg_mf[:, -n:])
+    return out
+
+
+def OBV(close, volume):
+    if _single(close):
+        return _row(tl.OBV(close[0], volume[0]))
+    state = _load()
+    if state is None:
+        prev, last = close[:, :-1], volume[:, 0]
+        close_, volume_ = close[:, 1:], volume[:, 1:]
+    else:
+        prev, last = _concat(state[0], close)[:, :-1], state[1]
+        close_, volume_ = close, volume
+    signed = np.where(close_ > prev, volume_, np.where(close_ < prev, -volume_, 0.0))
+    out = np.empty_like(close)
+    values = last[:, None] + np.cumsum(signed, axis=1)
+    if state is None:
+        out[:, 0] = last
+        out[:, 1:] = values
+    else:
+        out[:, :] = values
+    _store(close[:, -1:], out[:, -1])
+    return out
+
+
+def SAR(high, low, acceleration=0.02, maximum=0.2):
+    if _single(high):
+        return _row(tl.SAR(high[0], low[0], acceleration=acceleration, maximum=maximum))
+    n, size = high.shape
+    out = np.full((n, size), np.nan)
+    state = _load()
+    if state is None:
+        if size < 2:
+            return out
+        # 由前两根K线的 -DM 判断初始方向
+        diff_m = low[:, 0] - low[:, 1]
+        diff_p = high[:, 1] - high[:, 0]
+        is_long = ~((diff_m > 0) & (diff_p < diff_m))
+        af = np.full(n, acceleration)
+        ep = np.where(is_long, high[:, 1], low[:, 1])
+        sar = np.where(is_long, low[:, 0], high[:, 0])
+        new_low, new_high = low[:, 1], high[:, 1]
+        start = 1
+    else:
+        is_long, af, ep, sar, new_low, new_high = state
+        start = 0
+    for t in range(start, size):
+        prev_low, prev_high = new_low, new_high
+        new_low, new_high = low[:, t], high[:, t]
+        # 多头
+        to_short = is_long & (new_low <= sar)
+        keep_long = is_long & ~to_short
+        # 空头
+        to_long = ~is_long & (new_high >= sar)
+        keep_short = ~is_long & ~to_long
+
+        o = sar.copy()
+        s = np.where(to_short, np.maximum(np.maximum(ep, prev_high), new_high), sar)
+        s = np.where(to_long, np.minimum(np.minimum(ep, prev_low), new_low), s)
+        o = np.where(to_short | to_long, s, o)
+        out[:, t] = o
+
+        ep_new = np.where(to_short, new_low, np.where(to_long, new_high, ep))
+        up = keep_long & (new_high > ep)
+        down = keep_short & (new_low < ep)
+        ep_new = np.where(up, new_high, np.where(down, new_low, ep_new))
+        af = np.where(to_short | to_long, acceleration, np.where(up | down, np.minimum(af + acceleration, maximum), af))
+        ep = ep_new
+        s = s + af * (ep - s)
+        long_now = keep_long | to_long
+        s = np.where(long_now, np.minimum(np.minimum(s, prev_low), new_low),
+                     np.maximum(np.maximum(s, prev_high), new_high))
+        sar = s
+        is_long = long_now
+    _store(is_long, af, ep, sar, new_low, new_high)
+    return out
+
+
+def _supertrend_row(close, b_ub, b_lb, state):
+    # 一只股票时逐根K线用 Python 浮点数计算，比每根K线调用多次 numpy 快一个数量级
+    close, b_ub, b_lb = close.tolist(), b_ub.tolist(), b_lb.tolist()
+    size = len(close)
+    ub, lb, st = [0.0] * size, [0.0] * size, [0.0] * size
+    if state is None:
+        last_close, last_ub, last_lb = close[0], b_ub[0], b_lb[0]
+        last_st = last_ub if last_close <= last_ub else last_lb
+        ub[0], lb[0], st[0] = last_ub, last_lb, last_st
+        start = 1
+    else:
+        last_close, last_ub, last_lb, last_st = (float(v[0]) for v in state)
+        start = 0
+    nan = float('nan')
+    for i in range(start, size):
+        curr_close = close[i]
+        curr_ub = b_ub[i] if b_ub[i] < last_ub or last_close > last_ub else last_ub
+        curr_lb = b_lb[i] if b_lb[i] > last_lb or last_close < last_lb else last_lb
+        if last_st == last_ub:
+            curr_st = curr_ub if curr_close <= curr_ub else curr_lb
+        elif last_st == last_lb:
+            curr_st = curr_lb if curr_close > curr_lb else curr_ub
+        else:
+            curr_st = nan
+        ub[i], lb[i], st[i] = curr_ub, curr_lb, curr_st
+        last_close, last_ub, last_lb, last_st = curr_close, curr_ub, curr_lb, curr_st
+    state = tuple(np.array([v]) for v in (last_close, last_ub, last_lb, last_st))
+    return np.array(ub), np.array(lb), np.array(st), state
+
+
+def SUPERTREND(close, b_ub, b_lb):
+    """
+    :return: 上轨、下轨、supertrend，与 calculate_indicator 原来逐根K线的计算一致(无法判断时为 NaN)
+    """
+    state = _load()
+    if close.shape[0] == 1:
+        ub, lb, st, state = _supertrend_row(close[0], b_ub[0], b_lb[0], state)
+        _store(*state)
+        return _row(ub), _row(lb), _row(st)
+    # 多只股票时逐根K线推进，每次计算所有股票，按列存放使每根K线的数据连续
+    n, size = close.shape
+    ub = np.empty((n, size), order='F')
+    lb = np.empty((n, size), order='F')
+    st = np.empty((n, size), order='F')
+    if state is None:
+        last_close, last_ub, last_lb = close[:, 0], b_ub[:, 0], b_lb[:, 0]
+        last_st = np.where(last_close <= last_ub, last_ub, last_lb)
+        ub[:, 0], lb[:, 0], st[:, 0] = last_ub, last_lb, last_st
+        start = 1
+    else:
+        last_close, last_ub, last_lb, last_st = state
+        start = 0
+    for i in range(start, size):
+        curr_close = close[:, i]
+        curr_ub = np.where((b_ub[:, i] < last_ub) | (last_close > last_ub), b_ub[:, i], last_ub)
+        curr_lb = np.where((b_lb[:, i] > last_lb) | (last_close < last_lb), b_lb[:, i], last_lb)
+        curr_st = np.where(last_st == last_ub, np.where(curr_close <= curr_ub, curr_ub, curr_lb),
+                           np.where(last_st == last_lb, np.where(curr_close > curr_lb, curr_lb, curr_ub), np.nan))
+        ub[:, i], lb[:, i], st[:, i] = curr_ub, curr_lb, curr_st
+        last_close, last_ub, last_lb, last_st = curr_close, curr_ub, curr_lb, curr_st
+    _store(last_close, last_ub, last_lb, last_st)
+    return ub, lb, st
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os.path
+import json
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import instock.core.tablestructure as tbs
+import instock.core.indicator.calculate_indicator as idr
+import instock.core.indicator.calculate_indicator_incremental as idri
+import instock.core.indicator.indicator_graph as idg
+import instock.core.pattern.pattern_recognitions as kpr
+import instock.core.pattern.pattern_recognitions_batch as kprb
+import instock.core.kline.indicator_web_dic as iwd
+from instock.core.stock_hist_store import get_bucket
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+# K线图使用的指标和K线形态数据，按股票保存为 Arrow IPC 文件，以最后一根K线的日期和收盘价为键。
+# 每日指标作业全部股票批量计算后保存，网页图表直接读取并截取最近 kline_data_threshold 根K线，
+# 没有或已过期(如复权价格变化)时才逐只计算并保存。
+# 每只股票只有一个文件，不放在 cache_manager 管理的历史行情缓存目录下，不占用其容量。
+cpath_current = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+kline_data_path = os.path.join(cpath_current, 'cache', 'kline')
+kline_data_threshold = 120  # 图中的K线数
+kline_data_bars = 360  # 保存的K线数，指标和形态均使用全部K线计算
+kline_data_chunk = 500  # 每日作业每批计算的股票数，控制中间结果占用的内存
+kline_data_prepare = True  # 每日指标作业是否计算保存全部股票的图表数据
+
+# 使用环境变量配置,docker -e 传递
+_kline_data_path = os.environ.get('kline_data_path')
+if _kline_data_path is not None:
+    kline_data_path = _kline_data_path
+_kline_data_prepare = os.environ.get('kline_data_prepare')
+if _kline_data_prepare is not None:
+    kline_data_prepare = _kline_data_prepare.lower() in ('1', 'true', 'yes')
+
+_META_KEY = b'instock'
+
+
+def _indicator_columns():
+    # 只计算图中用到的指标
+    columns = ['ma10', 'ma20', 'ma50', 'ma200', 'vol_5', 'vol_10']
+    for conf in iwd.indicators_dic:
+        columns.extend(c for c in conf['dic'] if c != 'close' and c not in columns)
+    return columns
+
+
+def get_kline_data(stock, date=None):
+    """
+    计算图中使用的指标和K线形态
+    :param date: 截止日期字符串，None 为全部K线
+    :return: 最近 kline_data_bars 根K线的 DataFrame
+    """
+    if date is not None:
+        stock = stock.loc[stock['date'].values <= date]
+    if len(stock.index) == 0:
+        return None
+    columns = _indicator_columns()
+    data = idr.get_indicators(stock, threshold=kline_data_bars, columns=columns)
+    if data is None:
+        return None
+    data = data[list(stock.columns) + [c for c in columns if c not in stock.columns]]
+    stock_column = tbs.STOCK_KLINE_PATTERN_DATA['columns']
+    patterns = kpr.get_pattern_recognitions(stock, stock_column, threshold=kline_data_bars)
+    return pd.concat([data, patterns[[k for k in stock_column if k in patterns.columns]]], axis=1)
+
+
+def _data_file(code):
+    return os.path.join(kline_data_path, get_bucket(code), f"{code}.arrow")
+
+
+def _last_bar(stock, date=None):
+    if date is not None:
+        stock = stock.loc[stock['date'].values <= date]
+    if len(stock.index) == 0:
+        return None, None
+    return str(stock['date'].values[-1]), float(stock['close'].values[-1])
+
+
+def load_kline_data(code, stock, date=None):
+    """
+    读取保存的图表数据，最后一根K线与 stock 截止 date 的最后一根K线一致时才返回
+    """
+    data_file = _data_file(code)
+    if not os.path.isfile(data_file):
+        return None
+    try:
+        last_date, last_close = _last_bar(stock, date)
+        if last_date is None:
+            return None
+        with pa.memory_map(data_file, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+        meta = json.loads(table.schema.metadata[_META_KEY].decode('utf-8'))
+        if meta['date'] != last_date or not np.isclose(meta['close'], last_close):
+            return None
+        return table.to_pandas()
+    except Exception as e:
+        logging.error(f"kline_data.load_kline_data处理异常：{code}代码{e}")
+    return None
+
+
+def save_kline_data(code, data):
+    # data 为 DataFrame 或 Arrow 表
+    data_file = _data_file(code)
+    tmp_file = f"{data_file}.tmp"
+    try:
+        _dir = os.path.dirname(data_file)
+        if not os.path.exists(_dir):
+            os.makedirs(_dir, exist_ok=True)
+        table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+        meta = {'date': str(table['date'][-1].as_py()), 'close': float(table['close'][-1].as_py())}
+        table = table.replace_schema_metadata({_META_KEY: json.dumps(meta).encode('utf-8')})
+        with pa.OSFile(tmp_file, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_file, data_file)
+    except Exception as e:
+        logging.error(f"kline_data.save_kline_data处理异常：{code}代码{e}")
+
+
+def get_kline_data_cached(code, stock, date=None):
+    """
+    先读取保存的图表数据，没有或已过期时计算并保存
+    """
+    data = load_kline_data(code, stock, date)
+    if data is None:
+        data = get_kline_data(stock, date)
+        if data is not None and len(data.index) > 0:
+            save_kline_data(code, data)
+    return data
+
+
+def _batch_table(stock, end_date, values, i, columns, stock_column, occurrences):
+    # 一只股票保存的数据：最近 kline_data_bars 根K线、批量计算结果中的指标序列、形态序列(没有识别到为0)，
+    # 列同 get_kline_data，直接生成 Arrow 表
+    stock = stock.loc[stock['date'].values <= end_date].tail(kline_data_bars)
+    n = len(stock.index)
+    data = {col: stock[col].values for col in stock.columns}
+    for col in columns:
+        if col not in data:
+            data[col] = values[col][i, -n:]
+    patterns = {k: np.zeros(n, dtype=np.int32) for k in stock_column}
+    if occurrences is not None:
+        dates = data['date']
+        pos = np.searchsorted(dates, occurrences['date'].values)
+        ok = (pos < n)
+        ok[ok] = dates[pos[ok]] == occurrences['date'].values[ok]
+        for k, p, v in zip(occurrences['pattern'].values[ok], pos[ok], occurrences['value'].values[ok]):
+            patterns[k][p] = v
+    data.update(patterns)
+    return pa.table(data)
+
+
+def prepare_kline_data(stocks, date=None):
+    """
+    每日作业调用：计算并保存全部股票的图表数据。指标按K线数分组批量计算，形态每批只识别一次
+    :param stocks: {(date, code, name): DataFrame}，或 stock_hist_data 的面板视图
+    """
+    keys = list(stocks)
+    if not keys:
+        return
+    end_date = keys[0][0] if date is None else date.strftime("%Y-%m-%d")
+    columns = _indicator_columns()
+    stock_column = tbs.STOCK_KLINE_PATTERN_DATA['columns']
+    for c in range(0, len(keys), kline_data_chunk):
+        chunk = keys[c:c + kline_data_chunk]
+        try:
+            histories = idri.get_histories(stocks, end_date, chunk)
+            occurrences = kprb.get_pattern_occurrences(stocks, stock_column, date=date, keys=chunk)
+            occurrences = {code: occurrences.iloc[rows] for code, rows in
+                           occurrences.groupby('code', sort=False).indices.items()}
+            groups = {}
+            for k, (dates, values) in histories.items():
+                if len(dates) > 0:
+                    groups.setdefault(len(dates), []).append(k)
+            for size, group in groups.items():
+                x = np.stack([histories[k][1] for k in group], axis=1)
+                values = idg.evaluate(idri.get_base(x, np.full((len(group), 1), np.nan)), columns)
+                for i, k in enumerate(group):
+                    try:
+                        save_kline_data(k[1], _batch_table(stocks[k], end_date, values, i, columns, stock_column,
+                                                           occurrences.get(k[1])))
+                    except Exception as e:
+                        logging.error(f"kline_data.prepare_kline_data处理异常：{k[1]}代码{e}")
+        except Exception as e:
+            logging.error(f"kline_data.prepare_kline_data处理异常：{e}")
@@ -18,9 +18,8 @@ from bokeh.models import ColumnDataSource, HoverTool, CheckboxGroup, LabelSet, B
     CDSView, BooleanFilter, TabPanel, Tabs, Div, Styles, CrosshairTool, Span, BoxSelectTool, WheelZoomTool, PanTool, \
     BoxZoomTool, ZoomInTool, ZoomOutTool, RedoTool, ResetTool, SaveTool, UndoTool, Text
 import instock.core.tablestructure as tbs
-import instock.core.indicator.calculate_indicator as idr
-import instock.core.pattern.pattern_recognitions as kpr
 import instock.core.kline.indicator_web_dic as iwd
+import instock.core.kline.kline_data as kld
 
 __author__ = 'myh '
 __date__ = '2023/4/6 '
@@ -30,15 +29,13 @@ def get_plot_kline(code, stock, date, stock_name):
     plot_list = []
     try:
 
-        data = idr.get_indicators(stock, date, threshold=360)
+        # 指标和K线形态优先读取每日作业保存的数据
+        data = kld.get_kline_data_cached(code, stock, date)
         if data is None:
             return None
 
-        threshold = 120
-        stock_column = tbs.STOCK_KLINE_PATTERN_DATA['columns']
-        data = kpr.get_pattern_recognitions(data, stock_column, threshold=threshold)
-        if data is None:
-            return None
+        threshold = kld.kline_data_threshold
+        data = data.tail(n=threshold).copy()
 
         cyq_days = 210
         cyq_stock = stock.tail(n=threshold + cyq_days).copy()
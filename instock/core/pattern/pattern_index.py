@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os.path
+import json
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import instock.core.tablestructure as tbs
+import instock.core.indicator.calculate_indicator_incremental as idri
+import instock.core.pattern.pattern_recognitions_batch as kprb
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+# K线形态出现记录：(形态编号, 代码, 日期, 信号值)，信号值为形态函数的结果(100 看涨、-100 看跌等)。
+# 按月保存为 Arrow IPC 文件，代码为字典编码。先用 build_index 对全部股票的历史K线识别一次，
+# 之后每日K线形态作业追加当天的结果，研究形态时用 query_patterns 查询，不需要重新计算。
+cpath_current = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+pattern_index_path = os.path.join(cpath_current, 'cache', 'pattern_index')
+pattern_index_chunk = 500  # 每批识别的股票数
+pattern_index_bars = 30  # 每日追加时识别使用的K线数，需大于各形态函数的 lookback，结果与全部K线识别一致
+
+# 使用环境变量配置,docker -e 传递
+_pattern_index_path = os.environ.get('pattern_index_path')
+if _pattern_index_path is not None:
+    pattern_index_path = _pattern_index_path
+
+# 形态编号为在 STOCK_KLINE_PATTERN_DATA 中的顺序，文件中同时保存形态名称
+PATTERNS = list(tbs.STOCK_KLINE_PATTERN_DATA['columns'])
+_META_KEY = b'instock'
+
+
+def _month_file(month):
+    return os.path.join(pattern_index_path, f"{month}.arrow")
+
+
+def _months():
+    if not os.path.isdir(pattern_index_path):
+        return []
+    return sorted(f[:-len('.arrow')] for f in os.listdir(pattern_index_path) if f.endswith('.arrow'))
+
+
+def _read_month(month):
+    # 一个月的记录，形态编号转换为当前 PATTERNS 的编号
+    with pa.memory_map(_month_file(month), 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    patterns = json.loads(table.schema.metadata[_META_KEY].decode('utf-8'))['patterns']
+    if patterns != PATTERNS:
+        ids = np.array([PATTERNS.index(p) if p in PATTERNS else -1 for p in patterns], dtype=np.int16)
+        pattern = ids[table['pattern'].to_numpy()]
+        table = table.set_column(0, 'pattern', pa.array(pattern)).filter(pa.array(pattern >= 0))
+    return table
+
+
+def _write_month(month, data):
+    # data 列为 pattern(编号)、code、date(datetime64[D])、signal，先写临时文件再替换
+    data = data.sort_values(['date', 'pattern', 'code'], kind='stable')
+    table = pa.table({'pattern': pa.array(data['pattern'].values, pa.int16()),
+                      'code': pa.array(data['code'].values, pa.string()).dictionary_encode(),
+                      'date': pa.array(data['date'].values.astype('datetime64[D]'), pa.date32()),
+                      'signal': pa.array(data['signal'].values, pa.int16())})
+    table = table.replace_schema_metadata({_META_KEY: json.dumps({'patterns': PATTERNS}).encode('utf-8')})
+    month_file = _month_file(month)
+    tmp_file = f"{month_file}.tmp"
+    if not os.path.exists(pattern_index_path):
+        os.makedirs(pattern_index_path, exist_ok=True)
+    with pa.OSFile(tmp_file, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_file, month_file)
+
+
+def _compact(data):
+    # 识别结果转为保存的格式
+    return pd.DataFrame({'pattern': data['pattern'].map({p: i for i, p in enumerate(PATTERNS)}).values.astype(np.int16),
+                         'code': data['code'].values,
+                         'date': np.array(data['date'].values, dtype='datetime64[D]'),
+                         'signal': data['value'].values.astype(np.int16)})
+
+
+def _table_frame(table):
+    data = table.to_pandas(date_as_object=False)
+    data['code'] = data['code'].astype(object)
+    data['date'] = data['date'].values.astype('datetime64[D]')
+    return data
+
+
+def _merge(data, start):
+    # 按月写入，替换各月中 start(含)之后原有的记录
+    months = data['date'].values.astype('datetime64[M]')
+    for month in np.unique(months):
+        name = str(month)
+        part = data.loc[months == month]
+        if os.path.isfile(_month_file(name)):
+            old = _table_frame(_read_month(name))
+            part = pd.concat([old.loc[old['date'].values < start], part], ignore_index=True)
+        _write_month(name, part)
+
+
+def build_index(stocks, date=None):
+    """
+    识别全部股票截止 date 的全部历史K线上的形态，替换这段时间原有的记录
+    :param stocks: {(date, code, name): DataFrame}，或 stock_hist_data 的面板视图
+    :return: 记录数
+    """
+    keys = list(stocks)
+    if not keys:
+        return 0
+    stock_column = tbs.STOCK_KLINE_PATTERN_DATA['columns']
+    parts = []
+    for i in range(0, len(keys), pattern_index_chunk):
+        data = kprb.get_pattern_occurrences(stocks, stock_column, date=date, keys=keys[i:i + pattern_index_chunk])
+        if len(data.index) > 0:
+            parts.append(_compact(data))
+    if not parts:
+        return 0
+    data = pd.concat(parts, ignore_index=True)
+    _merge(data, data['date'].values.min())
+    return len(data.index)
+
+
+def append_index(stocks, date):
+    """
+    识别 date 当天的K线形态并追加，替换该日原有的记录，当天停牌的股票没有记录
+    :param stocks: {(date, code, name): DataFrame}，或 stock_hist_data 的面板视图
+    """
+    data = kprb.get_pattern_recognition_batch(stocks, tbs.STOCK_KLINE_PATTERN_DATA['columns'], date=date,
+                                              calc_threshold=pattern_index_bars)
+    date = np.datetime64(date.strftime("%Y-%m-%d"), 'D')
+    data = _compact(data)
+    data = data.loc[data['date'].values == date]
+    name = str(date.astype('datetime64[M]'))
+    if os.path.isfile(_month_file(name)):
+        old = _table_frame(_read_month(name))
+        data = pd.concat([old.loc[old['date'].values != date], data], ignore_index=True)
+    _write_month(name, data)
+
+
+def query_patterns(patterns=None, codes=None, start_date=None, end_date=None, signal=None):
+    """
+    查询形态出现记录
+    :param patterns: 形态列表，同 STOCK_KLINE_PATTERN_DATA 的字段名，None 为全部
+    :param codes: 代码列表，None 为全部
+    :param start_date: 开始日期(含)，datetime.date 或日期字符串
+    :param end_date: 结束日期(含)
+    :param signal: 1 只查看涨(信号值大于0)，-1 只查看跌，None 为全部
+    :return: DataFrame，列为 pattern、code、date、signal，按日期排序
+    """
+    start = None if start_date is None else np.datetime64(str(start_date), 'D')
+    end = None if end_date is None else np.datetime64(str(end_date), 'D')
+    tables = []
+    for month in _months():
+        m = np.datetime64(month, 'M')
+        if (start is not None and m < start.astype('datetime64[M]')) or \
+                (end is not None and m > end.astype('datetime64[M]')):
+            continue
+        try:
+            table = _read_month(month)
+        except Exception as e:
+            logging.error(f"pattern_index.query_patterns处理异常：{month}{e}")
+            continue
+        mask = pa.array(np.ones(table.num_rows, dtype=bool))
+        if patterns is not None:
+            mask = pc.and_(mask, pc.is_in(table['pattern'], pa.array([PATTERNS.index(p) for p in patterns], pa.int16())))
+        if codes is not None:
+            mask = pc.and_(mask, pc.is_in(table['code'].cast(pa.string()), pa.array(list(codes), pa.string())))
+        if start is not None:
+            mask = pc.and_(mask, pc.greater_equal(table['date'], pa.scalar(start.astype(object), pa.date32())))
+        if end is not None:
+            mask = pc.and_(mask, pc.less_equal(table['date'], pa.scalar(end.astype(object), pa.date32())))
+        if signal is not None:
+            mask = pc.and_(mask, pc.greater(table['signal'], 0) if signal > 0 else pc.less(table['signal'], 0))
+        tables.append(table.filter(mask))
+    if not tables:
+        return pd.DataFrame({'pattern': pd.Series(dtype=object), 'code': pd.Series(dtype=object),
+                             'date': pd.Series(dtype='datetime64[s]'), 'signal': pd.Series(dtype=np.int16)})
+    data = pd.concat([_table_frame(t) for t in tables], ignore_index=True)
+    data['pattern'] = np.array(PATTERNS, dtype=object)[data['pattern'].values]
+    return data
+
+
+def get_forward_returns(data, stocks, days=(1, 3, 5, 10, 20)):
+    """
+    在查询结果上增加形态出现后第 n 个交易日收盘价相对当日收盘价的涨跌幅(%)，列名 rate_n，之后的K线不足时为 NaN
+    :param stocks: {(date, code, name): DataFrame}，或 stock_hist_data 的面板视图
+    """
+    data = data.copy()
+    rates = {d: np.full(len(data.index), np.nan) for d in days}
+    if len(data.index) > 0 and stocks:
+        keys = {k[1]: k for k in stocks}
+        dates = data['date'].values.astype('datetime64[D]')
+        end_date = max(k[0] for k in stocks)
+        for code, rows in data.groupby('code', sort=False).indices.items():
+            if code not in keys:
+                continue
+            hist_dates, values = idri.get_histories(stocks, end_date, [keys[code]])[keys[code]]
+            hist_dates = np.array(hist_dates, dtype='datetime64[D]')
+            close = values[1]
+            pos = np.searchsorted(hist_dates, dates[rows])
+            found = pos < len(hist_dates)
+            found[found] = hist_dates[pos[found]] == dates[rows][found]
+            for d in days:
+                ok = found & (pos + d < len(hist_dates))
+                rates[d][rows[ok]] = (close[pos[ok] + d] / close[pos[ok]] - 1.0) * 100.0
+    for d in days:
+        data[f'rate_{d}'] = rates[d]
+    return data
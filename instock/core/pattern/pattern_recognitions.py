@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import logging
+import pandas as pd
 
 __author__ = 'myh '
 __date__ = '2023/3/24 '
@@ -19,15 +20,21 @@ def get_pattern_recognitions(data, stock_column, end_date=None, threshold=120, c
     if isCopy:
         data = data.copy()
 
+    # 各形态的结果一次合并到 DataFrame，逐列插入很慢
+    patterns = {}
     for k in stock_column:
         try:
-            data.loc[:, k] = stock_column[k]['func'](data['open'].values, data['high'].values, data['low'].values, data['close'].values)
+            patterns[k] = stock_column[k]['func'](data['open'].values, data['high'].values, data['low'].values, data['close'].values)
         except Exception as e:
             pass
 
     if data is None or len(data.index) == 0:
         return None
 
+    if patterns:
+        data = pd.concat([data.drop(columns=[k for k in patterns if k in data.columns]),
+                          pd.DataFrame(patterns, index=data.index)], axis=1)
+
     if threshold is not None:
         data = data.tail(n=threshold).copy()
 
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import numpy as np
+import pandas as pd
+from talib import abstract
+from instock.core.stock_panel import stock_panel_frames
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+# 全市场批量识别K线形态：把每只股票最近 calc_threshold 根K线首尾相接成一个序列，每个形态函数只调用一次，
+# 取每只股票最后一根K线的结果，与 pattern_recognitions.get_pattern_recognition 逐只计算一致。
+# 形态函数在一根K线上只用到之前 lookback 根K线，K线数大于 lookback 的股票不会用到前一只股票的K线；
+# K线数不大于 lookback 时逐只计算的结果为0，批量时也记为0，所以股票之间不需要插入间隔的K线。
+# 同样的方式可以一次识别每只股票全部历史K线上的形态，见 get_pattern_occurrences。
+
+
+def _windows(stocks, end_date, calc_threshold=None, keys=None):
+    # 每只股票截止 end_date 的最近 calc_threshold 根K线(None 为全部)的日期和开高低收，keys 为 None 时取全部股票
+    stock_keys = stocks if keys is None else keys
+    keys, dates, rows = [], [], []
+    columns = ['open', 'high', 'low', 'close']
+    if isinstance(stocks, stock_panel_frames):
+        panel = stocks.panel
+        end = np.searchsorted(panel.dates, np.datetime64(end_date, 'D'), side='right')
+        fields = [panel.field(col) for col in columns]
+        for k in stock_keys:
+            i = panel.index[k]
+            pos = np.flatnonzero(panel.valid[i, :end])
+            if calc_threshold is not None:
+                pos = pos[-calc_threshold:]
+            keys.append(k)
+            dates.append(panel.date_str[pos])
+            # 面板中价格为 float32，按两位小数还原
+            rows.append([np.round(f[i, pos].astype(np.float64), 2) for f in fields])
+    else:
+        for k in stock_keys:
+            data = stocks[k]
+            data = data.loc[data['date'].values <= end_date]
+            if calc_threshold is not None:
+                data = data.tail(calc_threshold)
+            keys.append(k)
+            dates.append(data['date'].values)
+            rows.append([data[col].values.astype(np.float64) for col in columns])
+    return keys, dates, rows
+
+
+def _empty():
+    return pd.DataFrame({'code': pd.Series(dtype=object), 'date': pd.Series(dtype=object),
+                         'pattern': pd.Series(dtype=object), 'value': pd.Series(dtype=np.int32)})
+
+
+def _scan(keys, dates, rows, stock_column, last_only):
+    # 首尾相接后每个形态函数调用一次，last_only 时只取每只股票最后一根K线的结果
+    result = [_empty()]
+    # 同逐只计算，只有1根K线的股票不识别
+    lengths = np.array([len(r[0]) for r in rows], dtype=np.int64)
+    keep = lengths > 1
+    if not keep.any():
+        return result[0]
+    # 形态函数的均值(实体、影线长度)是滚动累加的，前面股票的价格远大于后面时会留下舍入误差，
+    # 按价格排列股票，使相邻股票的价格接近
+    idx = np.flatnonzero(keep)
+    idx = idx[np.argsort([rows[i][3][-1] for i in idx], kind='stable')]
+    rows = [rows[i] for i in idx]
+    codes = np.array([keys[i][1] for i in idx], dtype=object)
+    lengths = lengths[idx]
+    ends = np.cumsum(lengths) - 1
+    if last_only:
+        dates = np.array([dates[i][-1] for i in idx], dtype=object)
+    else:
+        dates = np.concatenate([dates[i] for i in idx]).astype(object)
+        codes = np.repeat(codes, lengths)
+        # 每根K线在所属股票中的位置
+        offsets = np.arange(ends[-1] + 1) - np.repeat(ends - lengths + 1, lengths)
+    open, high, low, close = (np.concatenate([r[j] for r in rows]) for j in range(4))
+
+    for k in stock_column:
+        func = stock_column[k]['func']
+        try:
+            lookback = abstract.Function(func.__name__).lookback
+            if last_only:
+                ok = lengths > lookback
+                if not ok.any():
+                    continue
+                values = func(open, high, low, close)[ends]
+            else:
+                ok = offsets >= lookback
+                values = func(open, high, low, close)
+            hit = ok & (values != 0)
+            if hit.any():
+                result.append(pd.DataFrame({'code': codes[hit], 'date': dates[hit], 'pattern': k,
+                                            'value': values[hit]}))
+        except Exception as e:
+            logging.error(f"pattern_recognitions_batch._scan处理异常：{k}形态{e}")
+    return pd.concat(result, ignore_index=True)
+
+
+def _end_date(stocks, date):
+    if date is None:
+        return next(iter(stocks))[0]
+    return date.strftime("%Y-%m-%d")
+
+
+def get_pattern_recognition_batch(stocks, stock_column, date=None, calc_threshold=12):
+    """
+    批量识别全部股票截止 date 的K线形态
+    :param stocks: {(date, code, name): DataFrame}，或 stock_hist_data 的面板视图
+    :param stock_column: 形态，同 tablestructure.STOCK_KLINE_PATTERN_DATA['columns']
+    :return: 稀疏结果 DataFrame，列为 code、date(最后一根K线的日期)、pattern、value，只含形态值不为0的股票和形态
+    """
+    if not stocks:
+        return _empty()
+    keys, dates, rows = _windows(stocks, _end_date(stocks, date), calc_threshold)
+    return _scan(keys, dates, rows, stock_column, True)
+
+
+def get_pattern_occurrences(stocks, stock_column, date=None, start_date=None, keys=None):
+    """
+    批量识别股票截止 date 的全部K线上的形态，结果与逐只股票对全部K线调用形态函数一致
+    :param start_date: 只返回该日期(含)之后的结果，日期字符串
+    :param keys: 识别的股票，默认 stocks 的全部股票
+    :return: 稀疏结果 DataFrame，列为 code、date、pattern、value
+    """
+    if not stocks:
+        return _empty()
+    keys, dates, rows = _windows(stocks, _end_date(stocks, date), keys=keys)
+    data = _scan(keys, dates, rows, stock_column, False)
+    if start_date is not None:
+        data = data.loc[data['date'].values >= start_date].reset_index(drop=True)
+    return data
@@ -3,7 +3,10 @@
 
 import os.path
 import sys
+import time
 import random
+import threading
+import requests
 from instock.lib.singleton_type import singleton_type
 
 # 在项目运行时，临时将项目路径添加到环境变量
@@ -15,13 +18,38 @@ proxy_filename = os.path.join(cpath_current, 'config', 'proxy.txt')
 __author__ = 'myh '
 __date__ = '2025/1/6 '
 
+proxy_quarantine = 60  # 代理失败后的初始隔离秒数，连续失败时加倍
+proxy_quarantine_max = 1800  # 最长隔离秒数
+proxy_probe_interval = 30  # 后台复测被隔离代理的间隔秒数
+proxy_probe_url = 'https://data.eastmoney.com'
+_EWMA_ALPHA = 0.2  # 指数加权移动平均的新样本权重
 
-# 读取代理
+
+# 单个代理的健康状态
+class proxy_state:
+    def __init__(self, proxy):
+        self.proxy = proxy
+        self.latency = None  # 指数加权平均耗时(秒)
+        self.success = 1.0  # 指数加权成功率
+        self.failures = 0  # 连续失败次数
+        self.quarantine_until = 0.0
+
+    def score(self, default_latency):
+        latency = default_latency if self.latency is None else self.latency
+        return max(self.success, 0.01) / max(latency, 0.01)
+
+
+# 读取代理，按成功率和耗时加权选择，失败的代理隔离后由后台线程复测。
 class proxys(metaclass=singleton_type):
     def __init__(self):
+        self.data = None
+        self.states = {}
+        self.lock = threading.Lock()
+        self._thread = None
         try:
             with open(proxy_filename, "r") as file:
                 self.data = list(set(line.strip() for line in file.readlines() if line.strip()))
+            self.states = {proxy: proxy_state(proxy) for proxy in self.data}
         except Exception:
            pass
 
@@ -29,27 +57,87 @@ class proxys(metaclass=singleton_type):
         return self.data
 
     def get_proxies(self):
+        """
+        每次请求调用，返回 requests 的 proxies 参数，没有代理时返回 None
+        """
         if self.data is None or len(self.data)==0:
             return None
 
-        proxy = random.choice(self.data)
+        proxy = self.choose()
         return {"http": proxy, "https": proxy}
 
-"""
-    def get_proxies(self):
-        if self.data is None:
-            return None
+    def choose(self):
+        now = time.monotonic()
+        with self.lock:
+            states = list(self.states.values())
+            healthy = [st for st in states if st.quarantine_until <= now]
+            if not healthy:
+                # 全部被隔离时使用最早解除隔离的代理
+                return min(states, key=lambda st: st.quarantine_until).proxy
+            latencies = [st.latency for st in healthy if st.latency is not None]
+            default_latency = sorted(latencies)[len(latencies) // 2] if latencies else 1.0
+            weights = [st.score(default_latency) for st in healthy]
+        self._start_probe()
+        return random.choices(healthy, weights=weights)[0].proxy
+
+    def report(self, proxies, ok, latency=None):
+        """
+        报告一次请求的结果
+        :param proxies: get_proxies 的返回值
+        :param ok: 是否成功
+        :param latency: 耗时秒数
+        """
+        if not proxies:
+            return
+        proxy = proxies.get('http')
+        with self.lock:
+            st = self.states.get(proxy)
+            if st is None:
+                return
+            st.success = (1 - _EWMA_ALPHA) * st.success + _EWMA_ALPHA * (1.0 if ok else 0.0)
+            if ok:
+                st.failures = 0
+                if latency is not None:
+                    st.latency = latency if st.latency is None else (1 - _EWMA_ALPHA) * st.latency + _EWMA_ALPHA * latency
+            else:
+                st.failures += 1
+                st.quarantine_until = time.monotonic() + min(proxy_quarantine * 2 ** (st.failures - 1),
+                                                              proxy_quarantine_max)
+
+    def get_stats(self):
+        now = time.monotonic()
+        with self.lock:
+            return {st.proxy: {'success': round(st.success, 3),
+                               'latency': None if st.latency is None else round(st.latency, 3),
+                               'quarantined': st.quarantine_until > now} for st in self.states.values()}
 
-        while len(self.data) > 0:
-            proxy = random.choice(self.data)
-            if https_validator(proxy):
-                return {"http": proxy, "https": proxy}
-            self.data.remove(proxy)
+    def _probe(self):
+        while True:
+            time.sleep(proxy_probe_interval)
+            now = time.monotonic()
+            with self.lock:
+                quarantined = [st.proxy for st in self.states.values() if st.quarantine_until > now]
+            for proxy in quarantined:
+                start = time.monotonic()
+                ok = https_validator(proxy)
+                with self.lock:
+                    st = self.states[proxy]
+                    if ok:
+                        st.quarantine_until = 0.0
+                        st.latency = time.monotonic() - start
+                        st.success = max(st.success, 0.5)  # 恢复后给一定权重，再由真实流量调整
 
-        return None
+    # 启动后台复测线程，进程内只启动一次。
+    def _start_probe(self):
+        if self._thread is not None:
+            return
+        with self.lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._probe, daemon=True)
+            self._thread.start()
 
 
-from requests import head
 def https_validator(proxy):
     headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 6.1; WOW64; rv:34.0) Gecko/20100101 Firefox/34.0',
                'Accept': '*/*',
@@ -57,8 +145,18 @@ def https_validator(proxy):
                'Accept-Language': 'zh-CN,zh;q=0.8'}
     proxies = {"http": f"{proxy}", "https": f"{proxy}"}
     try:
-        r = head("https://data.eastmoney.com", headers=headers, proxies=proxies, timeout=3, verify=False)
-        return True if r.status_code == 200 else False
-    except Exception as e:
+        # 用独立的会话直接发送，不经过 Session.request 上的录制/回放和统计钩子
+        with requests.Session() as session:
+            req = requests.Request('HEAD', proxy_probe_url, headers=headers).prepare()
+            r = session.send(req, proxies=proxies, timeout=3, allow_redirects=False)
+        return proxy_ok(r.status_code)
+    except Exception:
         return False
-"""
\ No newline at end of file
+
+
+def proxy_ok(status):
+    """
+    经过代理的请求收到响应时代理是否可用：代理认证失败(407)和代理连不上源站(502、504)计入代理的失败，
+    源站返回的其他状态码(如429、500、503)不计入
+    """
+    return status not in (407, 502, 504)
@@ -2,58 +2,85 @@
 # -*- coding: utf-8 -*-
 
 import logging
-import concurrent.futures
 import instock.core.stockfetch as stf
 import instock.core.tablestructure as tbs
 import instock.lib.trade_time as trd
-from instock.lib.singleton_type import singleton_type
+from instock.lib.keyed_cache_type import keyed_cache_type
+from instock.core.stock_hist_store import stock_hist_store
+from instock.core.stock_panel import stock_panel
+from instock.lib.cache_manager import cache_manager
+from instock.core.eastmoney_async_fetcher import hist_fetch_concurrency
 
 __author__ = 'myh '
 __date__ = '2023/3/10 '
 
 
-# 读取当天股票数据
-class stock_data(metaclass=singleton_type):
+def _date_key(date):
+    return None if date is None else date.strftime("%Y-%m-%d")
+
+
+def _frame_size(data):
+    return int(data.memory_usage(index=True, deep=True).sum())
+
+
+# 读取当天股票数据，按日期缓存
+class stock_data(metaclass=keyed_cache_type):
     def __init__(self, date):
+        self.data = None
         try:
             self.data = stf.fetch_stocks(date)
         except Exception as e:
             logging.error(f"singleton.stock_data处理异常：{e}")
 
+    @classmethod
+    def cache_key(cls, date):
+        return _date_key(date)
+
+    def memory_size(self):
+        return 0 if self.data is None else _frame_size(self.data)
+
     def get_data(self):
         return self.data
 
 
-# 读取股票历史数据
-class stock_hist_data(metaclass=singleton_type):
-    def __init__(self, date=None, stocks=None, workers=16):
+# 读取股票历史数据，按日期、股票列表和复权方式缓存
+class stock_hist_data(metaclass=keyed_cache_type):
+    def __init__(self, date=None, stocks=None, concurrency=hist_fetch_concurrency, adjust='qfq'):
         if stocks is None:
             _subset = stock_data(date).get_data()[list(tbs.TABLE_CN_STOCK_FOREIGN_KEY['columns'])]
             stocks = [tuple(x) for x in _subset.values]
+        self.panel = None
         if stocks is None:
-            self.data = None
             return
         date_start, is_cache = trd.get_trade_hist_interval(stocks[0][0])  # 提高运行效率，只运行一次
-        _data = {}
+        _data = None
+        store = stock_hist_store()
         try:
-            # max_workers是None还是没有给出，将默认为机器cup个数*5
-            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-                future_to_stock = {executor.submit(stf.fetch_stock_hist, stock, date_start, is_cache): stock for stock
-                                   in stocks}
-                for future in concurrent.futures.as_completed(future_to_stock):
-                    stock = future_to_stock[future]
-                    try:
-                        __data = future.result()
-                        if __data is not None:
-                            _data[stock] = __data
-                    except Exception as e:
-                        logging.error(f"singleton.stock_hist_data处理异常：{stock[1]}代码{e}")
+            store.load()  # 一次顺序读取全部不复权缓存分桶
+            # 异步并发下载，concurrency 为同时在途的请求数
+            _data = stf.fetch_stocks_hist(stocks, date_start, is_cache, concurrency, adjust)
         except Exception as e:
             logging.error(f"singleton.stock_hist_data处理异常：{e}")
-        if not _data:
-            self.data = None
-        else:
-            self.data = _data
+        store.flush()
+        logging.info(f"singleton.stock_hist_data缓存统计：{cache_manager().get_stats()}")
+        if _data:
+            # 转为紧凑的面板，不再保留每只股票的 DataFrame
+            self.panel = stock_panel.from_frames(_data)
+        store.release()  # 面板已包含需要的数据，释放加载的不复权缓存分桶
+        cache_manager().start()  # 读取和写入缓存之后再开始后台按容量和时间清理，避免与加载同时进行
+
+    @classmethod
+    def cache_key(cls, date=None, stocks=None, concurrency=hist_fetch_concurrency, adjust='qfq'):
+        return _date_key(date), None if stocks is None else tuple(stocks), adjust
+
+    def memory_size(self):
+        return 0 if self.panel is None else self.panel.nbytes
+
+    def get_panel(self):
+        return self.panel
 
     def get_data(self):
-        return self.data
+        """
+        :return: {stock: DataFrame} 只读映射，访问时由面板创建 DataFrame
+        """
+        return None if self.panel is None else self.panel.frames()
@@ -1,21 +1,126 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os.path
+import time
+import datetime
 import logging
+import threading
+import numpy as np
 import instock.core.stockfetch as stf
 from instock.lib.singleton_type import singleton_type
+from instock.lib.trade_calendar import trade_calendar
 
 __author__ = 'myh '
 __date__ = '2023/3/10 '
 
+# 解码后的交易日历缓存为本地 .npy 文件(datetime64[D]有序数组)，避免每个进程都下载新浪日历并启动 V8 解码。
+# 缓存中剩余的未来交易日不足 trade_date_min_future_days 天时才重新获取，获取失败继续使用旧缓存。
+cpath_current = os.path.dirname(os.path.dirname(__file__))
+trade_date_cache_file = os.path.join(cpath_current, 'cache', 'trade_date.npy')
+trade_date_min_future_days = 30  # 缓存覆盖今天之后的天数少于该值时刷新
+trade_date_check_interval = 86400  # 刷新失败或新日历未发布时，再次尝试的最小间隔秒数
 
-# 读取股票交易日历数据
+# 使用环境变量配置,docker -e 传递
+_trade_date_cache_file = os.environ.get('trade_date_cache_file')
+if _trade_date_cache_file is not None:
+    trade_date_cache_file = _trade_date_cache_file
+_trade_date_min_future_days = os.environ.get('trade_date_min_future_days')
+if _trade_date_min_future_days is not None:
+    trade_date_min_future_days = int(_trade_date_min_future_days)
+
+
+def load_trade_date_cache(file=None):
+    file = trade_date_cache_file if file is None else file
+    if not os.path.isfile(file):
+        return None
+    try:
+        dates = np.load(file, allow_pickle=False)
+        if dates.dtype != np.dtype('datetime64[D]') or len(dates) == 0:
+            return None
+        return dates
+    except Exception as e:
+        logging.error(f"singleton.load_trade_date_cache处理异常：{e}")
+    return None
+
+
+def save_trade_date_cache(dates, file=None):
+    file = trade_date_cache_file if file is None else file
+    try:
+        _dir = os.path.dirname(file)
+        if _dir and not os.path.exists(_dir):
+            os.makedirs(_dir)
+        tmp = f"{file}.tmp"
+        with open(tmp, 'wb') as f:
+            np.save(f, dates, allow_pickle=False)
+        os.replace(tmp, file)  # 原子替换，并发进程不会读到半个文件
+    except Exception as e:
+        logging.error(f"singleton.save_trade_date_cache处理异常：{e}")
+
+
+# 缓存是否需要刷新：未来交易日不足，且距离上次写入/检查超过 trade_date_check_interval
+def need_refresh_trade_date(dates, file=None):
+    if dates is None:
+        return True
+    file = trade_date_cache_file if file is None else file
+    if dates[-1] - np.datetime64(datetime.date.today(), 'D') >= trade_date_min_future_days:
+        return False
+    try:
+        return time.time() - os.path.getmtime(file) >= trade_date_check_interval
+    except OSError:
+        return True
+
+
+def fetch_trade_date_array():
+    data = stf.fetch_stocks_trade_date()
+    if not data:
+        return None
+    return np.array(sorted(data), dtype='datetime64[D]')
+
+
+# 读取股票交易日历数据，首次使用时才加载
 class stock_trade_date(metaclass=singleton_type):
     def __init__(self):
+        self.lock = threading.Lock()
+        self.calendar = None
+        self.data = None
+        self._loaded = False
+
+    def _load(self):
         try:
-            self.data = stf.fetch_stocks_trade_date()
+            dates = load_trade_date_cache()
+            if need_refresh_trade_date(dates):
+                _dates = fetch_trade_date_array()
+                if _dates is not None:
+                    dates = _dates
+                    save_trade_date_cache(dates)
+                elif dates is not None:
+                    # 新浪不可用或新日历未发布，使用旧缓存并推迟下次检查
+                    logging.warning("singleton.stock_trade_date交易日历刷新失败，使用本地缓存")
+                    os.utime(trade_date_cache_file, None)
+            if dates is not None:
+                self.calendar = trade_calendar(dates)
         except Exception as e:
             logging.error(f"singleton.stock_trade_date处理异常：{e}")
 
+    def get_calendar(self):
+        """
+        :return: trade_calendar，获取失败为 None
+        """
+        if not self._loaded:
+            with self.lock:
+                if not self._loaded:
+                    self._load()
+                    self._loaded = True
+        return self.calendar
+
     def get_data(self):
+        """
+        :return: datetime.date 集合
+        """
+        calendar = self.get_calendar()
+        if calendar is None:
+            return None
+        if self.data is None:
+            self.data = set(calendar.dates.astype(object).tolist())
         return self.data
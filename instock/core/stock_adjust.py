@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import datetime
+import numpy as np
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+# 本地复权：缓存不复权K线和每只股票的除权除息事件，读取时计算前复权/后复权。
+# 每个事件为 [除权除息日, 每股现金分红, 每股送转股数]，除权参考价 = (前收盘价 - 现金分红) / (1 + 送转股数)。
+# 前复权：除权日之前的价格依次按 p -> (p - d) / (1 + r) 调整；后复权为其逆变换，作用于除权日及之后的价格。
+
+events_refresh_days = 30  # 除权除息事件的最长复核间隔天数，防止漏掉事件
+_PRICE_COLUMNS = ['open', 'close', 'high', 'low']
+
+
+# 从不复权K线中找出除权除息日：当日的涨跌额按除权参考价计算，参考价与上一日收盘价不同即发生了除权除息。
+def detect_ex_dates(stock):
+    if len(stock.index) < 2:
+        return np.array([], dtype=object)
+    close = stock['close'].values
+    pre_close = close[1:] - stock['ups_downs'].values[1:]
+    gap = np.abs(pre_close - close[:-1]) > 0.015
+    return stock['date'].values[1:][gap]
+
+
+# 是否需要重新获取除权除息事件
+def need_refresh(stock, meta):
+    if 'events' not in meta or 'events_checked' not in meta:
+        return True
+    expire = (datetime.date.today() - datetime.timedelta(days=events_refresh_days)).strftime("%Y-%m-%d")
+    if meta.get('events_time', '') < expire:
+        return True
+    new = stock.loc[stock['date'].values > meta['events_checked']]
+    if len(new.index) == 0:
+        return False
+    # 包含上一根K线，检查新K线中的第一根
+    _stock = stock.iloc[max(len(stock.index) - len(new.index) - 1, 0):]
+    return len(detect_ex_dates(_stock)) > 0
+
+
+# 由分红送配历史生成事件，K线中发现但分红送配里没有的除权(如配股)，按参考价折算为比例事件。
+def build_events(stock, bonus):
+    last_date = stock['date'].values[-1]
+    events = {}
+    if bonus is not None and len(bonus.index) > 0:
+        _bonus = bonus.loc[bonus['除权除息日'].notna()]
+        for ex_date, cash, ratio in zip(_bonus['除权除息日'].values, _bonus['现金分红-现金分红比例'].values,
+                                        _bonus['送转股份-送转总比例'].values):
+            if ex_date > last_date:
+                continue  # 尚未除权
+            cash = 0.0 if np.isnan(cash) else cash / 10
+            ratio = 0.0 if np.isnan(ratio) else ratio / 10
+            if cash == 0 and ratio == 0:
+                continue
+            d, r = events.get(ex_date, (0.0, 0.0))
+            events[ex_date] = (d + cash, r + ratio)
+
+    dates = stock['date'].values
+    ex_dates = np.array(sorted(events.keys()), dtype=object)
+    close = stock['close'].values
+    for ex_date in detect_ex_dates(stock):
+        i = np.searchsorted(dates, ex_date)
+        # 分红送配的除权日落在上一根K线之后、当前K线及之前(停牌)视为同一事件
+        j = np.searchsorted(ex_dates, dates[i - 1], side='right')
+        if j < len(ex_dates) and ex_dates[j] <= ex_date:
+            continue
+        pre_close = close[i] - stock['ups_downs'].values[i]
+        if pre_close <= 0:
+            continue
+        events[ex_date] = (0.0, close[i - 1] / pre_close - 1)
+    return [[k, float(v[0]), float(v[1])] for k, v in sorted(events.items())]
+
+
+# 计算复权K线，adjust 为 'qfq' 或 'hfq'，其他值返回原数据。
+def adjust_hist(stock, events, adjust='qfq'):
+    if adjust not in ('qfq', 'hfq') or not events or len(stock.index) == 0:
+        return stock
+    ex_dates = np.array([e[0] for e in events], dtype=object)
+    cash = np.array([e[1] for e in events], dtype=np.float64)
+    ratio = np.array([e[2] for e in events], dtype=np.float64)
+    m = len(events)
+    a = np.ones(m + 1)
+    b = np.zeros(m + 1)
+    if adjust == 'qfq':
+        # 后缀复合：第 j 个及之后的事件依次作用
+        for j in range(m - 1, -1, -1):
+            a[j] = a[j + 1] / (1 + ratio[j])
+            b[j] = b[j + 1] - a[j + 1] * cash[j] / (1 + ratio[j])
+    else:
+        # 前缀复合：第 j 个及之前的事件的逆变换
+        for j in range(1, m + 1):
+            a[j] = a[j - 1] * (1 + ratio[j - 1])
+            b[j] = b[j - 1] + a[j - 1] * cash[j - 1]
+    # 每根K线之前(含当日)已经发生的事件数
+    idx = np.searchsorted(ex_dates, stock['date'].values, side='right')
+    if (adjust == 'qfq' and idx[0] == m) or (adjust == 'hfq' and idx[-1] == 0):
+        return stock  # 区间内不受任何事件影响
+    _a, _b = a[idx], b[idx]
+
+    data = stock.copy()
+    for col in _PRICE_COLUMNS:
+        data[col] = np.round(_a * stock[col].values + _b, 2)
+    close = data['close'].values
+    pre_close = np.empty_like(close)
+    pre_close[1:] = close[:-1]
+    # 第一根K线没有上一日，按原始涨跌额推算参考价
+    pre_close[0] = _a[0] * (stock['close'].values[0] - stock['ups_downs'].values[0]) + _b[0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        data['ups_downs'] = np.round(close - pre_close, 2)
+        data['quote_change'] = np.round((close / pre_close - 1) * 100, 2)
+        data['amplitude'] = np.round((data['high'].values - data['low'].values) / np.abs(pre_close) * 100, 2)
+    return data
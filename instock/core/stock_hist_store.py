@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os.path
+import json
+import atexit
+import logging
+import tempfile
+from contextlib import contextmanager
+from threading import RLock
+import numpy as np
+import pyarrow as pa
+from instock.lib.singleton_type import singleton_type
+from instock.lib.cache_manager import cache_manager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows 不加文件锁，写入前仍会合并磁盘上的数据
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+# 列式历史行情存储，替代每只股票一个 gzip pickle 的缓存。
+# 按代码前3位分桶，每个桶一个 Arrow IPC 文件(不压缩，可内存映射)，保存桶内全部股票的完整日线。
+cpath_current = os.path.dirname(os.path.dirname(__file__))
+stock_hist_store_path = os.path.join(cpath_current, 'cache', 'hist', 'store')
+_META_KEY = b'instock'
+
+
+def get_bucket(code):
+    return code[0:3]
+
+
+# 每个桶在内存中是内存映射的 Arrow 表和每个代码的行区间，get 时只把该代码的行转为 DataFrame；
+# 本进程 put 的代码在写入前保存为 DataFrame。批量任务用完后调用 release 释放已加载的桶。
+class stock_hist_store(metaclass=singleton_type):
+    def __init__(self):
+        self.lock = RLock()
+        self.tables = {}  # (adjust, bucket) -> (Arrow 表, {code: (起始行, 行数)})
+        self.meta = {}  # (adjust, bucket) -> {code: {'start': 首次全量起始日, 'checked': 已核对到的交易日}}
+        self.dirty = {}  # (adjust, bucket) -> {code: DataFrame}，本进程修改过、尚未写入的代码
+        atexit.register(self.flush)
+
+    @staticmethod
+    def _adjust_dir(adjust):
+        return os.path.join(stock_hist_store_path, adjust if adjust else 'bfq')
+
+    def _bucket_file(self, adjust, bucket):
+        return os.path.join(self._adjust_dir(adjust), f"{bucket}.arrow")
+
+    # 读取桶文件，每个代码的行是连续的，用代码列的字典编码找出每个代码的行区间。
+    # mmap 为 True 时内存映射，数据不复制到进程内存；重写文件前读取时复制，以便替换文件。
+    @staticmethod
+    def _read_file(cache_file, mmap=True):
+        if not os.path.isfile(cache_file):
+            return None, {}, {}
+        try:
+            if mmap:
+                with pa.memory_map(cache_file, 'r') as source:
+                    table = pa.ipc.open_file(source).read_all()
+            else:
+                with pa.OSFile(cache_file, 'rb') as source:
+                    table = pa.ipc.open_file(source).read_all()
+            cache_manager().touch(cache_file)  # 更新最近访问时间，供LRU淘汰使用
+            schema_meta = table.schema.metadata or {}
+            meta = json.loads(schema_meta[_META_KEY].decode('utf-8')) if _META_KEY in schema_meta else {}
+            codes = table['code'].combine_chunks().dictionary_encode()
+            indices = codes.indices.to_numpy(zero_copy_only=False)
+            starts = np.concatenate(([0], np.flatnonzero(np.diff(indices)) + 1)) if len(indices) else []
+            ends = np.append(starts[1:], len(indices))
+            names = codes.dictionary.to_pylist()
+            offsets = {names[indices[b]]: (int(b), int(e - b)) for b, e in zip(starts, ends)}
+            return table, offsets, meta
+        except Exception as e:
+            logging.error(f"stock_hist_store._read_file处理异常：{cache_file}{e}")
+        return None, {}, {}
+
+    def _load_bucket(self, adjust, bucket):
+        key = (adjust, bucket)
+        if key in self.tables:
+            return
+        table, offsets, meta = self._read_file(self._bucket_file(adjust, bucket))
+        self.tables[key] = (table, offsets)
+        self.meta[key] = meta
+
+    # 一次加载某复权方式下的全部分桶，供全市场批量读取使用。
+    def load(self, adjust=''):
+        _dir = self._adjust_dir(adjust)
+        if not os.path.isdir(_dir):
+            return
+        with self.lock:
+            for f in os.listdir(_dir):
+                if f.endswith('.arrow'):
+                    self._load_bucket(adjust, f[:-len('.arrow')])
+
+    # 释放已加载的桶，未写入的修改先写入。
+    def release(self):
+        with self.lock:
+            self.flush()
+            self.tables = {}
+            self.meta = {}
+
+    @staticmethod
+    def _slice(table, offsets, code):
+        if table is None or code not in offsets:
+            return None
+        start, length = offsets[code]
+        return table.slice(start, length).drop_columns(['code']).to_pandas()
+
+    def get(self, code, adjust=''):
+        key = (adjust, get_bucket(code))
+        with self.lock:
+            self._load_bucket(*key)
+            meta = self.meta[key].get(code)
+            data = self.dirty.get(key, {}).get(code)
+            if data is not None:
+                data = data.copy()
+            else:
+                data = self._slice(*self.tables[key], code)
+        if data is None or not isinstance(meta, dict):
+            return None, None
+        return data, dict(meta)
+
+    def put(self, code, data, meta, adjust=''):
+        key = (adjust, get_bucket(code))
+        with self.lock:
+            self._load_bucket(*key)
+            self.dirty.setdefault(key, {})[code] = data.reset_index(drop=True).copy()
+            self.meta[key][code] = dict(meta)
+
+    # 多个进程(每日作业、web)会写同一个桶，重写期间加文件锁。
+    @staticmethod
+    @contextmanager
+    def _file_lock(cache_file):
+        if fcntl is None:
+            yield
+            return
+        with open(f"{cache_file}.lock", 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    # 把有改动的桶整体重写：先重新读取磁盘上的桶，只替换本进程修改过的代码，
+    # 其他进程在这期间写入的代码保留；同一代码以核对日期较新的为准。
+    # 写入进程唯一的临时文件再替换，避免读到半个文件。写入后该桶从内存中释放，再用时重新映射。
+    def flush(self):
+        with self.lock:
+            for key in list(self.dirty):
+                adjust, bucket = key
+                frames = self.dirty[key]
+                cache_file = self._bucket_file(adjust, bucket)
+                tmp_file = None
+                try:
+                    _dir = os.path.dirname(cache_file)
+                    if not os.path.exists(_dir):
+                        os.makedirs(_dir, exist_ok=True)
+                    with self._file_lock(cache_file):
+                        table, offsets, meta = self._read_file(cache_file, mmap=False)
+                        ours = self.meta[key]
+                        # 磁盘上核对日期较新的代码保留磁盘上的数据
+                        newer = {code for code in frames if code in offsets and isinstance(meta.get(code), dict)
+                                 and meta[code].get('checked', '') > ours[code].get('checked', '')}
+                        parts = [table.slice(start, length) for code, (start, length) in offsets.items()
+                                 if code not in frames or code in newer]
+                        for code, data in frames.items():
+                            if code in newer:
+                                continue
+                            meta[code] = ours[code]
+                            part = pa.Table.from_pandas(data.assign(code=code), preserve_index=False)
+                            parts.append(part.select(['code'] + list(data.columns)))
+                        table = pa.concat_tables([t.replace_schema_metadata(None) for t in parts],
+                                                 promote_options='permissive')
+                        table = table.replace_schema_metadata({_META_KEY: json.dumps(meta).encode('utf-8')})
+                        fd, tmp_file = tempfile.mkstemp(suffix='.tmp', prefix=f"{bucket}.", dir=_dir)
+                        os.close(fd)
+                        with pa.OSFile(tmp_file, 'wb') as sink:
+                            with pa.ipc.new_file(sink, table.schema) as writer:
+                                writer.write_table(table)
+                        self.tables.pop(key, None)  # 释放映射后再替换文件
+                        self.meta.pop(key, None)
+                        os.replace(tmp_file, cache_file)
+                        tmp_file = None
+                    del self.dirty[key]
+                except Exception as e:
+                    logging.error(f"stock_hist_store.flush处理异常：{cache_file}{e}")
+                finally:
+                    if tmp_file is not None and os.path.exists(tmp_file):
+                        os.remove(tmp_file)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+import talib as tl
+import instock.core.tablestructure as tbs
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+# 全市场日线面板：每个字段一个 (股票 × 交易日) 的连续二维数组，替代每只股票一个 DataFrame。
+# 价格等两位小数的字段用 float32 保存，读取时还原为 float64 并四舍五入到两位小数，与原始数据完全一致；
+# 成交量、成交额用 float64。valid 标记该股票当日是否有K线(未上市、停牌为 False)。
+PANEL_FLOAT32_COLUMNS = ['open', 'close', 'high', 'low', 'amplitude', 'quote_change', 'ups_downs', 'turnover']
+PANEL_FLOAT64_COLUMNS = ['volume', 'amount']
+_DECIMALS = 2
+
+
+class stock_panel:
+    def __init__(self, keys, dates, fields, valid):
+        """
+        :param keys: 股票键列表，如 (date, code, name)
+        :param dates: 交易日轴，datetime64[D] 有序数组
+        :param fields: {字段: 二维数组}
+        :param valid: 二维 bool 数组
+        """
+        self.keys = list(keys)
+        self.index = {k: i for i, k in enumerate(self.keys)}
+        self.dates = dates
+        self.date_str = np.array(np.datetime_as_string(dates, unit='D'), dtype=object)
+        self.fields = fields
+        self.valid = valid
+
+    @classmethod
+    def from_frames(cls, data):
+        """
+        由 {stock: DataFrame} 创建，DataFrame 的列同 stock_hist_post 的返回
+        """
+        keys = [k for k, v in data.items() if v is not None and len(v.index) > 0]
+        axis = set()
+        for k in keys:
+            axis.update(data[k]['date'].values)
+        axis = np.array(sorted(axis), dtype='U10')
+        n, m = len(keys), len(axis)
+        columns = PANEL_FLOAT32_COLUMNS + PANEL_FLOAT64_COLUMNS
+        fields = {col: np.full((n, m), np.nan, dtype=np.float32) for col in PANEL_FLOAT32_COLUMNS}
+        fields.update({col: np.full((n, m), np.nan, dtype=np.float64) for col in PANEL_FLOAT64_COLUMNS})
+        valid = np.zeros((n, m), dtype=bool)
+        for i, k in enumerate(keys):
+            frame = data[k]
+            pos = np.searchsorted(axis, frame['date'].values.astype('U10'))
+            # 一次取出全部数值列，避免逐列访问 DataFrame 的开销
+            values = frame[columns].to_numpy(dtype=np.float64)
+            for j, col in enumerate(columns):
+                fields[col][i, pos] = values[:, j]
+            valid[i, pos] = True
+        return cls(keys, axis.astype('datetime64[D]'), fields, valid)
+
+    @property
+    def nbytes(self):
+        return sum(v.nbytes for v in self.fields.values()) + self.valid.nbytes
+
+    def __len__(self):
+        return len(self.keys)
+
+    def field(self, col):
+        """
+        :return: 字段的二维数组(股票 × 交易日)，缺失为 NaN
+        """
+        return self.fields[col]
+
+    def date_index(self, date):
+        """
+        :return: 交易日在日期轴上的位置，不存在为 -1
+        """
+        day = np.datetime64(date, 'D')
+        i = np.searchsorted(self.dates, day)
+        return int(i) if i < len(self.dates) and self.dates[i] == day else -1
+
+    def frame(self, key):
+        """
+        单只股票的 DataFrame，列和数值同 stock_hist_post 的返回
+        """
+        i = self.index[key]
+        pos = np.flatnonzero(self.valid[i])
+        data = {'date': self.date_str[pos]}
+        for col in tbs.CN_STOCK_HIST_DATA['columns']:
+            if col == 'date':
+                continue
+            values = self.fields[col][i, pos]
+            if values.dtype == np.float32:
+                values = np.round(values.astype(np.float64), _DECIMALS)
+            data[col] = values
+        p_change = tl.ROC(data['close'], 1)
+        p_change[np.isnan(p_change)] = 0.0
+        data['p_change'] = p_change
+        return pd.DataFrame(data)
+
+    def frames(self):
+        return stock_panel_frames(self)
+
+
+# 面板的只读映射视图 {stock: DataFrame}，访问时才创建 DataFrame，兼容按字典使用的策略、指标函数。
+class stock_panel_frames(Mapping):
+    def __init__(self, panel):
+        self.panel = panel
+
+    def __getitem__(self, key):
+        if key not in self.panel.index:
+            raise KeyError(key)
+        return self.panel.frame(key)
+
+    def __iter__(self):
+        return iter(self.panel.keys)
+
+    def __len__(self):
+        return len(self.panel.keys)
+
+    def __contains__(self, key):
+        return key in self.panel.index
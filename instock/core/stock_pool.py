@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import atexit
+import logging
+import threading
+import concurrent.futures
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+import pandas as pd
+from instock.core.stock_panel import stock_panel, stock_panel_frames
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+# 逐只股票计算(形态识别、策略、回测等)的执行方式：
+# thread 线程池，同原来的方式；process 进程池，历史数据面板只发布一次到共享内存，各进程直接映射使用，不复制数据，
+# 结果按批返回，相同结构的 Series 合并为一个数组。进程池只能用于 stock_hist_data 的面板数据，函数需可以序列化(模块级函数)。
+stock_pool_mode = 'thread'
+stock_pool_processes = os.cpu_count()  # 进程数
+stock_pool_chunk = 64  # 每个任务计算的股票数
+
+# 使用环境变量配置,docker -e 传递
+_stock_pool_mode = os.environ.get('stock_pool_mode')
+if _stock_pool_mode is not None:
+    stock_pool_mode = _stock_pool_mode
+_stock_pool_processes = os.environ.get('stock_pool_processes')
+if _stock_pool_processes is not None:
+    stock_pool_processes = int(_stock_pool_processes)
+
+
+# 面板发布到共享内存，meta 传给子进程用于映射
+class shared_panel:
+    def __init__(self, panel):
+        self.blocks = []
+        arrays = {}
+        try:
+            for name, value in list(panel.fields.items()) + [('valid', panel.valid)]:
+                shm = SharedMemory(create=True, size=max(value.nbytes, 1))
+                self.blocks.append(shm)
+                np.ndarray(value.shape, dtype=value.dtype, buffer=shm.buf)[...] = value
+                arrays[name] = (shm.name, value.dtype.str, value.shape)
+        except Exception:
+            self.close()
+            raise
+        self.meta = {'keys': panel.keys, 'dates': panel.dates, 'arrays': arrays}
+
+    def close(self):
+        for shm in self.blocks:
+            try:
+                shm.close()
+                shm.unlink()
+            except Exception as e:
+                logging.error(f"stock_pool.shared_panel.close处理异常：{e}")
+        self.blocks = []
+
+
+_worker_panel = None
+_worker_blocks = []
+
+
+def _attach(meta):
+    # 子进程初始化：映射共享内存中的面板，只读
+    global _worker_panel, _worker_blocks
+    fields = {}
+    for name, (shm_name, dtype, shape) in meta['arrays'].items():
+        shm = SharedMemory(name=shm_name)
+        _worker_blocks.append(shm)
+        value = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        value.flags.writeable = False
+        fields[name] = value
+    valid = fields.pop('valid')
+    _worker_panel = stock_panel(meta['keys'], meta['dates'], fields, valid)
+
+
+def _pack(results):
+    # 结构相同的 Series 合并为二维数组返回，减少序列化的数据量
+    if results and all(isinstance(r, pd.Series) for i, r in results):
+        index = results[0][1].index
+        if all(r.index.equals(index) for i, r in results):
+            return 'series', list(index), [i for i, r in results], np.array([r.values for i, r in results])
+    return 'list', None, [i for i, r in results], [r for i, r in results]
+
+
+def _unpack(packed):
+    kind, index, positions, values = packed
+    if kind == 'series':
+        return positions, [pd.Series(v, index=index) for v in values]
+    return positions, values
+
+
+def _run_chunk(func, items, args, kwargs):
+    frames = _worker_panel.frames()
+    results, errors = [], []
+    for i, (key, data_key) in enumerate(items):
+        try:
+            result = func(key, frames[data_key] if data_key in frames else None, *args, **kwargs)
+            if result is not None:
+                results.append((i, result))
+        except Exception as e:
+            errors.append(f"{key[1]}代码{e}")
+    return _pack(results), errors
+
+
+class _process_pool:
+    def __init__(self, panel):
+        self.panel = panel
+        self.shared = shared_panel(panel)
+        self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=stock_pool_processes,
+                                                               initializer=_attach, initargs=(self.shared.meta,))
+
+    def close(self):
+        self.executor.shutdown()
+        self.shared.close()
+
+
+_pool_lock = threading.Lock()
+_pool = None
+
+
+def _get_pool(panel):
+    # 同一面板复用进程池和共享内存，面板变化时重新发布
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.panel is not panel:
+            if _pool is not None:
+                _pool.close()
+            _pool = _process_pool(panel)
+        return _pool
+
+
+@atexit.register
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def map_stocks(func, stocks, keys=None, data_keys=None, args=(), kwargs=None, workers=40):
+    """
+    逐只股票计算 func(key, stocks[data_key], *args, **kwargs)，stocks 中没有 data_key 时传入 None
+    :param stocks: {stock: DataFrame} 或 stock_hist_data 的面板视图
+    :param keys: 计算的股票，默认 stocks 的全部股票
+    :param data_keys: 与 keys 一一对应的 stocks 中的键，默认同 keys
+    :return: {key: 结果}，不含结果为 None 和异常的股票
+    """
+    keys = list(stocks) if keys is None else list(keys)
+    items = list(zip(keys, keys if data_keys is None else data_keys))
+    kwargs = {} if kwargs is None else kwargs
+    data = {}
+    if stock_pool_mode == 'process' and isinstance(stocks, stock_panel_frames):
+        executor = _get_pool(stocks.panel).executor
+        chunks = [items[i:i + stock_pool_chunk] for i in range(0, len(items), stock_pool_chunk)]
+        future_to_data = {executor.submit(_run_chunk, func, chunk, args, kwargs): chunk for chunk in chunks}
+        for future in concurrent.futures.as_completed(future_to_data):
+            chunk = future_to_data[future]
+            try:
+                packed, errors = future.result()
+                for e in errors:
+                    logging.error(f"stock_pool.map_stocks处理异常：{func.__name__} {e}")
+                for i, result in zip(*_unpack(packed)):
+                    data[chunk[i][0]] = result
+            except Exception as e:
+                logging.error(f"stock_pool.map_stocks处理异常：{func.__name__} {e}")
+        return data
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        future_to_data = {executor.submit(func, key, stocks.get(data_key), *args, **kwargs): key
+                          for key, data_key in items}
+        for future in concurrent.futures.as_completed(future_to_data):
+            key = future_to_data[future]
+            try:
+                result = future.result()
+                if result is not None:
+                    data[key] = result
+            except Exception as e:
+                logging.error(f"stock_pool.map_stocks处理异常：{func.__name__} {key[1]}代码{e}")
+    return data
@@ -3,6 +3,7 @@
 
 import logging
 import os.path
+import asyncio
 import datetime
 import numpy as np
 import pandas as pd
@@ -20,6 +21,10 @@ import instock.core.crawling.stock_fund_em as sff
 import instock.core.crawling.stock_fhps_em as sfe
 import instock.core.crawling.stock_chip_race as scr
 import instock.core.crawling.stock_limitup_reason as slr
+import instock.core.stock_adjust as stk_adj
+from instock.core.stock_hist_store import stock_hist_store
+from instock.core.eastmoney_async_fetcher import eastmoney_async_fetcher, hist_fetch_concurrency
+from instock.lib.cache_manager import cache_manager
 
 __author__ = 'myh '
 __date__ = '2023/3/10 '
@@ -353,49 +358,186 @@ def fetch_stock_hist(data_base, date_start=None, is_cache=True):
         date_start, is_cache = trd.get_trade_hist_interval(date)  # 提高运行效率，只运行一次
         # date_end = date_end.strftime("%Y%m%d")
     try:
-        data = stock_hist_cache(code, date_start, None, is_cache, 'qfq')
-        if data is not None:
-            data.loc[:, 'p_change'] = tl.ROC(data['close'].values, 1)
-            data['p_change'].values[np.isnan(data['p_change'].values)] = 0.0
-            data["volume"] = data['volume'].values.astype('double') * 100  # 成交量单位从手变成股。
-        return data
+        return stock_hist_post(stock_hist_cache(code, date_start, None, is_cache, 'qfq'))
     except Exception as e:
         logging.error(f"stockfetch.fetch_stock_hist处理异常：{e}")
     return None
 
 
+# 批量读取股票历史数据，异步并发下载，每只股票解析后立即写入缓存。
+# stocks 为 (date, code, name) 列表，返回 {stock: DataFrame}
+def fetch_stocks_hist(stocks, date_start, is_cache=True, concurrency=hist_fetch_concurrency, adjust='qfq'):
+    try:
+        return asyncio.run(_fetch_stocks_hist(stocks, date_start, is_cache, concurrency, adjust))
+    except Exception as e:
+        logging.error(f"stockfetch.fetch_stocks_hist处理异常：{e}")
+    return None
+
+
+async def _fetch_stocks_hist(stocks, date_start, is_cache, concurrency, adjust):
+    checked = trd.get_trade_date_last()[0].strftime("%Y%m%d")
+    data = {}
+
+    async def fetch(fetcher, stock):
+        try:
+            _data = stock_hist_post(await stock_hist_cache_async(fetcher, stock[1], date_start, checked,
+                                                                 is_cache, adjust))
+            if _data is not None:
+                data[stock] = _data
+        except Exception as e:
+            logging.error(f"stockfetch.fetch_stocks_hist处理异常：{stock[1]}代码{e}")
+
+    async with eastmoney_async_fetcher(concurrency=concurrency) as fetcher:
+        await asyncio.gather(*(fetch(fetcher, stock) for stock in stocks))
+    return data
+
+
+# 增加涨跌幅，成交量单位从手变成股。
+def stock_hist_post(data):
+    if data is not None:
+        data.loc[:, 'p_change'] = tl.ROC(data['close'].values, 1)
+        data['p_change'].values[np.isnan(data['p_change'].values)] = 0.0
+        data["volume"] = data['volume'].values.astype('double') * 100  # 成交量单位从手变成股。
+    return data
+
+
 # 增加读取股票缓存方法。加快处理速度。多线程解决效率
+# 缓存保存在列式存储 stock_hist_store 中，全市场按代码分桶，一次顺序读取即可加载。
+# 缓存不复权K线和除权除息事件，复权数据读取时由 stock_adjust 本地计算，分红送配不会使缓存失效，
+# 之后只增量获取缺少的K线，只有发生新的除权除息的股票才重新获取事件。
 def stock_hist_cache(code, date_start, date_end=None, is_cache=True, adjust=''):
-    cache_dir = os.path.join(stock_hist_cache_path, date_start[0:6], date_start)
-    # 如果没有文件夹创建一个。月文件夹和日文件夹。方便删除。
-    try:
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
-    except Exception:
-        pass
-    cache_file = os.path.join(cache_dir, "%s%s.gzip.pickle" % (code, adjust))
-    # 如果缓存存在就直接返回缓存数据。压缩方式。
     try:
-        if os.path.isfile(cache_file):
-            return pd.read_pickle(cache_file, compression="gzip")
-        else:
-            if date_end is not None:
-                stock = she.stock_zh_a_hist(symbol=code, period="daily", start_date=date_start, end_date=date_end,
-                                            adjust=adjust)
-            else:
-                stock = she.stock_zh_a_hist(symbol=code, period="daily", start_date=date_start, adjust=adjust)
-
-            if stock is None or len(stock.index) == 0:
+        if date_end is not None:
+            stock = she.stock_zh_a_hist(symbol=code, period="daily", start_date=date_start, end_date=date_end,
+                                        adjust=adjust)
+            return stock_hist_columns(stock)
+
+        store = stock_hist_store()
+        checked = trd.get_trade_date_last()[0].strftime("%Y%m%d")
+        stock, meta, is_hit = stock_hist_cache_lookup(store, code, date_start, checked)
+        if is_hit:
+            return stock_hist_cache_view(stock, meta, date_start, adjust)
+        if stock is not None:
+            delta = she.stock_zh_a_hist(symbol=code, period="daily", start_date=stock_hist_cache_next(stock))
+            stock = stock_hist_cache_append(stock, delta)
+        if stock is None:
+            # 没有缓存或缓存数据被修正，全量获取。
+            cache_manager().record('miss')
+            stock = stock_hist_columns(she.stock_zh_a_hist(symbol=code, period="daily", start_date=date_start))
+            if stock is None:
                 return None
-            stock.columns = tuple(tbs.CN_STOCK_HIST_DATA['columns'])
-            stock = stock.sort_index()  # 将数据按照日期排序下。
+            meta = {'start': date_start}
+        else:
+            cache_manager().record('append')
+        if stk_adj.need_refresh(stock, meta):
             try:
-                if is_cache:
-                    stock.to_pickle(cache_file, compression="gzip")
-            except Exception:
-                pass
-            # time.sleep(1)
-            return stock
+                bonus = sfe.stock_fhps_detail_em(symbol=code)
+            except Exception as e:
+                logging.error(f"stockfetch.stock_hist_cache处理异常：{code}代码分红送配{e}")
+                bonus = None
+            stock_hist_cache_events(stock, meta, bonus)
+        stock_hist_cache_save(store, code, stock, meta, checked, is_cache)
+        return stock_hist_cache_view(stock, meta, date_start, adjust)
     except Exception as e:
         logging.error(f"stockfetch.stock_hist_cache处理异常：{code}代码{e}")
     return None
+
+
+# 异步版本的 stock_hist_cache，处理流程相同。
+async def stock_hist_cache_async(fetcher, code, date_start, checked, is_cache=True, adjust=''):
+    store = stock_hist_store()
+    stock, meta, is_hit = stock_hist_cache_lookup(store, code, date_start, checked)
+    if is_hit:
+        return stock_hist_cache_view(stock, meta, date_start, adjust)
+    if stock is not None:
+        delta = await she.stock_zh_a_hist_async(fetcher, symbol=code, period="daily",
+                                                start_date=stock_hist_cache_next(stock))
+        stock = stock_hist_cache_append(stock, delta)
+    if stock is None:
+        cache_manager().record('miss')
+        stock = stock_hist_columns(await she.stock_zh_a_hist_async(fetcher, symbol=code, period="daily",
+                                                                   start_date=date_start))
+        if stock is None:
+            return None
+        meta = {'start': date_start}
+    else:
+        cache_manager().record('append')
+    if stk_adj.need_refresh(stock, meta):
+        try:
+            bonus = await sfe.stock_fhps_detail_em_async(fetcher, symbol=code)
+        except Exception as e:
+            logging.error(f"stockfetch.stock_hist_cache_async处理异常：{code}代码分红送配{e}")
+            bonus = None
+        stock_hist_cache_events(stock, meta, bonus)
+    stock_hist_cache_save(store, code, stock, meta, checked, is_cache)
+    return stock_hist_cache_view(stock, meta, date_start, adjust)
+
+
+# 查询不复权缓存，返回 (缓存数据, 元数据, 是否命中)。缓存数据为 None 表示需要全量获取。
+def stock_hist_cache_lookup(store, code, date_start, checked):
+    stock, meta = store.get(code)
+    if stock is not None and meta['start'] <= date_start:
+        if meta['checked'] >= checked:
+            cache_manager().record('hit')
+            return stock, meta, True
+        return stock, meta, False
+    return None, {'start': date_start}, False
+
+
+def stock_hist_cache_save(store, code, stock, meta, checked, is_cache):
+    try:
+        if is_cache:
+            meta['checked'] = checked
+            store.put(code, stock, meta)
+    except Exception as e:
+        logging.error(f"stockfetch.stock_hist_cache_save处理异常：{code}代码{e}")
+
+
+# 更新除权除息事件，获取分红送配失败时只使用K线中发现的事件，下次继续尝试获取。
+def stock_hist_cache_events(stock, meta, bonus):
+    meta['events'] = stk_adj.build_events(stock, bonus)
+    meta['events_checked'] = stock['date'].iloc[-1]
+    if bonus is not None:
+        meta['events_time'] = datetime.date.today().strftime("%Y-%m-%d")
+    else:
+        meta.pop('events_time', None)
+
+
+# 截取 date_start 之后的数据并计算复权，多带一根K线用于计算第一根的涨跌幅。
+def stock_hist_cache_view(stock, meta, date_start, adjust=''):
+    _date_start = f"{date_start[0:4]}-{date_start[4:6]}-{date_start[6:8]}"
+    i = np.searchsorted(stock['date'].values, _date_start)
+    if i > 0:
+        stock = stock.iloc[i - 1:].reset_index(drop=True)
+    stock = stk_adj.adjust_hist(stock, meta.get('events'), adjust)
+    if i > 0:
+        stock = stock.iloc[1:].reset_index(drop=True)
+    return stock
+
+
+def stock_hist_columns(stock):
+    if stock is None or len(stock.index) == 0:
+        return None
+    stock.columns = tuple(tbs.CN_STOCK_HIST_DATA['columns'])
+    return stock.sort_index()  # 将数据按照日期排序下。
+
+
+# 增量获取的起始日，从缓存的最后一根K线开始，重叠的那根K线用于核对缓存数据。
+def stock_hist_cache_next(stock):
+    return stock['date'].iloc[-1].replace('-', '')
+
+
+# 合并增量数据，返回 None 表示重叠的K线与缓存不一致（数据被修正），需要全量重新获取。
+def stock_hist_cache_append(stock, delta):
+    if delta is None or len(delta.index) == 0:
+        return stock  # 停牌等情况没有新数据
+    last_date = stock['date'].iloc[-1]
+    delta.columns = tuple(tbs.CN_STOCK_HIST_DATA['columns'])
+    overlap = delta.loc[delta['date'] == last_date]
+    _cols = ['open', 'close', 'high', 'low']
+    if len(overlap.index) == 0 or not np.allclose(overlap[_cols].values[0], stock[_cols].values[-1]):
+        return None
+    delta = delta.loc[delta['date'] > last_date]
+    if len(delta.index) == 0:
+        return stock
+    return pd.concat([stock, delta], ignore_index=True)
@@ -12,9 +12,11 @@ import datetime
 cpath_current = os.path.dirname(os.path.dirname(__file__))
 cpath = os.path.abspath(os.path.join(cpath_current, os.pardir))
 sys.path.append(cpath)
+import instock.lib.trade_time as trd
 import instock.core.tablestructure as tbs
 import instock.lib.database as mdb
 import instock.core.backtest.rate_stats as rate
+import instock.core.stock_pool as stp
 from instock.core.singleton_stock import stock_hist_data
 
 __author__ = 'myh '
@@ -30,7 +32,9 @@ def prepare():
     backtest_columns.insert(0, 'date')
     backtest_column = backtest_columns
 
-    stocks_data = stock_hist_data().get_data()
+    # 与 run_with_args 运行的其他每日作业使用相同的交易日，复用同一进程中已加载的历史数据
+    run_date, run_date_nph = trd.get_trade_date_last()
+    stocks_data = stock_hist_data(date=run_date_nph).get_data()
     if stocks_data is None:
         return
     for k in stocks_data:
@@ -74,18 +78,8 @@ def process(table, data_all, date, backtest_column):
 def run_check(stocks, data_all, date, backtest_column, workers=40):
     data = {}
     try:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-            future_to_data = {executor.submit(rate.get_rates, stock,
-                                              data_all.get((date, stock[1], stock[2])), backtest_column,
-                                              len(backtest_column) - 1): stock for stock in stocks}
-            for future in concurrent.futures.as_completed(future_to_data):
-                stock = future_to_data[future]
-                try:
-                    _data_ = future.result()
-                    if _data_ is not None:
-                        data[stock] = _data_
-                except Exception as e:
-                    logging.error(f"backtest_data_daily_job.run_check处理异常：{stock[1]}代码{e}")
+        data = stp.map_stocks(rate.get_rates, data_all, stocks, [(date, stock[1], stock[2]) for stock in stocks],
+                              args=(backtest_column, len(backtest_column) - 1), workers=workers)
     except Exception as e:
         logging.error(f"backtest_data_daily_job.run_check处理异常：{e}")
     if not data:
@@ -0,0 +1,30 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+
+import logging
+import os.path
+import sys
+
+cpath_current = os.path.dirname(os.path.dirname(__file__))
+cpath = os.path.abspath(os.path.join(cpath_current, os.pardir))
+sys.path.append(cpath)
+from instock.lib.cache_manager import cache_manager
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+
+# 按容量和时间清理历史数据缓存，替代直接删除整个缓存目录。
+def main():
+    try:
+        manager = cache_manager()
+        manager.cleanup()
+        logging.info(f"cache_clean_job.main缓存统计：{manager.get_stats()}")
+    except Exception as e:
+        logging.error(f"cache_clean_job.main处理异常：{e}")
+
+
+# main函数入口
+if __name__ == '__main__':
+    main()
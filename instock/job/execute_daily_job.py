@@ -27,6 +27,7 @@ import strategy_data_daily_job as sdj
 import backtest_data_daily_job as bdj
 import klinepattern_data_daily_job as kdj
 import selection_data_daily_job as sddj
+from instock.core.http_stats import http_stats
 
 __author__ = 'myh '
 __date__ = '2023/3/10 '
@@ -38,10 +39,13 @@ def main():
     logging.info("######## 任务执行时间: %s #######" % _start.strftime("%Y-%m-%d %H:%M:%S.%f"))
     # 第1步创建数据库
     bj.main()
+    http_stats().dump('init_job')
     # 第2.1步创建股票基础数据表
     hdj.main()
+    http_stats().dump('basic_data_daily_job')
     # 第2.2步创建综合股票数据表
     sddj.main()
+    http_stats().dump('selection_data_daily_job')
     with concurrent.futures.ThreadPoolExecutor() as executor:
         # # 第3.1步创建股票其它基础数据表
         executor.submit(hdtj.main)
@@ -51,12 +55,15 @@ def main():
         # executor.submit(kdj.main)
         # # # # 第5步创建股票策略数据表
         # executor.submit(sdj.main)
+    # 第3步的作业并发执行，请求统计无法按作业区分，输出的是本步全部作业的合计
+    http_stats().dump('第3步并发作业合计(basic_data_other_daily_job等)')
 
     # # # # 第6步创建股票回测
     # bdj.main()
 
     # # # # 第7步创建股票闭盘后才有的数据
     acdj.main()
+    http_stats().dump('basic_data_after_close_daily_job')
 
     logging.info("######## 完成任务, 使用时间: %s 秒 #######" % (time.time() - start))
 
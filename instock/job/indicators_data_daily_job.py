@@ -3,7 +3,8 @@
 
 
 import logging
-import concurrent.futures
+import bisect
+import datetime
 import pandas as pd
 import os.path
 import sys
@@ -12,9 +13,12 @@ cpath_current = os.path.dirname(os.path.dirname(__file__))
 cpath = os.path.abspath(os.path.join(cpath_current, os.pardir))
 sys.path.append(cpath)
 import instock.lib.run_template as runt
+import instock.lib.trade_time as trd
 import instock.core.tablestructure as tbs
 import instock.lib.database as mdb
-import instock.core.indicator.calculate_indicator as idr
+import instock.core.indicator.calculate_indicator_incremental as idri
+import instock.core.indicator.calculate_indicator_range as idrr
+import instock.core.kline.kline_data as kld
 from instock.core.singleton_stock import stock_hist_data
 
 __author__ = 'myh '
@@ -39,48 +43,88 @@ def prepare(date):
         else:
             cols_type = tbs.get_field_types(tbs.TABLE_CN_STOCK_INDICATORS['columns'])
 
-        dataKey = pd.DataFrame(results.keys())
+        dataKey = pd.DataFrame(list(results.index))
         _columns = tuple(tbs.TABLE_CN_STOCK_FOREIGN_KEY['columns'])
         dataKey.columns = _columns
 
-        dataVal = pd.DataFrame(results.values())
+        dataVal = results.reset_index(drop=True)
         dataVal.drop('date', axis=1, inplace=True)  # 删除日期字段，然后和原始数据合并。
 
         data = pd.merge(dataKey, dataVal, on=['code'], how='left')
         # data.set_index('code', inplace=True)
-        # 单例，时间段循环必须改时间
-        date_str = date.strftime("%Y-%m-%d")
-        if date.strftime("%Y-%m-%d") != data.iloc[0]['date']:
-            data['date'] = date_str
         mdb.insert_db_from_df(data, table_name, cols_type, False, "`date`,`code`")
 
+        # 保存K线图使用的指标和形态数据，网页直接读取
+        if kld.kline_data_prepare:
+            kld.prepare_kline_data(stocks_data, date=date)
     except Exception as e:
         logging.error(f"indicators_data_daily_job.prepare处理异常：{e}")
 
 
+# 从上一交易日保存的状态增量计算，没有状态的股票用历史K线批量计算，K线不足的股票截取最近的K线计算
 def run_check(stocks, date=None, workers=40):
-    data = {}
     columns = list(tbs.STOCK_STATS_DATA['columns'])
     columns.insert(0, 'code')
     columns.insert(0, 'date')
     data_column = columns
     try:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-            future_to_data = {executor.submit(idr.get_indicator, k, stocks[k], data_column, date=date): k for k in stocks}
-            for future in concurrent.futures.as_completed(future_to_data):
-                stock = future_to_data[future]
-                try:
-                    _data_ = future.result()
-                    if _data_ is not None:
-                        data[stock] = _data_
-                except Exception as e:
-                    logging.error(f"indicators_data_daily_job.run_check处理异常：{stock[1]}代码{e}")
+        data = idri.get_indicator_incremental(stocks, data_column, date=date, workers=workers)
+        if data is None or len(data.index) == 0:
+            return None
+        return data
     except Exception as e:
         logging.error(f"indicators_data_daily_job.run_check处理异常：{e}")
-    if not data:
-        return None
-    else:
-        return data
+    return None
+
+
+# 区间按段计算：stock_hist_data(date) 只有 date 之前3年的K线，每段的第一天之前需有 indicator_range_warmup_bars
+# 根K线，区间较长时从后往前拆分为多段，每段使用截止段末的历史K线。
+def range_segments(dates):
+    segments = []
+    end = len(dates)
+    while end > 0:
+        seg_end = dates[end - 1]
+        hist_start, is_cache = trd.get_trade_hist_interval(seg_end.strftime("%Y-%m-%d"))
+        hist_dates = trd.get_trade_dates(hist_start, seg_end)
+        first = hist_dates[min(idrr.indicator_range_warmup_bars, len(hist_dates) - 1)]
+        begin = min(bisect.bisect_left(dates, first, 0, end), end - 1)
+        segments.append(dates[begin:end])
+        end = begin
+    return segments[::-1]
+
+
+# 区间补算，每只股票的指标序列只计算一次，写入区间内每个交易日的数据
+def prepare_range(start_date, end_date):
+    try:
+        dates = trd.get_trade_dates(start_date, end_date)
+        if not dates:
+            return
+        columns = list(tbs.STOCK_STATS_DATA['columns'])
+        columns.insert(0, 'code')
+        columns.insert(0, 'date')
+        table_name = tbs.TABLE_CN_STOCK_INDICATORS['name']
+        for segment in range_segments(dates):
+            start_date, end_date = segment[0], segment[-1]
+            stocks_data = stock_hist_data(date=end_date).get_data()
+            if stocks_data is None:
+                logging.error(f"indicators_data_daily_job.prepare_range处理异常：{start_date}至{end_date}没有历史数据")
+                continue
+
+            # 删除老数据，只删除本段会重新写入的日期。
+            if mdb.checkTableIsExist(table_name):
+                del_sql = f"DELETE FROM `{table_name}` where `date` >= '{start_date}' and `date` <= '{end_date}'"
+                mdb.executeSql(del_sql)
+                cols_type = None
+            else:
+                cols_type = tbs.get_field_types(tbs.TABLE_CN_STOCK_INDICATORS['columns'])
+
+            names = {k[1]: k[2] for k in stocks_data}
+            for data in idrr.get_indicator_range(stocks_data, columns, start_date, end_date):
+                data.insert(2, 'name', data['code'].map(names))
+                mdb.insert_db_from_df(data, table_name, cols_type, False, "`date`,`code`")
+                cols_type = None
+    except Exception as e:
+        logging.error(f"indicators_data_daily_job.prepare_range处理异常：{e}")
 
 
 # 对每日指标数据，进行筛选。将符合条件的。二次筛选出来。
@@ -154,8 +198,14 @@ def guess_sell(date):
 
 
 def main():
-    # 使用方法传递。
-    runt.run_with_args(prepare)
+    if len(sys.argv) == 3:
+        # 区间作业 python xxx.py 2023-03-01 2023-03-21，一次计算全部日期
+        start_date = datetime.datetime.strptime(sys.argv[1], "%Y-%m-%d").date()
+        end_date = datetime.datetime.strptime(sys.argv[2], "%Y-%m-%d").date()
+        prepare_range(start_date, end_date)
+    else:
+        # 使用方法传递。
+        runt.run_with_args(prepare)
     # 二次筛选数据。直接计算买卖股票数据。
     runt.run_with_args(guess_buy)
     runt.run_with_args(guess_sell)
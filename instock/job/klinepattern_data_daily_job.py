@@ -3,7 +3,6 @@
 
 
 import logging
-import concurrent.futures
 import pandas as pd
 import os.path
 import sys
@@ -15,7 +14,8 @@ import instock.lib.run_template as runt
 import instock.core.tablestructure as tbs
 import instock.lib.database as mdb
 from instock.core.singleton_stock import stock_hist_data
-import instock.core.pattern.pattern_recognitions as kpr
+import instock.core.pattern.pattern_recognitions_batch as kprb
+import instock.core.pattern.pattern_index as kpi
 
 __author__ = 'myh '
 __date__ = '2023/3/10 '
@@ -25,8 +25,10 @@ def prepare(date):
     try:
         stocks_data = stock_hist_data(date=date).get_data()
         if stocks_data is None:
+            logging.error(f"klinepattern_data_daily_job.prepare处理异常：没有历史数据，形态出现记录缺少{date}")
             return
         results = run_check(stocks_data, date=date)
+        append_index(stocks_data, date)
         if results is None:
             return
 
@@ -39,44 +41,43 @@ def prepare(date):
         else:
             cols_type = tbs.get_field_types(tbs.TABLE_CN_STOCK_KLINE_PATTERN['columns'])
 
-        dataKey = pd.DataFrame(results.keys())
+        # 稀疏结果转为每只股票一行，没有识别到的形态为0
+        columns = list(tbs.STOCK_KLINE_PATTERN_DATA['columns'])
+        dataVal = results.pivot(index='code', columns='pattern', values='value')
+        dataVal = dataVal.reindex(columns=columns).fillna(0).astype(int).rename_axis(columns=None).reset_index()
+
+        codes = set(dataVal['code'])
+        dataKey = pd.DataFrame([k for k in stocks_data if k[1] in codes])
         _columns = tuple(tbs.TABLE_CN_STOCK_FOREIGN_KEY['columns'])
         dataKey.columns = _columns
 
-        dataVal = pd.DataFrame(results.values())
-
         data = pd.merge(dataKey, dataVal, on=['code'], how='left')
-        # 单例，时间段循环必须改时间
-        date_str = date.strftime("%Y-%m-%d")
-        if date.strftime("%Y-%m-%d") != data.iloc[0]['date']:
-            data['date'] = date_str
         mdb.insert_db_from_df(data, table_name, cols_type, False, "`date`,`code`")
-
     except Exception as e:
         logging.error(f"klinepattern_data_daily_job.prepare处理异常：{e}")
 
 
-def run_check(stocks, date=None, workers=40):
-    data = {}
+# 追加当天的形态出现记录，不受形态表写入的影响；失败时记录缺少的日期，之后用 klinepattern_index_job 补算
+def append_index(stocks, date):
+    try:
+        kpi.append_index(stocks, date)
+    except Exception as e:
+        logging.error(f"klinepattern_data_daily_job.append_index处理异常：形态出现记录缺少{date}，"
+                      f"需运行 klinepattern_index_job 补算，{e}")
+
+
+# 全部股票一起识别，每个形态函数只调用一次，返回稀疏结果(code, pattern, value)
+def run_check(stocks, date=None):
     columns = tbs.STOCK_KLINE_PATTERN_DATA['columns']
     data_column = columns
     try:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-            future_to_data = {executor.submit(kpr.get_pattern_recognition, k, stocks[k], data_column, date=date): k for k in stocks}
-            for future in concurrent.futures.as_completed(future_to_data):
-                stock = future_to_data[future]
-                try:
-                    _data_ = future.result()
-                    if _data_ is not None:
-                        data[stock] = _data_
-                except Exception as e:
-                    logging.error(f"klinepattern_data_daily_job.run_check处理异常：{stock[1]}代码{e}")
+        data = kprb.get_pattern_recognition_batch(stocks, data_column, date=date)
+        if data is None or len(data.index) == 0:
+            return None
+        return data
     except Exception as e:
         logging.error(f"klinepattern_data_daily_job.run_check处理异常：{e}")
-    if not data:
-        return None
-    else:
-        return data
+    return None
 
 
 def main():
@@ -0,0 +1,40 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+
+import logging
+import os.path
+import sys
+
+cpath_current = os.path.dirname(os.path.dirname(__file__))
+cpath = os.path.abspath(os.path.join(cpath_current, os.pardir))
+sys.path.append(cpath)
+import instock.lib.run_template as runt
+import instock.core.pattern.pattern_index as kpi
+from instock.core.singleton_stock import stock_hist_data
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+
+# 对全部股票的历史K线识别一次K线形态，生成形态出现记录，之后由每日K线形态作业追加。
+# python klinepattern_index_job.py 使用最近的交易日，python klinepattern_index_job.py 2023-03-01 截止到该日。
+def prepare(date):
+    try:
+        stocks_data = stock_hist_data(date=date).get_data()
+        if stocks_data is None:
+            return
+        count = kpi.build_index(stocks_data, date=date)
+        logging.info(f"klinepattern_index_job.prepare形态出现记录：{count}条")
+    except Exception as e:
+        logging.error(f"klinepattern_index_job.prepare处理异常：{e}")
+
+
+def main():
+    # 使用方法传递。
+    runt.run_with_args(prepare)
+
+
+# main函数入口
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,7 @@ sys.path.append(cpath)
 import instock.lib.run_template as runt
 import instock.core.tablestructure as tbs
 import instock.lib.database as mdb
+import instock.core.stock_pool as stp
 from instock.core.singleton_stock import stock_hist_data
 from instock.core.stockfetch import fetch_stock_top_entity_data
 
@@ -44,10 +45,6 @@ def prepare(date, strategy):
         data.columns = columns
         _columns_backtest = tuple(tbs.TABLE_CN_STOCK_BACKTEST_DATA['columns'])
         data = pd.concat([data, pd.DataFrame(columns=_columns_backtest)])
-        # 单例，时间段循环必须改时间
-        date_str = date.strftime("%Y-%m-%d")
-        if date.strftime("%Y-%m-%d") != data.iloc[0]['date']:
-            data['date'] = date_str
         mdb.insert_db_from_df(data, table_name, cols_type, False, "`date`,`code`")
 
     except Exception as e:
@@ -62,18 +59,14 @@ def run_check(strategy_fun, table_name, stocks, date, workers=40):
             is_check_high_tight = True
     data = []
     try:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-            if is_check_high_tight:
-                future_to_data = {executor.submit(strategy_fun, k, stocks[k], date=date, istop=(k[1] in stock_tops)): k for k in stocks}
-            else:
-                future_to_data = {executor.submit(strategy_fun, k, stocks[k], date=date): k for k in stocks}
-            for future in concurrent.futures.as_completed(future_to_data):
-                stock = future_to_data[future]
-                try:
-                    if future.result():
-                        data.append(stock)
-                except Exception as e:
-                    logging.error(f"strategy_data_daily_job.run_check处理异常：{stock[1]}代码{e}策略{table_name}")
+        if is_check_high_tight:
+            tops = [k for k in stocks if k[1] in stock_tops]
+            results = stp.map_stocks(strategy_fun, stocks, tops, kwargs={'date': date, 'istop': True}, workers=workers)
+            results.update(stp.map_stocks(strategy_fun, stocks, [k for k in stocks if k[1] not in stock_tops],
+                                          kwargs={'date': date}, workers=workers))
+        else:
+            results = stp.map_stocks(strategy_fun, stocks, kwargs={'date': date}, workers=workers)
+        data = [k for k, v in results.items() if v]
     except Exception as e:
         logging.error(f"strategy_data_daily_job.run_check处理异常：{e}策略{table_name}")
     if not data:
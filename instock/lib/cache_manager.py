@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import logging
+import threading
+from instock.lib.singleton_type import singleton_type
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+# 缓存目录，默认为 instock/cache/hist
+cpath_current = os.path.dirname(os.path.dirname(__file__))
+cache_path = os.path.join(cpath_current, 'cache', 'hist')
+
+cache_max_bytes = 2 * 1024 * 1024 * 1024  # 缓存最大字节数
+cache_max_days = 90  # 超过天数没有访问的缓存文件将被清理
+cache_clean_interval = 3600  # 后台清理间隔秒数
+
+# 不参与淘汰的子目录。store 为 stock_hist_store 的列式历史行情，每个文件包含数百只股票的完整日线，
+# 淘汰一个文件就要重新下载这些股票；文件数和大小受股票数量限制，写入时由 stock_hist_store 加文件锁。
+cache_keep_dirs = ('store',)
+
+# 使用环境变量配置缓存,docker -e 传递
+_cache_max_bytes = os.environ.get('cache_max_bytes')
+if _cache_max_bytes is not None:
+    cache_max_bytes = int(_cache_max_bytes)
+_cache_max_days = os.environ.get('cache_max_days')
+if _cache_max_days is not None:
+    cache_max_days = float(_cache_max_days)
+_cache_clean_interval = os.environ.get('cache_clean_interval')
+if _cache_clean_interval is not None:
+    cache_clean_interval = int(_cache_clean_interval)
+
+
+# 磁盘缓存管理：按字节预算和最近访问时间(LRU)淘汰文件，超过保存天数的文件直接淘汰。
+# 文件的修改时间作为最近访问时间，读取缓存时调用 touch 更新。
+class cache_manager(metaclass=singleton_type):
+    def __init__(self, path=cache_path, max_bytes=cache_max_bytes, max_days=cache_max_days):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_days = max_days
+        self.lock = threading.Lock()
+        self.counters = {'hit': 0, 'miss': 0, 'append': 0, 'eviction': 0, 'evicted_bytes': 0}
+        self._thread = None
+
+    def record(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        stats['bytes'] = sum(f[2] for f in self._list_files())
+        return stats
+
+    @staticmethod
+    def touch(file):
+        try:
+            os.utime(file, None)
+        except Exception:
+            pass
+
+    def _walk(self, evictable=False):
+        # evictable 为 True 时跳过不参与淘汰的子目录
+        for root, dirs, names in os.walk(self.path):
+            if evictable and root == self.path:
+                dirs[:] = [d for d in dirs if d not in cache_keep_dirs]
+            yield root, names
+
+    def _list_files(self, evictable=False):
+        files = []
+        for root, names in self._walk(evictable):
+            for name in names:
+                if name.endswith(('.tmp', '.lock')):  # 写入中的临时文件和文件锁不计入
+                    continue
+                file = os.path.join(root, name)
+                try:
+                    st = os.stat(file)
+                    files.append((st.st_mtime, file, st.st_size))
+                except OSError:
+                    pass
+        return files
+
+    def _evict(self, file, size):
+        try:
+            os.remove(file)
+            self.record('eviction')
+            self.record('evicted_bytes', size)
+        except OSError:
+            pass
+
+    # 先淘汰过期文件，再按最近访问时间从旧到新淘汰，直到总大小不超过预算。
+    def cleanup(self):
+        files = sorted(self._list_files(evictable=True))
+        expire_time = time.time() - self.max_days * 86400
+        # 不参与淘汰的文件也占用预算
+        total = sum(f[2] for f in self._list_files()) - sum(f[2] for f in files)
+        keep = []
+        for mtime, file, size in files:
+            if mtime < expire_time:
+                self._evict(file, size)
+            else:
+                keep.append((mtime, file, size))
+                total += size
+        for mtime, file, size in keep:
+            if total <= self.max_bytes:
+                break
+            self._evict(file, size)
+            total -= size
+        # 删除空目录，如旧版按日期创建的缓存目录。
+        for root, names in reversed(list(self._walk(evictable=True))):
+            if root != self.path and not os.listdir(root):
+                try:
+                    os.rmdir(root)
+                except OSError:
+                    pass
+        return total
+
+    def _run(self, interval):
+        while True:
+            try:
+                self.cleanup()
+            except Exception as e:
+                logging.error(f"cache_manager._run处理异常：{e}")
+            time.sleep(interval)
+
+    # 启动后台清理线程，进程内只启动一次。
+    def start(self, interval=cache_clean_interval):
+        with self.lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+            self._thread.start()
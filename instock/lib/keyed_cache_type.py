@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import logging
+from threading import RLock
+from collections import OrderedDict
+from concurrent.futures import Future
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+instance_cache_max_bytes = 4 * 1024 * 1024 * 1024  # 全部缓存实例的内存预算
+instance_cache_max_items = 4  # 每个类最多缓存的实例数
+
+# 使用环境变量配置,docker -e 传递
+_instance_cache_max_bytes = os.environ.get('instance_cache_max_bytes')
+if _instance_cache_max_bytes is not None:
+    instance_cache_max_bytes = int(_instance_cache_max_bytes)
+_instance_cache_max_items = os.environ.get('instance_cache_max_items')
+if _instance_cache_max_items is not None:
+    instance_cache_max_items = int(_instance_cache_max_items)
+
+
+# 按参数缓存实例，替代只保留第一个实例的 singleton_type。
+# 类可定义 cache_key(*args, **kwargs) 类方法生成键，默认使用全部参数；定义 memory_size() 返回实例占用的字节数。
+# 同一个键的并发创建共享一次加载；超过实例数或内存预算时按最近使用(LRU)淘汰，内存预算由所有使用该元类的类共享。
+class keyed_cache_type(type):
+    cache_lock = RLock()
+    instances = OrderedDict()  # (cls, key) -> (instance, bytes)
+    loading = {}  # (cls, key) -> Future
+
+    def __call__(cls, *args, **kwargs):
+        key_func = getattr(cls, 'cache_key', None)
+        key = (cls, key_func(*args, **kwargs) if key_func is not None else (args, tuple(sorted(kwargs.items()))))
+        with keyed_cache_type.cache_lock:
+            item = keyed_cache_type.instances.get(key)
+            if item is not None:
+                keyed_cache_type.instances.move_to_end(key)
+                return item[0]
+            future = keyed_cache_type.loading.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                keyed_cache_type.loading[key] = future
+        if not is_owner:
+            return future.result()  # 等待正在进行的同一加载
+
+        try:
+            instance = super(keyed_cache_type, cls).__call__(*args, **kwargs)
+        except BaseException as e:
+            with keyed_cache_type.cache_lock:
+                del keyed_cache_type.loading[key]
+            future.set_exception(e)
+            raise
+        size = 0
+        if hasattr(instance, 'memory_size'):
+            try:
+                size = instance.memory_size()
+            except Exception as e:
+                logging.error(f"keyed_cache_type.memory_size处理异常：{cls.__name__}{e}")
+        with keyed_cache_type.cache_lock:
+            keyed_cache_type.instances[key] = (instance, size)
+            del keyed_cache_type.loading[key]
+            keyed_cache_type._evict(key)
+        future.set_result(instance)
+        return instance
+
+    @staticmethod
+    def _evict(keep):
+        instances = keyed_cache_type.instances
+        total = sum(v[1] for v in instances.values())
+        counts = {}
+        for k in instances:
+            counts[k[0]] = counts.get(k[0], 0) + 1
+        for k in list(instances.keys()):
+            if k == keep:
+                continue
+            if total <= instance_cache_max_bytes and counts[k[0]] <= instance_cache_max_items:
+                continue
+            total -= instances.pop(k)[1]
+            counts[k[0]] -= 1
+            logging.info(f"keyed_cache_type淘汰实例：{k[0].__name__}{str(k[1])[:100]}")
+
+    def cache_clear(cls):
+        """
+        清除该类的全部缓存实例
+        """
+        with keyed_cache_type.cache_lock:
+            for k in [k for k in keyed_cache_type.instances if k[0] is cls]:
+                del keyed_cache_type.instances[k]
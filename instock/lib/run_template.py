@@ -21,14 +21,11 @@ def run_with_args(run_fun, *args):
         start_date = datetime.datetime(int(tmp_year), int(tmp_month), int(tmp_day)).date()
         tmp_year, tmp_month, tmp_day = sys.argv[2].split("-")
         end_date = datetime.datetime(int(tmp_year), int(tmp_month), int(tmp_day)).date()
-        run_date = start_date
         try:
             with concurrent.futures.ThreadPoolExecutor() as executor:
-                while run_date <= end_date:
-                    if trd.is_trade_date(run_date):
-                        executor.submit(run_fun, run_date, *args)
-                        time.sleep(2)
-                    run_date += datetime.timedelta(days=1)
+                for run_date in trd.get_trade_dates(start_date, end_date):
+                    executor.submit(run_fun, run_date, *args)
+                    time.sleep(2)
         except Exception as e:
             logging.error(f"run_template.run_with_args处理异常：{run_fun}{sys.argv}{e}")
     elif len(sys.argv) == 2:
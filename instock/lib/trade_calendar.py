@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import datetime
+import numpy as np
+
+__author__ = 'myh '
+__date__ = '2026/10/18 '
+
+
+def to_datetime64(date):
+    """
+    转换为 datetime64[D]，支持 datetime.date/datetime.datetime/'YYYY-MM-DD'/'YYYYMMDD'/numpy 数组及列表
+    """
+    if isinstance(date, np.ndarray):
+        return date.astype('datetime64[D]')
+    if isinstance(date, datetime.datetime):
+        date = date.date()
+    elif isinstance(date, str) and len(date) == 8:
+        date = f"{date[0:4]}-{date[4:6]}-{date[6:8]}"
+    elif isinstance(date, (list, tuple)):
+        return np.array([to_datetime64(d) for d in date], dtype='datetime64[D]')
+    return np.datetime64(date, 'D')
+
+
+def _to_result(days, scalar):
+    if scalar:
+        return days.astype(object)
+    return days
+
+
+# 交易日历，基于有序的 datetime64[D] 数组，偏移、判断和区间查询均为二分查找，支持数组批量计算。
+class trade_calendar:
+    def __init__(self, dates):
+        self.dates = np.unique(to_datetime64(np.asarray(dates)))
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def first(self):
+        return self.dates[0].astype(object)
+
+    @property
+    def last(self):
+        return self.dates[-1].astype(object)
+
+    def is_trade_date(self, date):
+        """
+        :param date: 日期或日期数组
+        :return: bool 或 bool数组
+        """
+        days = to_datetime64(date)
+        i = np.searchsorted(self.dates, days)
+        result = (i < len(self.dates)) & (self.dates[np.minimum(i, len(self.dates) - 1)] == days)
+        return bool(result) if np.ndim(result) == 0 else result
+
+    def shift(self, date, n=1):
+        """
+        偏移 n 个交易日，n<0 为之前第 |n| 个交易日，n>0 为之后第 n 个交易日，均不含 date 本身；
+        n=0 时 date 为交易日返回其本身，否则返回之前最近的交易日
+        :param date: 日期或日期数组，数组时 n 也可以是等长数组
+        :return: datetime.date 或 datetime64[D]数组
+        """
+        days = to_datetime64(date)
+        n = np.asarray(n)
+        # 小于等于 date 的交易日个数，date 为交易日时 right-1 即自身位置
+        right = np.searchsorted(self.dates, days, side='right')
+        left = np.searchsorted(self.dates, days, side='left')
+        i = np.where(n > 0, right + n - 1, np.where(n < 0, left + n, right - 1))
+        if np.any((i < 0) | (i >= len(self.dates))):
+            raise IndexError(f"超出交易日历范围：{date} {n}")
+        return _to_result(self.dates[i], np.ndim(i) == 0)
+
+    def previous(self, date, n=1):
+        return self.shift(date, -n)
+
+    def next(self, date, n=1):
+        return self.shift(date, n)
+
+    def range(self, start, end):
+        """
+        :return: 区间(含两端)内的交易日，datetime64[D]数组
+        """
+        return self.dates[np.searchsorted(self.dates, to_datetime64(start), side='left'):
+                          np.searchsorted(self.dates, to_datetime64(end), side='right')]
+
+    def count(self, start, end):
+        """
+        :return: 区间(含两端)内的交易日个数，start/end 可以是数组
+        """
+        result = np.maximum(np.searchsorted(self.dates, to_datetime64(end), side='right') -
+                            np.searchsorted(self.dates, to_datetime64(start), side='left'), 0)
+        return int(result) if np.ndim(result) == 0 else result
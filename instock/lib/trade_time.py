@@ -8,46 +8,41 @@ __author__ = 'myh '
 __date__ = '2023/4/10 '
 
 
+def get_calendar():
+    return stock_trade_date().get_calendar()
+
+
 def is_trade_date(date=None):
-    trade_date = stock_trade_date().get_data()
-    if trade_date is None:
-        return False
-    if date in trade_date:
-        return True
-    else:
+    calendar = get_calendar()
+    if calendar is None or date is None:
         return False
+    return calendar.is_trade_date(date)
 
 
 def get_previous_trade_date(date, count=1):
-    while True:
-        date =  get_one_previous_trade_date(date)
-        count -= 1
-        if count == 0:
-            break
-    return date
+    calendar = get_calendar()
+    if calendar is None:
+        return date
+    return calendar.shift(date, -count)
+
 
 def get_one_previous_trade_date(date):
-    trade_date = stock_trade_date().get_data()
-    if trade_date is None:
-        return date
-    tmp_date = date
-    while True:
-        tmp_date += datetime.timedelta(days=-1)
-        if tmp_date in trade_date:
-            break
-    return tmp_date
+    return get_previous_trade_date(date)
 
 
-def get_next_trade_date(date):
-    trade_date = stock_trade_date().get_data()
-    if trade_date is None:
+def get_next_trade_date(date, count=1):
+    calendar = get_calendar()
+    if calendar is None:
         return date
-    tmp_date = date
-    while True:
-        tmp_date += datetime.timedelta(days=1)
-        if tmp_date in trade_date:
-            break
-    return tmp_date
+    return calendar.shift(date, count)
+
+
+# 区间(含两端)内的交易日列表
+def get_trade_dates(start_date, end_date):
+    calendar = get_calendar()
+    if calendar is None:
+        return []
+    return calendar.range(start_date, end_date).astype(object).tolist()
 
 
 OPEN_TIME = (